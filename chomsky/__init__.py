@@ -3,8 +3,10 @@ Welcome.  Welcome to chomsky.
 """
 from .buffer import *
 from .exceptions import *
+from .memo import *
 from .matchers import *
 from .grammar import *
+from .compiler import *
 from .result_list import *
 
 
@@ -15,8 +17,3 @@ W = Chars  # short for 'Word', for compatibility with pyparse
 S = Whitespace  # short for 'Space'
 R = Regex
 
-
-# hide some Matchers
-del AutoSequence
-del AutoAny
-del to_matcher
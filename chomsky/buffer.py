@@ -1,97 +1,1107 @@
+import bisect
+import bz2
+import codecs
+import functools
+import gzip
+import lzma
+import mmap
+import re
+import sys
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # before Python 3.11
+    import sre_parse
+    import sre_constants
+
 from .exceptions import ParseException
+from .memo import MemoTable
+from .result_list import Span
+
+__all__ = ['Buffer', 'StreamBuffer', 'BytesBuffer', 'MmapBuffer']
+
+
+'Regular expressions, compiled again for bytes (see ``BytesBuffer.match``)'
+BYTES_PATTERNS = {}
+'How far regular expressions can look ahead (see ``pattern_reach``)'
+PATTERN_REACHES = {}
+NEWLINE = re.compile(b'\n')
+
+'The magic numbers of the compressed formats that ``StreamBuffer.open`` reads'
+COMPRESSION = {
+    'gzip': (b'\x1f\x8b', gzip.open),
+    'bz2': (b'BZh', bz2.open),
+    'xz': (b'\xfd7zXZ\x00', lzma.open),
+    }
 
 
 class Buffer(object):
+    """
+    Wraps the string that is being parsed, and keeps track of the current
+    position.
+
+    Positions are always offsets into the *original* string, even in a buffer
+    that was created using ``window()``.  Use the ``peek``, ``startswith``,
+    ``find`` and ``match`` methods to inspect the string in place - they never
+    copy the remaining input.
+
+    With ``spans=True``, matchers return ``Span`` results, which refer to the
+    text instead of copying it.
+
+    ``choices`` counts the alternatives and lookaheads that are being matched:
+    the parser can still go back to where they started, so a ``Commit`` only
+    commits the buffer when it is 0.
+
+    Positions are plain integers, so a checkpoint is ``pos = buffer.tell()``,
+    and going back to it is ``buffer.seek(pos)``.  The ``mark()`` stack is
+    still available for custom matchers; pass ``debug_marks=True`` to check
+    that every mark is restored by the matcher that set it.
+    """
+    'True if ``buffer`` is a string with the whole input (compiled matchers read it directly)'
+    in_memory = True
+    'True if results are bytes (see ``BytesBuffer``)'
+    binary = False
+    'False if only part of the input is loaded (see ``StreamBuffer``)'
+    complete = True
+
     @property
     def buffer(self):
         return self.__buffer
 
-    def __init__(self, buffer):
+    def __init__(self, buffer, start=0, end=None, memo=None, spans=False, debug_marks=False):
         self.__buffer = buffer
-        self.__position = 0
+        self.__spans = spans
+        self.__start = start
+        self.__end = len(buffer) if end is None else end
+        self.__position = start
         self.__marks = []
+        self.__debug_marks = debug_marks
+        self.__memo = memo
+        self.__committed = start
+        self.__newlines = None
+        self.choices = 0
+
+    @property
+    def spans(self):
+        return self.__spans
+
+    @property
+    def memo(self):
+        """
+        The MemoTable that memoized matchers and grammars use.  Pass
+        ``memo=MemoTable(maxsize=...)`` to change the size of the table.
+        """
+        if self.__memo is None:
+            self.__memo = MemoTable()
+        return self.__memo
+
+    @property
+    def committed(self):
+        """
+        The position of the last ``commit()``.  The parser will not backtrack
+        before it.
+        """
+        return self.__committed
+
+    @property
+    def horizon(self):
+        """
+        The first position that the parser can still go back to: the oldest
+        ``mark()``, or the last ``commit()``.
+        """
+        horizon = self.__committed
+        if self.__marks:
+            mark = self.__marks[0]
+            if self.__debug_marks:
+                mark = mark[0]
+            horizon = min(horizon, mark)
+        return horizon
+
+    def commit(self, pos=None):
+        """
+        Called by the ``Commit`` matcher: the text before ``pos`` (default: the
+        current position) will not be parsed again, so its memo entries are
+        discarded.
+        """
+        if pos is None:
+            pos = self.__position
+        if pos <= self.__committed:
+            return
+        self.__committed = pos
+        if self.__memo is not None:
+            self.__memo.discard_before(pos)
 
     def advance(self, amt):
         self.__position += amt
 
+    def tell(self):
+        """
+        Returns the current position, to ``seek()`` back to later.
+        """
+        return self.__position
+
+    def seek(self, pos):
+        """
+        Moves to ``pos`` (a position returned by ``tell()``, or by a matcher).
+        """
+        self.__position = pos
+
     def rest(self):
-        return self.__buffer[self.__position:]
+        return self.__buffer[self.__position:self.__end]
 
-    def mark(self, mark_id=None):
+    def text(self, start, end):
+        """
+        Returns the text between ``start`` and ``end``.
         """
-        Most Matchers store the position before matching.
+        return self.__buffer[start:end]
 
-        The ``mark_id`` feature is useful during internal chomsky debugging.
-        Passing the matcher or grammar will ensure that the object that set the
-        mark is the same object that later restored or removed the mark.
+    def span(self, start, end):
+        """
+        Returns the text between ``start`` and ``end`` as a result: a ``Span``
+        if the buffer was created with ``spans=True``, otherwise a string.
         """
-        self.__marks.append((self.__position, mark_id and id(mark_id)))
+        if self.__spans:
+            return Span(self, start, end)
+        return self.__buffer[start:end]
 
-    def restore_mark(self, mark_id=None):
+    def window(self, start, end):
         """
-        Restores the position of the pushed mark.
+        Returns a Buffer that shares this buffer's string, but only allows
+        matching between ``start`` and ``end``.  The new buffer starts at
+        ``start``.
+        """
+        return Buffer(self.__buffer, start, end, spans=self.__spans, debug_marks=self.__debug_marks)
+
+    def peek(self, pos=None):
+        """
+        Returns the character at ``pos`` (default: the current position), or
+        an empty string if ``pos`` is outside of the buffer.
+        """
+        if pos is None:
+            pos = self.__position
+        if self.__start <= pos < self.__end:
+            return self.__buffer[pos]
+        return ''
+
+    def startswith(self, literal, pos=None):
+        """
+        Checks whether the buffer contains ``literal`` at ``pos`` (default: the
+        current position).
+        """
+        if pos is None:
+            pos = self.__position
+        return self.__buffer.startswith(literal, pos, self.__end)
+
+    def find(self, substring, start=None, end=None):
+        """
+        Returns the position of ``substring`` between ``start`` and ``end``, or
+        -1 if it is not found.
+        """
+        if start is None:
+            start = self.__position
+        if end is None:
+            end = self.__end
+        return self.__buffer.find(substring, start, end)
+
+    def match(self, pattern, pos=None):
+        """
+        Matches a compiled regular expression at ``pos`` (default: the current
+        position).  Returns the ``re`` match object (positions in the match are
+        absolute), or None.
+        """
+        if pos is None:
+            pos = self.__position
+        return pattern.match(self.__buffer, pos, self.__end)
+
+    def match_rest(self, pattern, pos=None):
+        """
+        Matches like ``match``, but the regular expression only sees the input
+        from ``pos`` on, as if that was the whole input: ``^``, ``\\A``,
+        ``\\b`` and lookbehinds treat ``pos`` as the start.  This copies the
+        rest of the input.
+        """
+        if pos is None:
+            pos = self.__position
+        match = pattern.match(self.__buffer[pos:self.__end])
+        if match is None:
+            return None
+        return StreamMatch(match, pos)
+
+    def newlines(self):
+        """
+        Returns the positions of the newlines in the input, in order.  They are
+        found once, the first time that a line number is needed.
         """
+        if self.__newlines is None:
+            newlines = []
+            find = self.__buffer.find
+            pos = find('\n')
+            while pos != -1:
+                newlines.append(pos)
+                pos = find('\n', pos + 1)
+            self.__newlines = newlines
+        return self.__newlines
+
+    def line_start(self, pos=None):
+        """
+        Returns the position where the line that contains ``pos`` (default: the
+        current position) starts.
+        """
+        if pos is None:
+            pos = self.__position
+        newlines = self.newlines()
+        line = bisect.bisect_left(newlines, pos)
+        return newlines[line - 1] + 1 if line else 0
+
+    def line_col(self, pos=None):
+        """
+        Returns the line and column (both start at 1) of ``pos`` (default: the
+        current position).  A newline is the last character of its line.
+        """
+        if pos is None:
+            pos = self.__position
+        newlines = self.newlines()
+        line = bisect.bisect_left(newlines, pos)
+        start = newlines[line - 1] + 1 if line else 0
+        return line + 1, pos - start + 1
+
+    def mark(self, mark_id=None):
+        """
+        Pushes the current position; ``restore_mark()`` goes back to it, and
+        ``forget_mark()`` drops it.  ``tell()`` and ``seek()`` are cheaper, and
+        are what the built-in matchers use.
+
+        The ``mark_id`` feature is useful during internal chomsky debugging.
+        If the buffer was created with ``debug_marks=True``, passing the
+        matcher or grammar will ensure that the object that set the mark is the
+        same object that later restored or removed the mark.
+        """
+        if self.__debug_marks:
+            self.__marks.append((self.__position, mark_id and id(mark_id)))
+        else:
+            self.__marks.append(self.__position)
+
+    def __pop_mark(self, mark_id):
         if not self.__marks:
             raise IndexError('Cannot pop mark position')
+        if not self.__debug_marks:
+            return self.__marks.pop()
         pos, prev_id = self.__marks.pop()
         mark_id = mark_id and id(mark_id)
         if (prev_id or mark_id) and prev_id != mark_id:
             raise Exception('Mark ids do not match. old={prev_id!r}, new={mark_id!r}'.format(**locals()))
-        self.__position = pos
+        return pos
+
+    def restore_mark(self, mark_id=None):
+        """
+        Restores the position of the pushed mark.
+        """
+        self.__position = self.__pop_mark(mark_id)
 
     def forget_mark(self, mark_id=None):
         """
         Removes the last mark pushed without moving the position.
         """
-        if not self.__marks:
-            raise IndexError('Cannot pop mark position')
-        pos, prev_id = self.__marks.pop()
-        mark_id = mark_id and id(mark_id)
-        if (prev_id or mark_id) and prev_id != mark_id:
-            raise Exception('Mark ids do not match. old={prev_id!r}, new={mark_id!r}'.format(**locals()))
-        return pos, self.__position
+        return self.__pop_mark(mark_id), self.__position
 
     @property
     def position(self):
         return self.__position
 
+    @property
+    def start(self):
+        return self.__start
+
+    @property
+    def end(self):
+        return self.__end
+
     def __bool__(self):
-        return len(self.__buffer) and self.__position < len(self.__buffer)
+        return self.__position < self.__end
 
     def __len__(self):
-        return len(self.__buffer)
+        return self.__end - self.__start
 
     def __getitem__(self, key):
-        if self.__position >= len(self.__buffer):
-            raise ParseException(
-                'Unexpected end of buffer at {self.position}'.format(self=self)
-                )
+        if self.__position >= self.__end:
+            raise ParseException('Unexpected end of buffer at {buffer}', buffer=self)
 
         if isinstance(key, int):
-            return self.__buffer[self.position + key]
+            pos = self.__position + key
+            if not self.__start <= pos < self.__end:
+                raise ParseException('Unexpected end of buffer at {buffer}', buffer=self, position=pos)
+            return self.__buffer[pos]
 
         if isinstance(key, slice):
             if key.start == None and key.stop == None:
-                start = 0
-                stop = len(self.__buffer)
+                start = self.__start
+                stop = self.__end
             else:
                 if key.start == None:
-                    start = 0
+                    start = self.__start
                 else:
                     start = self.position + key.start
 
                 if key.stop == None:
-                    stop = len(self.__buffer)
+                    stop = self.__end
                 elif key.stop < 0:
-                    stop = key.stop
+                    stop = self.__end + key.stop
                 else:
-                    stop = self.position + key.stop
+                    stop = min(self.position + key.stop, self.__end)
             return Buffer(self.__buffer[slice(start, stop, key.step)])
 
         raise TypeError('Unknown key {key!r}'.format(key=key))
 
+    def describe(self, position):
+        """
+        Renders the buffer as it would look at ``position``.  This is what
+        ``repr()`` returns, and what ParseException uses in its message.
+        """
+        return 'Buffer({0!r} + {1!r})'.format(
+            self.__buffer[self.__start:position],
+            self.__buffer[position:self.__end],
+            )
+
     def __repr__(self):
-        return 'Buffer({0!r} + {1!r})'.format(self.__buffer[:self.__position], self.__buffer[self.__position:])
+        return self.describe(self.__position)
 
     def __str__(self):
-        return self.__buffer
+        if self.__start == 0 and self.__end == len(self.__buffer):
+            return self.__buffer
+        return self.__buffer[self.__start:self.__end]
+
+
+class StreamBuffer(Buffer):
+    """
+    A Buffer that reads the text from a file object (anything with a
+    ``read(size)`` method) or an iterator of strings, ``chunk_size``
+    characters at a time, as the matchers ask for it.
+
+    Only the text from the ``horizon`` onward is kept: the text before the
+    last ``commit()`` (and before the oldest mark) is released once the next
+    chunk is read, so the memory that is used depends on how far the parser
+    can backtrack, not on the size of the input.  Without ``commit()`` the
+    whole input is kept, like in a Buffer.  Reading text that was released
+    raises an IndexError::
+
+        buffer = StreamBuffer(open('huge.log'))
+        while buffer:
+            entry = LogEntry(buffer)
+            buffer.commit()
+
+    Positions are offsets into the whole input, like in a Buffer.  ``end`` is
+    ``sys.maxsize`` until the end of the input has been read.  Regular
+    expressions are matched once enough text is loaded that the result can't
+    change (see ``pattern_reach``): bounded patterns load as far as they can
+    look, and runs of characters (``Chars``) load until the run ends.  Other
+    unbounded patterns (a ``Regex`` like ``'a.*b'``) load the rest of the
+    input, so fused ``Group`` patterns are not used; the group's matchers are
+    matched instead.
+
+    With an ``encoding``, the source returns bytes, which are decoded one
+    chunk at a time (a character can be split between chunks).  Use
+    ``StreamBuffer.open()`` for files, including compressed ones.
+
+    Compiled matchers match a StreamBuffer with the original matcher, and
+    ``spans`` is not supported, because a Span could refer to released text.
+    """
+    in_memory = False
+    complete = False
+
+    def __init__(self, source, start=0, memo=None, chunk_size=65536, encoding=None, debug_marks=False):
+        super(StreamBuffer, self).__init__('', start, start, memo=memo, debug_marks=debug_marks)
+        read = getattr(source, 'read', None)
+        if read is not None:
+            chunks = iter(functools.partial(read, chunk_size), '' if encoding is None else b'')
+        else:
+            chunks = iter(source)
+        if encoding is not None:
+            chunks = codecs.iterdecode(chunks, encoding)
+        self.__source = source
+        self.__chunks = chunks
+        self.chunk_size = chunk_size
+        self.__debug_marks = debug_marks
+        self.__text = ''
+        self.__base = start
+        self.__eof = False
+        # the number of newlines that were released, and the last one
+        self.__released_lines = 0
+        self.__released_newline = start - 1
+
+    @classmethod
+    def open(cls, file, encoding='utf-8', compression='auto', **kwargs):
+        """
+        Streams a file (a path, or a file object that was opened in binary
+        mode), decompressing it as it is read.  ``compression`` is 'gzip',
+        'bz2', 'xz', None, or 'auto' to tell from the first bytes of the
+        file.  Only the decompressor's state and the loaded text are kept in
+        memory.  ``close()`` (or a ``with`` block) closes the file.
+        """
+        if compression == 'auto':
+            compression = cls.detect_compression(file)
+        if compression is None:
+            source = file if hasattr(file, 'read') else open(file, 'rb')
+        else:
+            source = COMPRESSION[compression][1](file, 'rb')
+        return cls(source, encoding=encoding, **kwargs)
+
+    @staticmethod
+    def detect_compression(file):
+        """
+        Returns the name of the compression of ``file`` (see ``COMPRESSION``),
+        or None.  A file object is not moved: it must support ``peek()`` or
+        ``seek()``.
+        """
+        size = max(len(magic) for magic, _ in COMPRESSION.values())
+        if hasattr(file, 'peek'):
+            head = file.peek(size)[:size]
+        elif hasattr(file, 'read'):
+            pos = file.tell()
+            head = file.read(size)
+            file.seek(pos)
+        else:
+            with open(file, 'rb') as f:
+                head = f.read(size)
+        for compression, (magic, _) in COMPRESSION.items():
+            if head.startswith(magic):
+                return compression
+        return None
+
+    def close(self):
+        """
+        Closes the source, if it is a file.
+        """
+        close = getattr(self.__source, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def buffer(self):
+        """
+        The text that is loaded, which starts at ``base``.
+        """
+        return self.__text
+
+    @property
+    def base(self):
+        return self.__base
+
+    @property
+    def end(self):
+        if self.__eof:
+            return self.__base + len(self.__text)
+        return sys.maxsize
+
+    def __fill(self, pos):
+        """
+        Reads chunks until the loaded text reaches ``pos``, or the end of the
+        input.  The text before the horizon is released first.
+        """
+        loaded = self.__base + len(self.__text)
+        if pos <= loaded or self.__eof:
+            return
+
+        # keep one character before the horizon, so that a regex can tell
+        # that it is not at the start of the input
+        keep = self.horizon
+        if keep > self.start:
+            keep -= 1
+        text = self.__text
+        if keep > self.__base:
+            released = keep - self.__base
+            self.__released_lines += text.count('\n', 0, released)
+            newline = text.rfind('\n', 0, released)
+            if newline != -1:
+                self.__released_newline = self.__base + newline
+            text = text[released:]
+            self.__base = keep
+
+        # read at least as much as is kept, so that the text is copied a
+        # bounded number of times
+        pos = max(pos, loaded + len(text))
+        chunks = [text]
+        while loaded < pos:
+            chunk = next(self.__chunks, '')
+            if not chunk:
+                self.__eof = True
+                break
+            chunks.append(chunk)
+            loaded += len(chunk)
+        self.__text = ''.join(chunks)
+
+    def __offset(self, pos):
+        offset = pos - self.__base
+        if offset < 0:
+            raise IndexError('The text at {pos} was released (the stream is at {base})'.format(
+                pos=pos, base=self.__base))
+        return offset
+
+    def rest(self):
+        """
+        Returns the rest of the input, which reads all of it.
+        """
+        return self.text(self.position, sys.maxsize)
+
+    def text(self, start, end):
+        self.__fill(end)
+        end = min(end, self.__base + len(self.__text))
+        return self.__text[self.__offset(start):end - self.__base]
+
+    def span(self, start, end):
+        return self.text(start, end)
+
+    def window(self, start, end):
+        """
+        Returns a StreamBuffer with a copy of the text between ``start`` and
+        ``end``.
+        """
+        return StreamBuffer([self.text(start, end)], start, debug_marks=self.__debug_marks)
+
+    def peek(self, pos=None):
+        if pos is None:
+            pos = self.position
+        if pos < self.start:
+            return ''
+        self.__fill(pos + 1)
+        offset = self.__offset(pos)
+        if offset < len(self.__text):
+            return self.__text[offset]
+        return ''
+
+    def startswith(self, literal, pos=None):
+        if pos is None:
+            pos = self.position
+        self.__fill(pos + len(literal))
+        return self.__text.startswith(literal, self.__offset(pos))
+
+    def find(self, substring, start=None, end=None):
+        if start is None:
+            start = self.position
+        if end is not None:
+            self.__fill(end)
+            end = self.__offset(min(end, self.__base + len(self.__text)))
+            found = self.__text.find(substring, self.__offset(start), end)
+            return found if found < 0 else found + self.__base
+
+        # search the text that is loaded, and then the next chunks
+        search = start
+        while True:
+            found = self.__text.find(substring, self.__offset(search))
+            if found >= 0:
+                return found + self.__base
+            loaded = self.__base + len(self.__text)
+            if self.__eof:
+                return -1
+            search = max(search, loaded - len(substring) + 1)
+            self.__fill(loaded + self.chunk_size)
+
+    def newlines(self):
+        raise TypeError('The newlines of a StreamBuffer are not kept')
+
+    def line_start(self, pos=None):
+        """
+        Searches the loaded text; only the newlines that were released are
+        counted.
+        """
+        if pos is None:
+            pos = self.position
+        self.__fill(pos)
+        newline = self.__text.rfind('\n', 0, self.__offset(pos))
+        if newline == -1:
+            return self.__released_newline + 1
+        return self.__base + newline + 1
+
+    def line_col(self, pos=None):
+        if pos is None:
+            pos = self.position
+        start = self.line_start(pos)
+        line = self.__released_lines + self.__text.count('\n', 0, self.__offset(pos))
+        return line + 1, pos - start + 1
+
+    def match(self, pattern, pos=None):
+        """
+        Returns a ``StreamMatch``, with positions in the whole input.  Enough
+        text is loaded that the result is the same as it would be for the
+        whole input, see ``pattern_reach``.
+        """
+        if pos is None:
+            pos = self.position
+        reach, run = pattern_reach(pattern)
+        if reach is not None:
+            self.__fill(pos + reach)
+            match = pattern.match(self.__text, self.__offset(pos))
+        else:
+            lookahead = self.chunk_size
+            while True:
+                self.__fill(pos + lookahead)
+                text = self.__text
+                match = pattern.match(text, self.__offset(pos))
+                if self.__eof:
+                    break
+                loaded = self.__base + len(text)
+                # a run of characters ends at the first character that doesn't
+                # match, or fails because it is shorter than ``run``
+                if run is not None and match is None and loaded >= pos + run:
+                    break
+                if run is not None and match is not None and match.end() < len(text):
+                    break
+                lookahead = 2 * (loaded - pos)
+        if match is None:
+            return None
+        return StreamMatch(match, self.__base)
+
+    def match_rest(self, pattern, pos=None):
+        if pos is None:
+            pos = self.position
+        # (reads the rest of the input)
+        self.__fill(sys.maxsize)
+        match = pattern.match(self.__text[self.__offset(pos):])
+        if match is None:
+            return None
+        return StreamMatch(match, pos)
+
+    def __bool__(self):
+        return self.peek() != ''
+
+    def __len__(self):
+        raise TypeError('The length of a StreamBuffer is not known')
+
+    def __getitem__(self, key):
+        if not self:
+            raise ParseException('Unexpected end of buffer at {buffer}', buffer=self)
+
+        if isinstance(key, int):
+            pos = self.position + key
+            char = self.peek(pos)
+            if not char:
+                raise ParseException('Unexpected end of buffer at {buffer}', buffer=self, position=pos)
+            return char
+
+        if isinstance(key, slice):
+            start = self.start if key.start is None else self.position + key.start
+            if key.stop is None or key.stop < 0:
+                # (reads the rest of the input)
+                self.__fill(sys.maxsize)
+                stop = self.end if key.stop is None else self.end + key.stop
+            else:
+                stop = self.position + key.stop
+            return Buffer(self.text(start, stop)[::key.step])
+
+        raise TypeError('Unknown key {key!r}'.format(key=key))
+
+    def describe(self, position):
+        """
+        Renders the text that is loaded, as it would look at ``position``.
+        """
+        split = max(position - self.__base, 0)
+        return 'StreamBuffer({0!r} + {1!r})'.format(self.__text[:split], self.__text[split:])
+
+    def __str__(self):
+        return self.__text
+
+
+class StreamMatch(object):
+    """
+    A regular expression match in a StreamBuffer.  It works like the ``re``
+    match, but the positions are offsets into the whole input.
+    """
+    __slots__ = ('match', 'base')
+
+    def __init__(self, match, base):
+        self.match = match
+        self.base = base
+
+    def start(self, group=0):
+        start = self.match.start(group)
+        return start if start < 0 else start + self.base
+
+    def end(self, group=0):
+        end = self.match.end(group)
+        return end if end < 0 else end + self.base
+
+    def span(self, group=0):
+        return self.start(group), self.end(group)
+
+    def group(self, *groups):
+        return self.match.group(*groups)
+
+    def groups(self, default=None):
+        return self.match.groups(default)
+
+    def groupdict(self, default=None):
+        return self.match.groupdict(default)
+
+    def __getitem__(self, group):
+        return self.match[group]
+
+
+class BytesBuffer(Buffer):
+    """
+    A Buffer over bytes (``bytes``, ``bytearray``, ``memoryview`` or
+    ``mmap``), for binary or ASCII data that shouldn't be decoded first.  The
+    data is not copied.
+
+    Positions are byte offsets, and the matchers see every byte as one
+    character: ``Char``/``Literal``/``OneOf`` compare ``chr(byte)``, and
+    regular expressions (``Chars``, ``Regex``, fused ``Group``-s) are compiled
+    again for bytes, once, and match the data in place.  Matchers and grammars
+    return ``bytes`` (``Span``-s with ``spans=True``), and nothing is decoded.
+
+    With an ``encoding``, results are decoded instead.  'latin-1' returns
+    exactly what the matchers would return for the decoded string.  'utf-8'
+    works when the literals and character sets of the grammar are ASCII
+    (multi-byte characters can still be matched by inverse character sets,
+    like the insides of a ``String``).
+
+    Compiled matchers match a BytesBuffer with the original matcher.
+    """
+    in_memory = False
+
+    def __init__(self, buffer, start=0, end=None, memo=None, spans=False, encoding=None, debug_marks=False):
+        self.encoding = encoding
+        self.binary = encoding is None
+        self.__debug_marks = debug_marks
+        self.__newlines = None
+        super(BytesBuffer, self).__init__(buffer, start, end, memo=memo, spans=spans, debug_marks=debug_marks)
+
+    def rest(self):
+        return self.text(self.position, self.end)
+
+    def text(self, start, end):
+        if self.binary:
+            return bytes(self.buffer[start:end])
+        return self.buffer[start:end].decode(self.encoding)
+
+    def span(self, start, end):
+        if self.spans:
+            return Span(self, start, end)
+        return self.text(start, end)
+
+    def window(self, start, end):
+        return type(self)(self.buffer, start, end, spans=self.spans, encoding=self.encoding,
+            debug_marks=self.__debug_marks)
+
+    def peek(self, pos=None):
+        if pos is None:
+            pos = self.position
+        if self.start <= pos < self.end:
+            return chr(self.buffer[pos])
+        return ''
+
+    def startswith(self, literal, pos=None):
+        if pos is None:
+            pos = self.position
+        end = pos + len(literal)
+        if end > self.end:
+            return False
+        try:
+            return self.buffer[pos:end] == literal.encode('latin-1')
+        except UnicodeEncodeError:
+            return False
+
+    def find(self, substring, start=None, end=None):
+        if start is None:
+            start = self.position
+        if end is None:
+            end = self.end
+        try:
+            substring = substring.encode('latin-1')
+        except UnicodeEncodeError:
+            return -1
+        if isinstance(self.buffer, memoryview):
+            match = re.compile(re.escape(substring)).search(self.buffer, start, end)
+            return -1 if match is None else match.start()
+        return self.buffer.find(substring, start, end)
+
+    def newlines(self):
+        if self.__newlines is None:
+            self.__newlines = [match.start() for match in NEWLINE.finditer(self.buffer)]
+        return self.__newlines
+
+    def match(self, pattern, pos=None):
+        """
+        Matches the bytes version of ``pattern``, see ``bytes_pattern()``.
+        The groups of the match are bytes, or decoded if the buffer has an
+        ``encoding``.
+        """
+        if pos is None:
+            pos = self.position
+        match = bytes_pattern(pattern).match(self.buffer, pos, self.end)
+        if match is None or self.binary:
+            return match
+        return BytesMatch(match, self.encoding)
+
+    def match_rest(self, pattern, pos=None):
+        if pos is None:
+            pos = self.position
+        match = bytes_pattern(pattern).match(self.buffer[pos:self.end])
+        if match is None:
+            return None
+        if self.binary:
+            return StreamMatch(match, pos)
+        return BytesMatch(match, self.encoding, pos)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            pos = self.position + key
+            if not self.start <= pos < self.end:
+                raise ParseException('Unexpected end of buffer at {buffer}', buffer=self, position=pos)
+            return self.peek(pos)
+        if isinstance(key, slice):
+            start = self.start if key.start is None else self.position + key.start
+            if key.stop is None:
+                stop = self.end
+            elif key.stop < 0:
+                stop = self.end + key.stop
+            else:
+                stop = min(self.position + key.stop, self.end)
+            text = self.text(start, stop)[::key.step]
+            if self.binary:
+                return BytesBuffer(text)
+            return Buffer(text)
+        raise TypeError('Unknown key {key!r}'.format(key=key))
+
+    def describe(self, position):
+        """
+        Renders the text around ``position`` (a whole file is too much for an
+        error message).
+        """
+        return '{type.__name__}({0!r} + {1!r})'.format(
+            self.text(max(self.start, position - 40), position),
+            self.text(position, min(self.end, position + 40)),
+            type=type(self),
+            )
+
+    def __str__(self):
+        return self.buffer[self.start:self.end].decode(self.encoding or 'latin-1')
+
+    def __bytes__(self):
+        return bytes(self.buffer[self.start:self.end])
+
+
+class MmapBuffer(BytesBuffer):
+    """
+    A BytesBuffer over a memory-mapped file, for inputs that are too big to
+    read into a string.  The file is not read up front: the OS loads the
+    pages that the matchers look at.  ``file`` is a path, a file object that
+    was opened in binary mode, or an ``mmap``.
+
+    Unlike a BytesBuffer, results are decoded ('latin-1' by default); pass
+    ``encoding=None`` for bytes.
+    """
+    def __init__(self, file, start=0, end=None, memo=None, spans=False, encoding='latin-1', debug_marks=False):
+        if isinstance(file, (mmap.mmap, bytes)):
+            mapped = file
+        elif hasattr(file, 'fileno'):
+            mapped = self.map(file)
+        else:
+            with open(file, 'rb') as f:
+                mapped = self.map(f)
+        super(MmapBuffer, self).__init__(mapped, start, end, memo=memo, spans=spans, encoding=encoding,
+            debug_marks=debug_marks)
+
+    @staticmethod
+    def map(f):
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file cannot be mapped
+            return b''
+
+    def close(self):
+        """
+        Closes the mapping.  Results that refer to the file (Spans) can't be
+        read afterwards.
+        """
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def to_buffer(text):
+    """
+    Wraps ``text`` in a Buffer, or a BytesBuffer if it is bytes-like.
+    """
+    if isinstance(text, Buffer):
+        return text
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        return BytesBuffer(text)
+    return Buffer(text)
+
+
+def pattern_reach(pattern):
+    """
+    Returns ``(reach, run)`` for a compiled regular expression.  ``reach`` is
+    how many characters past the start a match can look at (including
+    lookaheads, and one more for ``\\Z``), or None if there is no limit.
+    ``run`` is the minimum length if the pattern is a repeated character
+    class (like ``Chars``), which stops at the first character that doesn't
+    match; otherwise it is None.  Other unbounded patterns need the rest of
+    the input.
+    """
+    reach = PATTERN_REACHES.get(pattern)
+    if reach is None:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags).data
+        furthest = subpattern_reach(parsed)[1]
+        reach = PATTERN_REACHES[pattern] = (None if furthest is None else furthest + 1, character_run(parsed))
+    return reach
+
+
+def subpattern_reach(items):
+    """
+    Returns the width of a parsed regular expression, and how far it can look
+    ahead (None if there is no limit).
+    """
+    c = sre_constants
+    width = furthest = 0
+    for op, av in items:
+        if op in (c.LITERAL, c.NOT_LITERAL, c.IN, c.ANY):
+            width += 1
+        elif op is c.AT:
+            pass
+        elif op in (c.MAX_REPEAT, c.MIN_REPEAT) or op is getattr(c, 'POSSESSIVE_REPEAT', None):
+            minimum, maximum, sub = av
+            sub_width, sub_furthest = subpattern_reach(sub)
+            if maximum == c.MAXREPEAT or sub_furthest is None:
+                return None, None
+            furthest = max(furthest, width + (maximum - 1) * sub_width + sub_furthest)
+            width += maximum * sub_width
+            continue
+        elif op is c.SUBPATTERN or op is getattr(c, 'ATOMIC_GROUP', None):
+            sub_width, sub_furthest = subpattern_reach(av if op is not c.SUBPATTERN else av[-1])
+            if sub_furthest is None:
+                return None, None
+            furthest = max(furthest, width + sub_furthest)
+            width += sub_width
+            continue
+        elif op is c.BRANCH:
+            reaches = [subpattern_reach(branch) for branch in av[1]]
+            if any(sub_furthest is None for _, sub_furthest in reaches):
+                return None, None
+            furthest = max(furthest, width + max(sub_furthest for _, sub_furthest in reaches))
+            width += max(sub_width for sub_width, _ in reaches)
+            continue
+        elif op in (c.ASSERT, c.ASSERT_NOT):
+            direction, sub = av
+            if direction > 0:
+                sub_furthest = subpattern_reach(sub)[1]
+                if sub_furthest is None:
+                    return None, None
+                furthest = max(furthest, width + sub_furthest)
+            continue
+        else:
+            # group references, conditionals
+            return None, None
+        furthest = max(furthest, width)
+    return width, furthest
+
+
+def character_run(items):
+    """
+    The minimum length, if ``items`` is a single character class that is
+    repeated greedily, otherwise None.
+    """
+    c = sre_constants
+    if len(items) != 1 or items[0][0] is not c.MAX_REPEAT:
+        return None
+    minimum, maximum, sub = items[0][1]
+    while len(sub) == 1 and sub[0][0] is c.SUBPATTERN and sub[0][1][0] is None:
+        sub = sub[0][1][-1]
+    if len(sub) == 1 and sub[0][0] in (c.LITERAL, c.NOT_LITERAL, c.IN, c.ANY):
+        return minimum
+    return None
+
+
+def looks_behind(pattern):
+    """
+    Whether a compiled regular expression looks at the text before the
+    position where it is matched: ``^``, ``\\A``, ``\\b``, ``\\B`` and
+    lookbehinds.  See ``Buffer.match_rest``.
+    """
+    return subpattern_looks_behind(sre_parse.parse(pattern.pattern, pattern.flags).data)
+
+
+def subpattern_looks_behind(items):
+    c = sre_constants
+    for op, av in items:
+        if op is c.AT:
+            if av not in (c.AT_END, c.AT_END_LINE, c.AT_END_STRING):
+                return True
+        elif op in (c.ASSERT, c.ASSERT_NOT):
+            direction, sub = av
+            if direction < 0 or subpattern_looks_behind(sub):
+                return True
+        elif op in (c.MAX_REPEAT, c.MIN_REPEAT) or op is getattr(c, 'POSSESSIVE_REPEAT', None):
+            if subpattern_looks_behind(av[2]):
+                return True
+        elif op is c.SUBPATTERN:
+            if subpattern_looks_behind(av[-1]):
+                return True
+        elif op is getattr(c, 'ATOMIC_GROUP', None):
+            if subpattern_looks_behind(av):
+                return True
+        elif op is c.BRANCH:
+            if any(subpattern_looks_behind(branch) for branch in av[1]):
+                return True
+        elif op is c.GROUPREF_EXISTS:
+            if any(sub is not None and subpattern_looks_behind(sub) for sub in av[1:]):
+                return True
+    return False
+
+
+def bytes_pattern(pattern):
+    """
+    Returns ``pattern`` (a compiled regular expression for strings) compiled
+    for bytes, where every character of the pattern is one byte.  Patterns
+    with characters that are not in latin-1 raise a ValueError.
+    """
+    compiled = BYTES_PATTERNS.get(pattern)
+    if compiled is None:
+        try:
+            source = pattern.pattern.encode('latin-1')
+        except UnicodeEncodeError:
+            raise ValueError('{0!r} cannot be matched against bytes'.format(pattern.pattern))
+        compiled = BYTES_PATTERNS[pattern] = re.compile(source, pattern.flags & ~re.UNICODE)
+    return compiled
+
+
+class BytesMatch(StreamMatch):
+    """
+    A regular expression match in a BytesBuffer with an ``encoding``.  It
+    works like the ``re`` match, but the groups are decoded.
+    """
+    __slots__ = ('encoding',)
+
+    def __init__(self, match, encoding, base=0):
+        super(BytesMatch, self).__init__(match, base)
+        self.encoding = encoding
+
+    def decode(self, value):
+        return value if value is None else value.decode(self.encoding)
+
+    def group(self, *groups):
+        value = self.match.group(*groups)
+        if isinstance(value, tuple):
+            return tuple(self.decode(item) for item in value)
+        return self.decode(value)
+
+    def groups(self, default=None):
+        return tuple(self.decode(value) if value is not None else default for value in self.match.groups())
+
+    def groupdict(self, default=None):
+        return dict((name, self.decode(value) if value is not None else default)
+            for name, value in self.match.groupdict().items())
+
+    def __getitem__(self, group):
+        return self.decode(self.match[group])
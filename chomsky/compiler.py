@@ -0,0 +1,613 @@
+import itertools
+import re
+
+from .matchers import (
+    FAIL, Matcher, GrammarType, Literal, Char, OneOf, Chars, Whitespace,
+    AutoSequence, Sequence, NMatches, ZeroOrMore, Optional, OneOrMore, Exactly,
+    AutoAny, Any, Commit, Group, NextIs, NextIsNot, StringStart, StringEnd,
+    Later, Slice, Discard, reaches_commit,
+    )
+from .result_list import ResultList, Span
+
+__all__ = ['Compiled']
+
+
+'Compiled code objects, by source, so that the same source is only compiled once'
+CODE_CACHE = {}
+
+'Python limits the number of nested loops in a function to 20'
+MAX_LOOPS = 16
+
+'... and the number of indentation levels to 100'
+MAX_INDENT = 80
+
+SEQUENCES = (AutoSequence, Sequence)
+REPETITIONS = (NMatches, ZeroOrMore, Optional, OneOrMore, Exactly)
+ALTERNATIVES = (AutoAny, Any)
+CHARS = (Chars, Whitespace)
+
+
+class Compiled(Matcher):
+    """
+    A Matcher (or Grammar) that was compiled to Python source with
+    ``compile()``.  It matches exactly like the original, but runs one
+    generated function per Grammar, with the matchers inlined: positions are
+    local integers, sequences are straight-line code and alternatives are
+    ``if`` chains.  ``source`` is the generated code.
+
+    The generated code reads the buffer's string directly, so buffers that
+    don't hold the input as a string (``StreamBuffer``, ``BytesBuffer``) are
+    matched by the original matcher.
+    """
+    def __init__(self, matcher, source, function, **kwargs):
+        self.matcher = matcher
+        self.source = source
+        self.function = function
+        super(Compiled, self).__init__(**kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, Compiled) and self.matcher == other.matcher \
+            and super(Compiled, self).__eq__(other)
+
+    def __repr__(self, args_only=False):
+        args = ['{self.matcher!r}'.format(self=self)]
+        args.extend(super(Compiled, self).__repr__(args_only=True))
+        if args_only:
+            return args
+        return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
+
+    def match(self, buffer, pos, out):
+        if not buffer.in_memory:
+            return self.matcher.match(buffer, pos, out)
+        return self.function(buffer, pos, out)
+
+    def analysis(self):
+        return self.matcher.analysis()
+
+
+class Compiler(object):
+    """
+    Generates the Python source for a matcher graph.  Every Grammar gets a
+    ``rule`` function, and every other matcher is inlined into the function
+    of the Grammar that uses it.  Matchers that the compiler doesn't know
+    (custom matchers, and the more exotic built-ins) are called through their
+    ``match`` method.
+
+    The inlined code for a matcher reads the position from one local variable,
+    and stores the end position (or -1) in another.  Like ``match()``, it only
+    appends to the results when it succeeds.
+    """
+    def __init__(self):
+        self.ids = itertools.count()
+        self.namespace = {'ResultList': ResultList, 'Span': Span}
+        self.constants = {}
+        self.rules = {}
+        self.pending = []
+        self.functions = []
+
+    def compile(self, matcher):
+        entry = self.entry(matcher)
+        while self.pending:
+            self.function(*self.pending.pop(0))
+        source = '\n\n'.join(self.functions) + '\n'
+        code = CODE_CACHE.get(source)
+        if code is None:
+            code = CODE_CACHE[source] = compile(source, '<chomsky {0!r}>'.format(matcher), 'exec')
+        exec(code, self.namespace)
+        return Compiled(matcher, source, self.namespace[entry])
+
+    def var(self, prefix):
+        return '{0}{1}'.format(prefix, next(self.ids))
+
+    def constant(self, value):
+        name = self.constants.get(id(value))
+        if name is None:
+            name = self.constants[id(value)] = self.var('c')
+            self.namespace[name] = value
+        return name
+
+    def entry(self, matcher):
+        if isinstance(matcher, GrammarType):
+            return self.rule(matcher)
+        name = self.var('match')
+        self.pending.append((name, None, matcher))
+        return name
+
+    def rule(self, grammar, recognize=False):
+        """
+        Returns the name of the function for the Grammar, and queues the
+        function to be generated.  If ``recognize`` is True, the function
+        doesn't collect results (when the Grammar has a variant like that).
+        """
+        recognize = recognize and self.recognizes(grammar)
+        name = self.rules.get((id(grammar), recognize))
+        if name is None:
+            name = self.var('rule') + '_' + grammar.__name__
+            if recognize:
+                name += '_recognize'
+            self.rules[(id(grammar), recognize)] = name
+            self.pending.append((name, grammar, grammar.grammar, recognize))
+        return name
+
+    def recognizes(self, grammar):
+        """
+        Grammars that match their ``grammar`` get a second function that
+        doesn't build any results, unless they need the parsed text to check
+        ``is_bad_grammar``.
+        """
+        return bool(grammar.grammar) and not getattr(grammar, 'custom_consume', False) \
+            and grammar.is_bad_grammar is None
+
+    def function(self, name, grammar, matcher, recognize=False):
+        lines = ['def {0}(buffer, pos, out):'.format(name)]
+        indent = '    '
+        if grammar is not None and (getattr(grammar, 'custom_consume', False) or not grammar.grammar):
+            lines.append(indent + 'return {0}.match(buffer, pos, out)'.format(self.constant(grammar)))
+            self.functions.append('\n'.join(lines))
+            return
+
+        if grammar is not None and grammar.memoize and not recognize:
+            lines.append(indent + 'return buffer.memo.match({0}, {1}_uncached, buffer, pos, out)'.format(
+                self.constant(grammar), name))
+            self.functions.append('\n'.join(lines))
+            lines = ['def {0}_uncached(buffer, pos, out):'.format(name)]
+
+        if grammar is not None and not recognize and self.recognizes(grammar):
+            lines.append(indent + 'if out is None:')
+            lines.append(indent + '    return {0}(buffer, pos, None)'.format(self.rule(grammar, recognize=True)))
+
+        lines.append(indent + 'text = buffer.buffer')
+        lines.append(indent + 'start = buffer.start')
+        lines.append(indent + 'stop = buffer.end')
+        lines.append(indent + 'span = buffer.span')
+        if grammar is None:
+            self.emit(matcher, lines, indent, 'pos', 'end', 'out', 0, nullable_out=True)
+            lines.append(indent + 'return end')
+            self.functions.append('\n'.join(lines))
+            return
+
+        cls = self.constant(grammar)
+        # the same check as can_start(), with the analysis filled in
+        analysis = grammar.analysis()
+        if not analysis.nullable:
+            test = 'stop - pos < {0}'.format(analysis.minimum_length)
+            if analysis.first is not None:
+                test += ' or (text[pos] if pos < stop else \'\') not in {0}'.format(self.constant(analysis.first))
+            lines.append(indent + 'if {0}:'.format(test))
+            lines.append(indent + '    return -1')
+        values = None if recognize else 'values'
+        if values:
+            lines.append(indent + 'values = []')
+        if grammar.ignore_whitespace and grammar.skip_whitespace_first():
+            # skip the whitespace, and then match the grammar once
+            self.emit(grammar.whitespace, lines, indent, 'pos', 't', None, 0)
+            lines.append(indent + 'if t < 0:')
+            lines.append(indent + '    t = pos')
+            self.emit(grammar.grammar, lines, indent, 't', 'end', values, 0)
+        elif grammar.ignore_whitespace:
+            # match the grammar, and then again after the whitespace
+            lines.append(indent + 't = pos')
+            lines.append(indent + 'while True:')
+            body = indent + '    '
+            self.emit(grammar.grammar, lines, body, 't', 'end', values, 1)
+            lines.append(body + 'if end >= 0 or t != pos:')
+            lines.append(body + '    break')
+            self.emit(grammar.whitespace, lines, body, 'pos', 't', None, 1)
+            lines.append(body + 'if t <= pos:')
+            lines.append(body + '    break')
+        else:
+            self.emit(grammar.grammar, lines, indent, 'pos', 'end', values, 0)
+        lines.append(indent + 'if end < 0:')
+        lines.append(indent + '    return -1')
+        if recognize:
+            lines.append(indent + 'return end')
+            self.functions.append('\n'.join(lines))
+            return
+        lines.append(indent + 'parsed = values[0] if values else None')
+        if grammar.is_bad_grammar is not None:
+            lines.append(indent + 'if {0}.is_bad_grammar(str(parsed)):'.format(cls))
+            lines.append(indent + '    return -1')
+        lines.append(indent + 'if out is not None:')
+        if type(grammar).from_parsed is GrammarType.from_parsed:
+            lines.append(indent + '    instance = {0}.__new__({0})'.format(cls))
+            lines.append(indent + '    instance.buffer = buffer')
+            lines.append(indent + '    instance.parsed = parsed')
+            lines.append(indent + '    out.append(instance)')
+        else:
+            lines.append(indent + '    out.append({0}.from_parsed(buffer, parsed))'.format(cls))
+        lines.append(indent + 'return end')
+        self.functions.append('\n'.join(lines))
+
+    def emit(self, node, lines, indent, pos, end, out, loops, nullable_out=False):
+        """
+        Appends the code for ``node`` to ``lines``.  ``out`` is the name of the
+        results list, or None if the results are not collected.  If
+        ``nullable_out`` is True, the ``out`` variable itself might be None.
+        """
+        if isinstance(node, Later) and not node.args and not node.kwargs:
+            node = GrammarType.types.get(node.grammar_type, node)
+
+        kind = type(node)
+        if loops >= MAX_LOOPS or len(indent) >= MAX_INDENT * 4:
+            return self.emit_call(node, lines, indent, pos, end, out)
+        if isinstance(node, Matcher) and node.custom_consume:
+            # a custom consume, whatever class the matcher extends
+            return self.emit_call(node, lines, indent, pos, end, out)
+        if isinstance(node, GrammarType):
+            lines.append(indent + '{end} = {rule}(buffer, {pos}, {out})'.format(
+                end=end, rule=self.rule(node, recognize=out is None and not node.memoize), pos=pos, out=out))
+            return
+
+        if nullable_out and out is not None and kind not in (Literal, Char, OneOf) + CHARS:
+            # the inlined code appends to the list, so make sure there is one
+            lines.append(indent + 'if {out} is None:'.format(out=out))
+            self.emit(node, lines, indent + '    ', pos, end, None, loops)
+            lines.append(indent + 'else:')
+            self.emit(node, lines, indent + '    ', pos, end, out, loops)
+            return
+
+        append = indent + 'if {end} >= 0:'.format(end=end)
+        if out is not None and nullable_out:
+            append = indent + 'if {end} >= 0 and {out} is not None:'.format(end=end, out=out)
+
+        if kind is Literal:
+            literal = self.constant(node.literal)
+            lines.append(indent + '{end} = {pos} + {length} if text.startswith({literal}, {pos}, stop) else -1'.format(
+                end=end, pos=pos, length=len(node.literal), literal=literal))
+            if out is not None:
+                lines.append(append)
+                lines.append(indent + '    {out}.append({literal})'.format(out=out, literal=literal))
+        elif kind is Char:
+            if node.charset is None:
+                test = ''
+            else:
+                test = ' and text[{pos}] {op} {charset}'.format(
+                    pos=pos, op='not in' if node.inverse else 'in', charset=self.constant(node.charset))
+            lines.append(indent + '{end} = {pos} + 1 if {pos} < stop{test} else -1'.format(end=end, pos=pos, test=test))
+            if out is not None:
+                lines.append(append)
+                # (``pos`` and ``end`` can be the same variable)
+                lines.append(indent + '    {out}.append(text[{end} - 1])'.format(out=out, end=end))
+        elif kind in CHARS or (kind is OneOf and node.literals):
+            if kind is OneOf:
+                literals = sorted(set(node.literals), key=len, reverse=True)
+                scanner = re.compile('|'.join(re.escape(literal) for literal in literals))
+            else:
+                scanner = node.scanner
+            self.emit_scanner(scanner, lines, indent, pos, end, out, append, kind is not OneOf)
+        elif kind in SEQUENCES and not any(isinstance(m, Commit) for m in node.matchers):
+            self.emit_sequence(node, lines, indent, pos, end, out, loops)
+        elif kind is Optional and out is None and type(node.matcher) in CHARS:
+            # skipping whitespace is one regex call
+            match = self.var('m')
+            lines.append(indent + '{match} = {scanner}.match(text, {pos}, stop)'.format(
+                match=match, scanner=self.constant(node.matcher.scanner), pos=pos))
+            lines.append(indent + '{end} = {pos} if {match} is None else {match}.end()'.format(
+                end=end, pos=pos, match=match))
+        elif kind in REPETITIONS:
+            self.emit_repetition(node, lines, indent, pos, end, out, loops)
+        elif kind in ALTERNATIVES:
+            self.emit_alternatives(node, lines, indent, pos, end, out, loops)
+        elif kind is Group:
+            self.emit_group(node, lines, indent, pos, end, out, loops)
+        elif kind is Slice and (node.projection if node.projection is not None else node.build_projection()):
+            self.emit_slice(node, lines, indent, pos, end, out, loops)
+        elif kind is Discard:
+            self.emit(node.matcher, lines, indent, pos, end, None, loops)
+        elif kind is NextIs or kind is NextIsNot:
+            result = self.var('t')
+            if reaches_commit(node.matcher):
+                # the lookahead is a choice point, see Buffer.choices
+                lines.append(indent + 'buffer.choices += 1')
+                lines.append(indent + 'try:')
+                self.emit(node.matcher, lines, indent + '    ', pos, result, None, loops)
+                lines.append(indent + 'finally:')
+                lines.append(indent + '    buffer.choices -= 1')
+            else:
+                self.emit(node.matcher, lines, indent, pos, result, None, loops)
+            lines.append(indent + '{end} = {pos} if {result} {op} 0 else -1'.format(
+                end=end, pos=pos, result=result, op='>=' if kind is NextIs else '<'))
+        elif kind is StringStart:
+            lines.append(indent + '{end} = {pos} if {pos} == start else -1'.format(end=end, pos=pos))
+        elif kind is StringEnd:
+            lines.append(indent + '{end} = {pos} if {pos} == stop else -1'.format(end=end, pos=pos))
+        else:
+            self.emit_call(node, lines, indent, pos, end, out)
+
+    def emit_call(self, node, lines, indent, pos, end, out):
+        lines.append(indent + '{end} = {node}.match(buffer, {pos}, {out})'.format(
+            end=end, node=self.constant(node), pos=pos, out=out))
+
+    def emit_scanner(self, scanner, lines, indent, pos, end, out, append, source=True):
+        """
+        Matches a regex.  The result is ``span()`` of the matched text, or the
+        matched string if ``source`` is False.
+        """
+        match = self.var('m')
+        lines.append(indent + '{match} = {scanner}.match(text, {pos}, stop)'.format(
+            match=match, scanner=self.constant(scanner), pos=pos))
+        lines.append(indent + '{end} = -1 if {match} is None else {match}.end()'.format(end=end, match=match))
+        if out is not None:
+            lines.append(append)
+            if source:
+                lines.append(indent + '    {out}.append(span({match}.start(), {match}.end()))'.format(out=out, match=match))
+            else:
+                lines.append(indent + '    {out}.append({match}.group())'.format(out=out, match=match))
+
+    def emit_group(self, node, lines, indent, pos, end, out, loops):
+        scanner = node.scanner
+        if scanner is None:
+            scanner = node.build_scanner()
+        if scanner and not node.skipped:
+            return self.emit_scanner(scanner, lines, indent, pos, end, out, indent + 'if {end} >= 0:'.format(end=end))
+        if scanner:
+            # the suppressed text is removed from the result
+            lines.append(indent + '{end} = {node}.match_scanner(buffer, {pos}, {out})'.format(
+                end=end, node=self.constant(node), pos=pos, out=out))
+            return
+        if out is None:
+            return self.emit(node.matcher, lines, indent, pos, end, None, loops)
+        values = self.var('v')
+        lines.append(indent + '{values} = []'.format(values=values))
+        self.emit(node.matcher, lines, indent, pos, end, values, loops)
+        lines.append(indent + 'if {end} >= 0:'.format(end=end))
+        lines.append(indent + '    {values} = {values}[0] if {values} else \'\''.format(values=values))
+        lines.append(indent + '    {out}.append({values} if isinstance({values}, (str, Span)) else str({values}))'.format(
+            out=out, values=values))
+
+    def emit_slice(self, node, lines, indent, pos, end, out, loops):
+        # the projection only adds the values that the slice keeps
+        if out is None:
+            return self.emit(node.projection, lines, indent, pos, end, None, loops)
+        values = self.var('v')
+        lines.append(indent + '{values} = []'.format(values=values))
+        self.emit(node.projection, lines, indent, pos, end, values, loops)
+        lines.append(indent + 'if {end} >= 0:'.format(end=end))
+        lines.append(indent + '    {out}.append({node}.project({values}[0]))'.format(
+            out=out, node=self.constant(node), values=values))
+
+    def emit_alternatives(self, node, lines, indent, pos, end, out, loops):
+        # the same alternatives that the dispatch table would try
+        start = self.var('p')
+        lines.append(indent + '{start} = {pos}'.format(start=start, pos=pos))
+        lines.append(indent + '{end} = -1'.format(end=end))
+        char = None
+        matchers = node.matchers
+        # the alternatives before the last one are choice points, see
+        # Buffer.choices (only counted when a Commit could see them)
+        choices = len(matchers) > 1 and any(reaches_commit(m) for m in matchers[:-1])
+        body = indent
+        for index, matcher in enumerate(matchers):
+            if choices and index == 0:
+                lines.append(indent + 'buffer.choices += 1')
+                lines.append(indent + 'try:')
+                body = indent + '    '
+            elif choices and index == len(matchers) - 1:
+                lines.append(indent + 'finally:')
+                lines.append(indent + '    buffer.choices -= 1')
+                body = indent
+            analysis = matcher.analysis()
+            test = '{end} < 0'.format(end=end)
+            if not analysis.nullable and analysis.first is not None:
+                if char is None:
+                    char = self.var('ch')
+                    lines.append(body + '{char} = text[{start}] if {start} < stop else \'\''.format(char=char, start=start))
+                test += ' and {char} in {first}'.format(char=char, first=self.constant(analysis.first))
+            lines.append(body + 'if {test}:'.format(test=test))
+            self.emit(matcher, lines, body + '    ', start, end, out, loops)
+
+    def emit_repetition(self, node, lines, indent, pos, end, out, loops):
+        count = self.var('n')
+        start = self.var('p')
+        result = self.var('t')
+        values = None
+        lines.append(indent + '{count} = 0'.format(count=count))
+        lines.append(indent + '{start} = {pos}'.format(start=start, pos=pos))
+        if out is not None:
+            values = self.var('v')
+            lines.append(indent + '{values} = ResultList()'.format(values=values))
+        if node.max is None:
+            lines.append(indent + 'while True:')
+        else:
+            lines.append(indent + 'while {count} < {max}:'.format(count=count, max=node.max))
+        body = indent + '    '
+        self.emit(node.matcher, lines, body, start, result, values, loops + 1)
+        lines.append(body + 'if {result} < 0:'.format(result=result))
+        lines.append(body + '    break')
+        lines.append(body + '{count} += 1'.format(count=count))
+        # an empty match will always match again
+        lines.append(body + 'if {result} == {start}:'.format(result=result, start=start))
+        lines.append(body + '    break')
+        lines.append(body + '{start} = {result}'.format(start=start, result=result))
+        lines.append(indent + '{end} = {start} if {count} >= {min} else -1'.format(
+            end=end, start=start, count=count, min=node.min or 0))
+        if out is not None:
+            lines.append(indent + 'if {end} >= 0:'.format(end=end))
+            lines.append(indent + '    {out}.append({values})'.format(out=out, values=values))
+
+    def emit_sequence(self, node, lines, indent, pos, end, out, loops):
+        values = None
+        if out is not None:
+            values = self.var('v')
+            lines.append(indent + '{values} = ResultList()'.format(values=values))
+        current = self.var('t')
+        lines.append(indent + '{current} = {pos}'.format(current=current, pos=pos))
+        self.emit_items(node, node.matchers, lines, indent, current, values, loops)
+        lines.append(indent + '{end} = {current}'.format(end=end, current=current))
+        if out is not None:
+            lines.append(indent + 'if {end} >= 0:'.format(end=end))
+            lines.append(indent + '    {out}.append({values})'.format(out=out, values=values))
+
+    def emit_items(self, node, matchers, lines, indent, current, values, loops):
+        """
+        Emits the items of a sequence.  Items that can give back part of their
+        match (``rollback_match``) loop over their possible end positions,
+        and the rest of the sequence is emitted inside that loop.
+        """
+        separated_by = node.separated_by
+        offset = len(node.matchers) - len(matchers)
+        for index, matcher in enumerate(matchers):
+            lines.append(indent + 'if {current} >= 0:'.format(current=current))
+            body = indent + '    '
+            if separated_by is not None and values is not None:
+                # the separator is matched once there are values
+                lines.append(body + 'if {values}:'.format(values=values))
+                self.emit(separated_by, lines, body + '    ', current, current,
+                    None if separated_by.suppress else values, loops)
+                lines.append(body + 'if {current} >= 0:'.format(current=current))
+                body += '    '
+            elif separated_by is not None and any(not m.suppress and m.produces_result
+                                                  for m in node.matchers[:offset + index]):
+                # (the same count that AutoSequence uses when it isn't collecting)
+                self.emit(separated_by, lines, body, current, current, None, loops)
+                lines.append(body + 'if {current} >= 0:'.format(current=current))
+                body += '    '
+
+            item_out = None if matcher.suppress else values
+            if type(matcher) is Discard:
+                matcher = matcher.matcher
+            rest = matchers[index + 1:]
+            if rest and loops + 1 < MAX_LOOPS and self.can_rollback(matcher):
+                self.emit_rollback(node, matcher, rest, lines, body, current, values, item_out, loops)
+                return
+            self.emit(matcher, lines, body, current, current, item_out, loops)
+
+    def can_rollback(self, matcher):
+        if isinstance(matcher, GrammarType):
+            return False
+        kind = type(matcher)
+        if kind in CHARS or kind in REPETITIONS:
+            return True
+        return kind.rollback_match is not Matcher.rollback_match
+
+    def emit_rollback(self, node, matcher, rest, lines, indent, current, values, item_out, loops):
+        kind = type(matcher)
+        start = self.var('p')
+        before = self.var('b')
+        lines.append(indent + '{start} = {current}'.format(start=start, current=current))
+        if values is not None:
+            lines.append(indent + '{before} = len({values})'.format(before=before, values=values))
+
+        if kind in CHARS:
+            match = self.var('m')
+            lines.append(indent + '{match} = {scanner}.match(text, {start}, stop)'.format(
+                match=match, scanner=self.constant(matcher.scanner), start=start))
+            lines.append(indent + 'if {match} is None:'.format(match=match))
+            lines.append(indent + '    {current} = -1'.format(current=current))
+            lines.append(indent + 'else:')
+            indent += '    '
+            candidate = self.var('e')
+            # Chars gives back one character at a time
+            lines.append(indent + 'for {candidate} in range({match}.end(), {start} + {min} - 1, -1):'.format(
+                candidate=candidate, match=match, start=start, min=matcher.min))
+            body = indent + '    '
+            self.emit_viable(node, rest, lines, body, candidate)
+            if values is not None:
+                lines.append(body + 'del {values}[{before}:]'.format(values=values, before=before))
+            if item_out is not None:
+                lines.append(body + '{values}.append(span({start}, {candidate}))'.format(
+                    values=values, start=start, candidate=candidate))
+        elif kind in REPETITIONS:
+            ends = self.var('ends')
+            sizes = self.var('sizes')
+            result = self.var('t')
+            matched = None
+            lines.append(indent + '{ends} = [{start}]'.format(ends=ends, start=start))
+            if item_out is not None:
+                matched = self.var('v')
+                lines.append(indent + '{matched} = ResultList()'.format(matched=matched))
+                lines.append(indent + '{sizes} = [0]'.format(sizes=sizes))
+            if matcher.max is None:
+                lines.append(indent + 'while True:')
+            else:
+                lines.append(indent + 'while len({ends}) <= {max}:'.format(ends=ends, max=matcher.max))
+            body = indent + '    '
+            self.emit(matcher.matcher, lines, body, ends + '[-1]', result, matched, loops + 1)
+            lines.append(body + 'if {result} < 0:'.format(result=result))
+            lines.append(body + '    break')
+            lines.append(body + '{ends}.append({result})'.format(ends=ends, result=result))
+            if matched is not None:
+                lines.append(body + '{sizes}.append(len({matched}))'.format(sizes=sizes, matched=matched))
+            lines.append(body + 'if {result} == {ends}[-2]:'.format(result=result, ends=ends))
+            lines.append(body + '    break')
+            lines.append(indent + 'if len({ends}) <= {min}:'.format(ends=ends, min=matcher.min or 0))
+            lines.append(indent + '    {current} = -1'.format(current=current))
+            lines.append(indent + 'else:')
+            indent += '    '
+            count = self.var('k')
+            # NMatches gives back one match at a time
+            lines.append(indent + 'for {count} in range(len({ends}) - 1, {min} - 1, -1):'.format(
+                count=count, ends=ends, min=matcher.min or 0))
+            body = indent + '    '
+            # (after an empty match, giving back the empty match ends at the same position)
+            lines.append(body + 'if {count} < len({ends}) - 1 and {ends}[{count}] == {ends}[-1]:'.format(
+                count=count, ends=ends))
+            lines.append(body + '    continue')
+            candidate = ends + '[' + count + ']'
+            self.emit_viable(node, rest, lines, body, candidate)
+            if values is not None:
+                lines.append(body + 'del {values}[{before}:]'.format(values=values, before=before))
+            if item_out is not None:
+                lines.append(body + '{values}.append(ResultList({matched}[:{sizes}[{count}]]))'.format(
+                    values=values, matched=matched, sizes=sizes, count=count))
+        else:
+            candidate = self.var('e')
+            matched = self.var('v')
+            lines.append(indent + '{matched} = []'.format(matched=matched))
+            lines.append(indent + '{candidate} = {matcher}.match(buffer, {start}, {out})'.format(
+                candidate=candidate, matcher=self.constant(matcher), start=start,
+                out=matched if item_out is not None else None))
+            lines.append(indent + 'while {candidate} >= 0:'.format(candidate=candidate))
+            body = indent + '    '
+            if values is not None:
+                lines.append(body + 'del {values}[{before}:]'.format(values=values, before=before))
+            if item_out is not None:
+                lines.append(body + '{values}.extend({matched})'.format(values=values, matched=matched))
+
+        lines.append(body + '{current} = {candidate}'.format(current=current, candidate=candidate))
+        self.emit_items(node, rest, lines, body, current, values, loops + 1)
+        lines.append(body + 'if {current} >= 0:'.format(current=current))
+        lines.append(body + '    break')
+        if kind not in CHARS and kind not in REPETITIONS:
+            result = self.var('r')
+            lines.append(body + '{result} = {matched}[0] if {matched} else None'.format(result=result, matched=matched))
+            lines.append(body + '{matched} = []'.format(matched=matched))
+            lines.append(body + '{candidate} = {matcher}.rollback_match(buffer, {start}, {candidate}, {result}, {out})'.format(
+                candidate=candidate, matcher=self.constant(matcher), start=start, result=result,
+                out=matched if item_out is not None else None))
+        lines.append(indent + 'else:')
+        lines.append(indent + '    {current} = -1'.format(current=current))
+
+
+    def emit_viable(self, node, rest, lines, indent, candidate):
+        """
+        Skips the end positions where the next matcher cannot start (see
+        ``AutoSequence.viable_ends``).
+        """
+        if node.separated_by is not None:
+            return
+        follower = rest[0]
+        if type(follower) is Literal:
+            lines.append(indent + 'if not text.startswith({literal}, {candidate}, stop):'.format(
+                literal=self.constant(follower.literal), candidate=candidate))
+            lines.append(indent + '    continue')
+            return
+        analysis = follower.analysis()
+        if analysis.nullable or analysis.first is None:
+            return
+        lines.append(indent + 'if {candidate} >= stop or text[{candidate}] not in {first}:'.format(
+            candidate=candidate, first=self.constant(analysis.first)))
+        lines.append(indent + '    continue')
+
+
+def compile_matcher(matcher, backend='python'):
+    """
+    Compiles a Matcher or Grammar to Python source (see ``Compiled``), or to a
+    parsing machine if ``backend`` is 'machine' (see ``machine.Program``).
+    """
+    if backend == 'python':
+        return Compiler().compile(matcher)
+    if backend == 'machine':
+        from .machine import assemble
+        return assemble(matcher)
+    raise ValueError('Unknown backend {backend!r}'.format(backend=backend))
@@ -1,7 +1,95 @@
+__all__ = [
+    'ParseException', 'CommitException', 'Backtrack', 'BACKTRACK',
+    'backtrack', 'RollbackException'
+    ]
 
 
 class ParseException(Exception):
-    pass
+    """
+    Raised when a Matcher or Grammar cannot consume the buffer.
+
+    Failures are the common case during parsing (every alternative that
+    doesn't match raises one), so the message is not built until someone asks
+    for it.  Matchers pass themselves, the buffer and the position; ``message``
+    is a format string that can refer to ``matcher``, ``buffer`` (which is
+    rendered as it looked at ``position``), ``line`` and ``column``.  After the
+    first line of the input, the line and column are added to the message.
+    """
+    default_message = 'Expected {matcher!r} at {buffer}'
+    location_message = ' (line {line}, column {column})'
+
+    def __init__(self, message=None, matcher=None, buffer=None, position=None):
+        if matcher is None and buffer is None:
+            super(ParseException, self).__init__(message)
+        else:
+            super(ParseException, self).__init__()
+        self.matcher = matcher
+        self.buffer = buffer
+        if position is None and buffer is not None:
+            position = buffer.position
+        self.position = position
+        self._message = message
+        self._rendered = None
+
+    @property
+    def message(self):
+        if self._rendered is None:
+            if self.matcher is None and self.buffer is None:
+                self._rendered = '' if self._message is None else str(self._message)
+            else:
+                message = self.default_message if self._message is None else self._message
+                line, column = self.line_col()
+                if self.buffer is not None:
+                    buffer = self.buffer.describe(self.position)
+                else:
+                    buffer = self.position
+                if self._message is None and line is not None and line > 1:
+                    message += self.location_message
+                self._rendered = message.format(matcher=self.matcher, buffer=buffer, line=line, column=column)
+        return self._rendered
+
+    def line_col(self):
+        """
+        Returns the line and column of ``position`` (see ``Buffer.line_col``),
+        or ``(None, None)`` if they are not known.
+        """
+        if self.buffer is None or self.position is None:
+            return None, None
+        try:
+            return self.buffer.line_col(self.position)
+        except (IndexError, TypeError):
+            return None, None
+
+    def __str__(self):
+        return self.message
+
+
+class CommitException(ParseException):
+    """
+    Raised when a sequence fails after it matched a ``Commit()``.  Matchers
+    don't turn it into a failed match, so no other alternatives are tried.
+    """
+
+
+class Backtrack(ParseException):
+    """
+    A ParseException that carries no information.  There is only one instance,
+    see ``backtrack()``.
+    """
+
+
+BACKTRACK = Backtrack('Backtrack')
+
+
+def backtrack():
+    """
+    Returns the preallocated Backtrack exception, ready to be raised.  Use this
+    for internal control flow in custom matchers, when the exception will be
+    caught before anyone could read it.
+    """
+    BACKTRACK.__traceback__ = None
+    BACKTRACK.__context__ = None
+    return BACKTRACK
 
 
 class RollbackException(Exception):
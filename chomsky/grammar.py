@@ -1,10 +1,23 @@
 import string
 import re
 
-from .buffer import Buffer
+from .buffer import Buffer, to_buffer
 from .exceptions import ParseException
+from .result_list import ResultList, to_text
 from .matchers import *
 
+__all__ = [
+    'Grammar', 'Integer', 'Int', 'Float', 'BinaryInteger', 'Binary',
+    'OctalInteger', 'Octal', 'HexadecimalInteger', 'Hex', 'Number',
+    'OperatorGrammarType', 'Operator', 'Op', 'Assignment', 'UnaryOperator',
+    'ReservedWordGrammarType', 'ReservedWord', 'PythonReservedWord',
+    'PhpReservedWord', 'RubyReservedWord', 'VariableGrammarType',
+    'Variable', 'Var', 'PythonVariable', 'PhpVariable', 'RubyVariable',
+    'EscapeSequence', 'QuotedGrammarType', 'QuotedString',
+    'SingleQuotedString', 'DoubleQuotedString', 'TripleSingleQuotedString',
+    'TripleDoubleQuotedString', 'String', 'Value'
+    ]
+
 
 class Grammar(object, metaclass=GrammarType):
     """
@@ -43,10 +56,7 @@ class Grammar(object, metaclass=GrammarType):
                 parseme = ResultList(parseme)
             self.parsed = parseme
         else:
-            if isinstance(parseme, Buffer):
-                self.buffer = parseme
-            else:
-                self.buffer = Buffer(parseme)
+            self.buffer = to_buffer(parseme)
 
             if not hasattr(self, 'parsed'):
                 self.parsed = None
@@ -55,25 +65,13 @@ class Grammar(object, metaclass=GrammarType):
 
     def consume_grammar(self, buffer):
         cls = type(self)
-        try:
-            parsed = cls.grammar.consume(buffer)
-        except ParseException:
-            if cls.ignore_whitespace:
-                cls.whitespace.consume(buffer)
-                parsed = cls.grammar.consume(buffer)
-            else:
-                raise
-
-        if self.bad_grammar:
-            try:
-                buffer = Buffer(parsed)
-                bad_matcher = StringStart() + self.bad_grammar + StringEnd()
-                bad_matcher.consume(buffer)
-            except ParseException:
-                pass
-            else:
-                raise ParseException("Invalid match {buffer!r} in {self!r}".format(buffer=buffer, self=self))
-        return parsed
+        pos = buffer.tell()
+        values = []
+        end = cls.match_grammar(buffer, pos, values)
+        if end == FAIL:
+            raise ParseException(matcher=cls, buffer=buffer, position=pos)
+        buffer.seek(end)
+        return values[0] if values else None
 
     def __getitem__(self, key):
         if isinstance(key, int):
@@ -105,10 +103,13 @@ class Grammar(object, metaclass=GrammarType):
         except AttributeError:
             insides = self.buffer
 
-        return '{type.__name__}({insides!r})'.format(self=self, insides=str(insides), type=type(self))
+        return '{type.__name__}({insides!r})'.format(self=self, insides=to_text(insides), type=type(self))
 
     def __str__(self):
-        return str(self.parsed)
+        return to_text(self.parsed)
+
+    def __bytes__(self):
+        return bytes(self.parsed)
 
 
 class Integer(Grammar):
@@ -144,10 +145,17 @@ class Number(Grammar):
 
 
 class OperatorGrammarType(GrammarType):
+    """
+    Matches the longest operator in ``operators`` (so '<<' wins over '<').
+    """
     def __init__(cls, classname, bases, cls_dict):
         super(OperatorGrammarType, cls).__init__(classname, bases, cls_dict)
-        if cls_dict.get('operators'):
-            cls.grammar = Any(*cls_dict['operators'])
+        operators = cls_dict.get('operators')
+        if operators:
+            if all(isinstance(operator, str) for operator in operators):
+                cls.grammar = OneOf(*operators)
+            else:
+                cls.grammar = Any(*operators)
 
 
 class Operator(Grammar, metaclass=OperatorGrammarType):
@@ -171,10 +179,17 @@ class UnaryOperator(Grammar, metaclass=OperatorGrammarType):
 
 
 class ReservedWordGrammarType(GrammarType):
+    """
+    Compiles ``words`` into a trie (to parse a reserved word) and into the
+    ``keywords`` set.  When a ReservedWord is used as a ``bad_grammar``, the
+    parsed token is rejected by looking it up in ``keywords``.
+    """
     def __init__(cls, classname, bases, cls_dict):
         super(ReservedWordGrammarType, cls).__init__(classname, bases, cls_dict)
         if cls_dict.get('words'):
-            cls.grammar = Any(*cls_dict.pop('words'))
+            words = cls_dict.pop('words')
+            cls.grammar = OneOf(*words)
+            cls.keywords = frozenset(words)
 
 
 class ReservedWord(Grammar, metaclass=ReservedWordGrammarType):
@@ -0,0 +1,609 @@
+import re
+
+from .matchers import (
+    FAIL, Matcher, GrammarType, Literal, Char, OneOf, Chars, Whitespace,
+    AutoSequence, Sequence, NMatches, ZeroOrMore, Optional, OneOrMore, Exactly,
+    AutoAny, Any, Commit, Group, NextIs, NextIsNot, Later, appends_value, reaches_commit,
+    )
+from .result_list import ResultList, Span
+
+
+# instructions
+(CHAR, LITERAL, SCAN, SCAN_BACK, MATCH, MATCH_BACK, CHOICE, COMMIT,
+    PARTIAL_COMMIT, BACK_COMMIT, ITERATION, FAIL_TWICE, FAIL_OP, JUMP, TEST_CHAR,
+    RULE_START, CALL, RETURN, CAPTURE, BAD_GRAMMAR, END) = range(21)
+
+# backtrack stack entries
+CHOICE_ENTRY, GIVE_BACK_CHARS, GIVE_BACK = range(3)
+
+# captures (SPAN is a result, see Buffer.span, and TEXT is always a string)
+SPAN, TEXT, VALUE, OPEN, CLOSE_LIST, CLOSE_GROUP, CLOSE_GRAMMAR = range(7)
+
+'Repetitions with a larger (finite) bound are not unrolled'
+MAX_UNROLL = 32
+
+SEQUENCES = (AutoSequence, Sequence)
+REPETITIONS = (NMatches, ZeroOrMore, Optional, OneOrMore, Exactly)
+ALTERNATIVES = (AutoAny, Any)
+CHARS = (Chars, Whitespace)
+
+
+class Label(object):
+    'A jump target; replaced with the instruction index once it is placed'
+    index = None
+
+
+class Program(Matcher):
+    """
+    A Matcher (or Grammar) compiled to a parsing machine: a flat list of
+    instructions, run by a single loop (``run``) with its own backtrack stack
+    and call stack, in the style of LPeg.  Grammars are subroutines (``CALL``
+    and ``RETURN``), so deeply nested input doesn't use the Python stack.
+
+    This is the backend for deeply nested input, not the fast one: the
+    interpreter hits Python's recursion limit a couple of hundred levels deep,
+    and the Python backend (``compile()``) a thousand levels deep, but the
+    machine only needs memory.  On flat input the Python backend is two to
+    three times as fast as the machine, and the machine is within a factor of
+    two of the interpreter (faster on nested grammars, slower on
+    alternatives of literals).
+
+    While matching, results are recorded as a list of captures, which is
+    truncated when the machine backtracks.  The captures are turned into the
+    usual strings, ResultLists and Grammar instances once the match succeeds.
+    Matchers that the machine doesn't know are called through their ``match``
+    method.
+
+    When the results are not collected (``out`` is None), the machine runs a
+    second program that doesn't record any captures (``recognizer``).  Like a
+    compiled matcher, it matches a StreamBuffer or a BytesBuffer with the
+    original matcher.
+    """
+    def __init__(self, matcher, code, **kwargs):
+        self.matcher = matcher
+        self.code = code
+        self.recognizer = None
+        super(Program, self).__init__(**kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, Program) and self.matcher == other.matcher \
+            and super(Program, self).__eq__(other)
+
+    def __repr__(self, args_only=False):
+        args = ['{self.matcher!r}'.format(self=self)]
+        args.extend(super(Program, self).__repr__(args_only=True))
+        if args_only:
+            return args
+        return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
+
+    def match(self, buffer, pos, out):
+        if not buffer.in_memory:
+            return self.matcher.match(buffer, pos, out)
+        if out is None:
+            if self.recognizer is None:
+                self.recognizer = Assembler().assemble(self.matcher, collect=False)
+            end, captures = run(self.recognizer, buffer, pos)
+            return end
+
+        end, captures = run(self.code, buffer, pos)
+        if end != FAIL:
+            values = build_results(buffer, captures, 0)
+            if values:
+                out.append(values[0])
+        return end
+
+    def analysis(self):
+        return self.matcher.analysis()
+
+
+class Assembler(object):
+    """
+    Compiles a matcher graph to instructions.  Every instruction is a tuple
+    ``(op, a, b, c)``.  ``collect`` is False for matchers whose results are
+    not kept (suppressed items, and everything inside NextIs/NextIsNot).
+    """
+    def __init__(self):
+        self.code = []
+        self.rules = {}
+        self.pending = []
+
+    def assemble(self, matcher, collect=True):
+        """
+        Returns the instructions for ``matcher``.
+        """
+        self.emit(matcher, collect)
+        self.op(END)
+        while self.pending:
+            grammar, collect, label = self.pending.pop(0)
+            self.place(label)
+            self.emit_rule(grammar, collect)
+        code = []
+        for op, a, b, c in self.code:
+            if isinstance(a, Label):
+                a = a.index
+            if isinstance(b, Label):
+                b = b.index
+            code.append((op, a, b, c))
+        return code
+
+    def op(self, op, a=None, b=None, c=None):
+        self.code.append((op, a, b, c))
+
+    def place(self, label):
+        label.index = len(self.code)
+
+    def rule(self, grammar, collect):
+        """
+        Every Grammar has a rule that records its captures, and one that
+        doesn't (unless it needs them to check ``is_bad_grammar``).
+        """
+        collect = collect or grammar.is_bad_grammar is not None
+        label = self.rules.get((id(grammar), collect))
+        if label is None:
+            label = self.rules[(id(grammar), collect)] = Label()
+            self.pending.append((grammar, collect, label))
+        return label
+
+    def emit_rule(self, grammar, collect):
+        analysis = grammar.analysis()
+        if not analysis.nullable:
+            self.op(RULE_START, analysis.first, analysis.minimum_length)
+        if collect:
+            self.op(CAPTURE, (OPEN,))
+        skip_first = grammar.ignore_whitespace and grammar.skip_whitespace_first()
+        if skip_first:
+            # the whitespace (if any), and then the grammar
+            skipped = Label()
+            self.op(CHOICE, skipped)
+            self.emit(grammar.whitespace, False)
+            self.op(COMMIT, skipped)
+            self.place(skipped)
+            self.emit(grammar.grammar, collect)
+        elif grammar.ignore_whitespace:
+            # the grammar, or else the whitespace and then the grammar
+            body = Label()
+            retry = Label()
+            done = Label()
+            self.op(CHOICE, retry)
+            self.op(CALL, body, collect)
+            self.op(COMMIT, done)
+            self.place(retry)
+            self.emit(grammar.whitespace, False)
+            self.op(CALL, body, collect)
+            self.place(done)
+        else:
+            self.emit(grammar.grammar, collect)
+        if grammar.is_bad_grammar is not None:
+            self.op(BAD_GRAMMAR, grammar)
+        if collect:
+            self.op(CAPTURE, (CLOSE_GRAMMAR, grammar))
+        self.op(RETURN)
+        if grammar.ignore_whitespace and not skip_first:
+            self.place(body)
+            self.emit(grammar.grammar, collect)
+            self.op(RETURN)
+
+    def emit(self, node, collect):
+        if isinstance(node, Later) and not node.args and not node.kwargs:
+            node = GrammarType.types.get(node.grammar_type, node)
+        kind = type(node)
+
+        if isinstance(node, Matcher) and node.custom_consume:
+            # a custom consume, whatever class the matcher extends
+            self.op(MATCH, node, collect, reaches_commit(node))
+        elif isinstance(node, GrammarType):
+            if getattr(node, 'custom_consume', False) or node.memoize or not node.grammar:
+                self.op(MATCH, node, collect, reaches_commit(node))
+            else:
+                self.op(CALL, self.rule(node, collect), collect)
+        elif kind is Literal:
+            self.op(LITERAL, node.literal, collect, len(node.literal))
+        elif kind is Char:
+            self.op(CHAR, node.charset, collect, node.inverse)
+        elif kind in CHARS:
+            self.op(SCAN, node.scanner, SPAN if collect else None)
+        elif kind is OneOf and node.literals:
+            literals = sorted(set(node.literals), key=len, reverse=True)
+            self.op(SCAN, re.compile('|'.join(re.escape(literal) for literal in literals)), TEXT if collect else None)
+        elif kind in SEQUENCES and not any(isinstance(m, Commit) for m in node.matchers):
+            self.emit_sequence(node, collect)
+        elif kind in REPETITIONS and self.can_unroll(node):
+            self.emit_repetition(node, collect, False)
+        elif kind in ALTERNATIVES:
+            self.emit_alternatives(node, collect)
+        elif kind is Group:
+            self.emit_group(node, collect)
+        elif kind is NextIs:
+            failed = Label()
+            done = Label()
+            self.op(CHOICE, failed)
+            self.emit(node.matcher, False)
+            self.op(BACK_COMMIT, done)
+            self.place(failed)
+            self.op(FAIL_OP)
+            self.place(done)
+        elif kind is NextIsNot:
+            done = Label()
+            self.op(CHOICE, done)
+            self.emit(node.matcher, False)
+            self.op(FAIL_TWICE)
+            self.place(done)
+        else:
+            self.op(MATCH, node, collect, reaches_commit(node))
+
+    def can_unroll(self, node):
+        if node.min and node.min > MAX_UNROLL:
+            return False
+        return node.max is None or node.max - (node.min or 0) <= MAX_UNROLL
+
+    def can_rollback(self, node):
+        if isinstance(node, GrammarType):
+            return False
+        kind = type(node)
+        if kind in CHARS or kind in REPETITIONS:
+            return True
+        return kind.rollback_match is not Matcher.rollback_match
+
+    def emit_sequence(self, node, collect):
+        matchers = node.matchers
+        separated_by = node.separated_by
+        produced = False
+        if separated_by is not None:
+            # the separator is matched once there are values, and the machine
+            # needs to know where that is
+            for matcher in matchers[:-1]:
+                if not matcher.suppress:
+                    appends = appends_value(matcher)
+                    if appends is None:
+                        self.op(MATCH, node, collect, reaches_commit(node))
+                        return
+
+        rollbacks = any(self.can_rollback(matcher) for matcher in matchers[:-1])
+        done = Label()
+        if rollbacks:
+            # the rollback entries are discarded when the sequence is done
+            self.op(CHOICE, None)
+        if collect:
+            self.op(CAPTURE, (OPEN,))
+        for index, matcher in enumerate(matchers):
+            if separated_by is not None and produced:
+                self.emit(separated_by, collect and not separated_by.suppress)
+            item_collect = collect and not matcher.suppress
+            if index < len(matchers) - 1 and self.can_rollback(matcher):
+                self.emit_rollback(matcher, item_collect)
+            else:
+                self.emit(matcher, item_collect)
+            if not produced and not matcher.suppress:
+                produced = appends_value(matcher)
+        if collect:
+            self.op(CAPTURE, (CLOSE_LIST,))
+        if rollbacks:
+            self.op(COMMIT, done)
+            self.place(done)
+
+    def emit_rollback(self, node, collect):
+        kind = type(node)
+        if kind in CHARS:
+            self.op(SCAN_BACK, node.scanner, collect, node.min)
+        elif kind in REPETITIONS and self.can_unroll(node):
+            self.emit_repetition(node, collect, True)
+        else:
+            self.op(MATCH_BACK, node, collect, reaches_commit(node))
+
+    def emit_repetition(self, node, collect, rollback):
+        """
+        The first ``min`` matches are required.  The rest are optional; in a
+        sequence (``rollback``) the entry for every optional match stays on
+        the stack, so that the match can be given back.
+        """
+        minimum = node.min or 0
+        done = Label()
+        if collect:
+            self.op(CAPTURE, (OPEN,))
+        for count in range(minimum):
+            next = Label()
+            empty = Label()
+            self.op(CHOICE, None)
+            self.emit(node.matcher, collect)
+            self.op(ITERATION, next, empty)
+            # NMatches stops after an empty match
+            self.place(empty)
+            if count < minimum - 1:
+                self.op(FAIL_OP)
+            else:
+                self.op(JUMP, done)
+            self.place(next)
+
+        if node.max is None and not rollback:
+            loop = Label()
+            self.op(CHOICE, done)
+            self.place(loop)
+            self.emit(node.matcher, collect)
+            self.op(PARTIAL_COMMIT, loop, done)
+        elif node.max is None:
+            loop = Label()
+            next = Label()
+            self.place(loop)
+            self.op(CHOICE, done)
+            self.op(CHOICE, None)
+            self.emit(node.matcher, collect)
+            self.op(ITERATION, next, done)
+            self.place(next)
+            self.op(JUMP, loop)
+        else:
+            for count in range(node.max - minimum):
+                next = Label()
+                self.op(CHOICE, done)
+                if rollback:
+                    self.op(CHOICE, None)
+                self.emit(node.matcher, collect)
+                self.op(ITERATION, next, done)
+                self.place(next)
+        self.place(done)
+        if collect:
+            self.op(CAPTURE, (CLOSE_LIST,))
+
+    def emit_alternatives(self, node, collect):
+        done = Label()
+        matchers = node.matchers
+        if not matchers:
+            self.op(FAIL_OP)
+        for index, matcher in enumerate(matchers):
+            analysis = matcher.analysis()
+            last = index == len(matchers) - 1
+            next = None if last else Label()
+            # the same alternatives that the dispatch table would try
+            if not analysis.nullable and analysis.first is not None:
+                self.op(TEST_CHAR, analysis.first, next)
+            if last:
+                self.emit(matcher, collect)
+            else:
+                self.op(CHOICE, next)
+                self.emit(matcher, collect)
+                self.op(COMMIT, done)
+                self.place(next)
+        self.place(done)
+
+    def emit_group(self, node, collect):
+        scanner = node.scanner
+        if scanner is None:
+            scanner = node.build_scanner()
+        if scanner and not node.skipped:
+            self.op(SCAN, scanner, SPAN if collect else None)
+        elif scanner:
+            # the suppressed text is removed from the result
+            self.op(MATCH, node, collect, reaches_commit(node))
+        elif collect:
+            self.op(CAPTURE, (OPEN,))
+            self.emit(node.matcher, True)
+            self.op(CAPTURE, (CLOSE_GROUP,))
+        else:
+            self.emit(node.matcher, False)
+
+
+def assemble(matcher):
+    """
+    Compiles a Matcher or Grammar to a parsing machine, see ``Program``.
+    """
+    return Program(matcher, Assembler().assemble(matcher))
+
+
+def pop_choice(stack):
+    'Removes the entries above the last choice, and the choice'
+    while True:
+        entry = stack.pop()
+        if entry[0] == CHOICE_ENTRY:
+            return entry
+
+
+def run(code, buffer, pos):
+    """
+    Runs the instructions, and returns the end position (or ``FAIL``) and the
+    captures.
+    """
+    text = buffer.buffer
+    stop = buffer.end
+    stack = []
+    calls = []
+    captures = []
+    push = stack.append
+    capture = captures.append
+    pc = 0
+    while True:
+        op, a, b, c = code[pc]
+        # the instructions are tested in the order of how often they run
+        if op == CHOICE:
+            push((CHOICE_ENTRY, a, pos, len(captures), len(calls)))
+            pc += 1
+            continue
+        elif op == CALL:
+            # the rule's backtrack entries are discarded when it returns
+            calls.append((pc + 1, len(captures), b, len(stack)))
+            pc = a
+            continue
+        elif op == CAPTURE:
+            capture(a)
+            pc += 1
+            continue
+        elif op == SCAN:
+            match = a.match(text, pos, stop)
+            if match is not None:
+                end = match.end()
+                if b is not None:
+                    capture((b, pos, end))
+                pos = end
+                pc += 1
+                continue
+        elif op == TEST_CHAR:
+            if pos < stop and text[pos] in a:
+                pc += 1
+                continue
+            if b is not None:
+                pc = b
+                continue
+        elif op == RULE_START:
+            if stop - pos >= b and (a is None or (pos < stop and text[pos] in a)):
+                pc += 1
+                continue
+        elif op == COMMIT:
+            while stack.pop()[0] != CHOICE_ENTRY:
+                pass
+            pc = a
+            continue
+        elif op == RETURN:
+            pc, captures_length, collect, stack_length = calls.pop()
+            del stack[stack_length:]
+            if not collect:
+                del captures[captures_length:]
+            continue
+        elif op == LITERAL:
+            if text.startswith(a, pos, stop):
+                if b:
+                    capture((VALUE, a))
+                pos += c
+                pc += 1
+                continue
+        elif op == CHAR:
+            if pos < stop and (a is None or (text[pos] in a) != c):
+                if b:
+                    capture((TEXT, pos, pos + 1))
+                pos += 1
+                pc += 1
+                continue
+        elif op == MATCH or op == MATCH_BACK:
+            values = [] if b else None
+            if c and any(entry[1] is not None for entry in stack):
+                # the matcher can commit, but the machine can still backtrack
+                buffer.choices += 1
+                try:
+                    end = a.match(buffer, pos, values)
+                finally:
+                    buffer.choices -= 1
+            else:
+                end = a.match(buffer, pos, values)
+            if end != FAIL:
+                result = values[0] if values else None
+                if op == MATCH_BACK:
+                    push((GIVE_BACK, pc + 1, pos, end, a, len(captures), len(calls), b, result))
+                if result is not None:
+                    capture((VALUE, result))
+                pos = end
+                pc += 1
+                continue
+        elif op == PARTIAL_COMMIT:
+            entry = stack[-1]
+            if pos == entry[2]:
+                stack.pop()
+                pc = b
+            else:
+                stack[-1] = (CHOICE_ENTRY, entry[1], pos, len(captures), len(calls))
+                pc = a
+            continue
+        elif op == ITERATION:
+            entry = pop_choice(stack)
+            pc = b if pos == entry[2] else a
+            continue
+        elif op == JUMP:
+            pc = a
+            continue
+        elif op == SCAN_BACK:
+            match = a.match(text, pos, stop)
+            if match is not None:
+                end = match.end()
+                if end - pos > c:
+                    push((GIVE_BACK_CHARS, pc + 1, pos, end, c, len(captures), len(calls), b))
+                if b:
+                    capture((SPAN, pos, end))
+                pos = end
+                pc += 1
+                continue
+        elif op == BACK_COMMIT:
+            entry = pop_choice(stack)
+            pos = entry[2]
+            del captures[entry[3]:]
+            pc = a
+            continue
+        elif op == FAIL_TWICE:
+            pop_choice(stack)
+        elif op == BAD_GRAMMAR:
+            # the captures of the grammar start after its OPEN capture
+            values = build_results(buffer, captures, calls[-1][1] + 1)
+            parsed = values[0] if values else None
+            if not a.is_bad_grammar(str(parsed)):
+                pc += 1
+                continue
+        elif op == END:
+            return pos, captures
+
+        # failure: backtrack to the last entry that can continue
+        while stack:
+            entry = stack.pop()
+            kind = entry[0]
+            if kind == CHOICE_ENTRY:
+                if entry[1] is None:
+                    continue
+                pc, pos = entry[1], entry[2]
+                del captures[entry[3]:]
+                del calls[entry[4]:]
+                break
+            elif kind == GIVE_BACK_CHARS:
+                kind, next, begin, end, minimum, captures_length, calls_length, collect = entry
+                if end - begin > minimum:
+                    end -= 1
+                    del captures[captures_length:]
+                    del calls[calls_length:]
+                    if collect:
+                        captures.append((SPAN, begin, end))
+                    stack.append((kind, next, begin, end, minimum, captures_length, calls_length, collect))
+                    pc, pos = next, end
+                    break
+            else:
+                kind, next, begin, end, matcher, captures_length, calls_length, collect, result = entry
+                values = [] if collect else None
+                end = matcher.rollback_match(buffer, begin, end, result, values)
+                if end != FAIL:
+                    del captures[captures_length:]
+                    del calls[calls_length:]
+                    result = values[0] if values else None
+                    if result is not None:
+                        captures.append((VALUE, result))
+                    stack.append((kind, next, begin, end, matcher, captures_length, calls_length, collect, result))
+                    pc, pos = next, end
+                    break
+        else:
+            return FAIL, captures
+
+
+def build_results(buffer, captures, start):
+    """
+    Turns the captures (starting at ``start``) into the values that the
+    matchers would have returned.
+    """
+    text = buffer.buffer
+    frames = []
+    values = []
+    for index in range(start, len(captures)):
+        capture = captures[index]
+        kind = capture[0]
+        if kind == VALUE:
+            values.append(capture[1])
+        elif kind == SPAN:
+            values.append(buffer.span(capture[1], capture[2]))
+        elif kind == OPEN:
+            frames.append(values)
+            values = []
+        elif kind == CLOSE_LIST:
+            result = ResultList(values)
+            values = frames.pop()
+            values.append(result)
+        elif kind == TEXT:
+            values.append(text[capture[1]:capture[2]])
+        elif kind == CLOSE_GROUP:
+            value = values[0] if values else ''
+            values = frames.pop()
+            values.append(value if isinstance(value, (str, Span)) else str(value))
+        else:
+            parsed = values[0] if values else None
+            values = frames.pop()
+            values.append(capture[1].from_parsed(buffer, parsed))
+    return values
@@ -1,13 +1,51 @@
+import itertools
 import re
 import string
+import sys
+from collections import namedtuple
 
-from .exceptions import ParseException, RollbackException
-from .result_list import ResultList
-from .buffer import Buffer
+from .exceptions import ParseException, CommitException, RollbackException
+from .result_list import ResultList, Span, to_text
+from .buffer import Buffer, to_buffer, looks_behind
+
+__all__ = [
+    'Infinity', 'FAIL', 'Matcher', 'GrammarType', 'SuppressedMatcher',
+    'NoMatch', 'Char', 'Literal', 'OneOf', 'Chars', 'Whitespace', 'Regex',
+    'Sequence', 'NMatches', 'ZeroOrMore', 'Optional', 'OneOrMore',
+    'Exactly', 'Slice', 'OneLine', 'SeparatedBy', 'Any', 'Commit',
+    'StringStart', 'StringEnd', 'LineStart', 'LineEnd', 'WordStart',
+    'WordEnd', 'NextIs', 'NextIsNot', 'PrevIs', 'PrevIsNot', 'Group',
+    'Flatten', 'Memoize', 'Later'
+    ]
 
 
 Infinity = float('inf')
 
+'Returned by ``match()`` when the matcher fails.  Positions are never negative.'
+FAIL = -1
+
+
+'''
+The result of ``Matcher.analysis()``.  ``first`` is the set of characters that
+a non-empty match can start with, or None if that isn't known.
+'''
+Analysis = namedtuple('Analysis', 'nullable first minimum_length maximum_length')
+
+'Used for matchers that cannot be analyzed, and while analyzing recursive grammars'
+UNKNOWN = Analysis(True, None, 0, Infinity)
+
+
+def union_first(analyses):
+    '''
+    Returns the union of the ``first`` sets, or None if any are unknown.
+    '''
+    first = frozenset()
+    for analysis in analyses:
+        if analysis.first is None:
+            return None
+        first |= analysis.first
+    return first
+
 
 def to_matcher(obj):
     if not obj:
@@ -34,25 +72,153 @@ def to_matcher(obj):
     raise TypeError('Unknown type {obj!r}'.format(obj=obj))
 
 
+def char_class(consumable, inverse=False):
+    """
+    Returns a regular expression that matches one character from
+    ``consumable`` (or one character *not* in consumable).  An empty
+    consumable matches any character.
+    """
+    if not consumable:
+        return '(?s:.)'
+    escaped = ''.join(re.escape(c) for c in sorted(set(consumable)))
+    if inverse:
+        return '[^' + escaped + ']'
+    return '[' + escaped + ']'
+
+
+_group_ids = itertools.count()
+
+
+if sys.version_info >= (3, 11):
+    def atomic(pattern):
+        """
+        Wraps a regular expression in an atomic group: once it has matched,
+        the regex engine will not backtrack into it.
+        """
+        return '(?>' + pattern + ')'
+else:
+    def atomic(pattern):
+        """
+        Wraps a regular expression in an (emulated) atomic group: once it has
+        matched, the regex engine will not backtrack into it.
+        """
+        name = '_atomic{0}'.format(next(_group_ids))
+        return '(?=(?P<{0}>{1}))(?P={0})'.format(name, pattern)
+
+
+'The prefix of the regex groups that capture suppressed text'
+SKIPPED = '_skipped'
+
+
+def skipped(pattern):
+    """
+    Captures a suppressed part of a regular expression, so that it can be
+    removed from the matched text.
+    """
+    return '(?P<{0}{1}>{2})'.format(SKIPPED, next(_group_ids), pattern)
+
+
+def appends_value(matcher):
+    """
+    Whether a successful match always adds a value to the results (True),
+    never does (False), or it depends on the input (None).
+    """
+    if isinstance(matcher, AutoAny):
+        appends = set(appends_value(m) for m in matcher.matchers)
+        if len(appends) == 1:
+            return appends.pop()
+        return None
+    if isinstance(matcher, Memoize):
+        return appends_value(matcher.matcher)
+    if isinstance(matcher, Matcher) and matcher.custom_consume:
+        # a custom consume can return None (a Grammar always adds itself)
+        return None
+    return matcher.produces_result
+
+
+def reaches_commit(matcher, seen=None):
+    """
+    Whether ``matcher`` (or a matcher or grammar inside of it) is a
+    ``Commit``.  Compiled matchers only count their choice points (see
+    ``Buffer.choices``) around matchers that can commit.
+    """
+    if seen is None:
+        seen = set()
+    if id(matcher) in seen:
+        return False
+    seen.add(id(matcher))
+    if isinstance(matcher, Later):
+        matcher = GrammarType.types.get(matcher.grammar_type)
+        return matcher is not None and reaches_commit(matcher, seen)
+    if isinstance(matcher, GrammarType):
+        if getattr(matcher, 'custom_consume', False) or not matcher.grammar:
+            return False
+        return reaches_commit(to_matcher(matcher.grammar), seen)
+    if isinstance(matcher, Commit):
+        return True
+    children = list(getattr(matcher, 'matchers', ()))
+    for name in ('matcher', 'separated_by'):
+        child = getattr(matcher, name, None)
+        if child is not None:
+            children.append(child)
+    return any(reaches_commit(child, seen) for child in children)
+
+
 class Matcher(object):
     """
     Provides functionality shared with all Matcher objects.
 
     Any methods added here should also be added to the GrammarType class.
+
+    Matchers implement ``match(buffer, pos, out)``, which doesn't raise
+    exceptions or move the buffer: it returns the position where the match
+    ended, or ``FAIL``.  On success, the matched value is appended to ``out``
+    (unless ``out`` is None, or the value is None).  ``consume(buffer)`` is the
+    public, exception-raising API, and is built on top of ``match``.
+
+    Custom Matchers can still define ``consume`` (and ``rollback``) instead;
+    they are adapted to the ``match`` protocol automatically.
     """
     default_suppressed = False
+    'False if the matcher always returns None'
+    produces_result = True
+    'True if the matcher is implemented by a custom ``consume`` method'
+    custom_consume = False
+
+    def __init_subclass__(cls, **kwargs):
+        super(Matcher, cls).__init_subclass__(**kwargs)
+        if 'match' in cls.__dict__:
+            cls._match = cls.__dict__['match']
+            cls.custom_consume = False
+        elif 'consume' in cls.__dict__:
+            cls.match = Matcher._match_consume
+            cls.custom_consume = True
+            # what the parent class knows about its matches doesn't apply
+            if 'first_chars' not in cls.__dict__:
+                cls.first_chars = Matcher.first_chars
+            if 'regex_pattern' not in cls.__dict__:
+                cls.regex_pattern = Matcher.regex_pattern
+        if 'rollback' in cls.__dict__ and 'rollback_match' not in cls.__dict__:
+            cls.rollback_match = Matcher._rollback_consume
 
     def test(self, buffer):
-        if not isinstance(buffer, Buffer):
-            buffer = Buffer(buffer)
+        return self.recognize(buffer) != FAIL
+
+    def recognize(self, buffer):
+        """
+        Returns the position where a match at the start of ``buffer`` (a string,
+        bytes, or a Buffer, which is not moved) ends, or ``FAIL``.  Only
+        positions are tracked: no results (strings, ResultLists or Grammars)
+        are built.  A failure after a ``Commit`` is a ``FAIL``, too.
+        """
+        buffer = to_buffer(buffer)
+        pos = buffer.tell()
         try:
-            buffer.mark()
-            self(buffer)
-            buffer.restore_mark()
-            return True
-        except ParseException:
-            buffer.restore_mark()
-            return False
+            end = self.match(buffer, pos, None)
+        except CommitException:
+            end = FAIL
+        buffer.seek(pos)
+        return end
 
     def __init__(self, *args, **kwargs):
         self.grammar = None
@@ -100,9 +266,101 @@ class Matcher(object):
         return Slice(self, key)
 
     def __call__(self, string):
-        if not isinstance(string, Buffer):
-            string = Buffer(string)
-        return self.consume(string)
+        return self.consume(to_buffer(string))
+
+    def match(self, buffer, pos, out):
+        """
+        Abstract: matches at ``pos``, and returns where the match ends, or
+        ``FAIL``.  On success the value is appended to ``out`` (unless it is
+        None).  The buffer is not moved.
+
+        Subclasses implement ``match``, or ``consume`` (which is then adapted
+        to ``match`` by ``__init_subclass__``).  The base ``consume`` is built
+        on ``match``, so a subclass that implements neither raises
+        NotImplementedError.
+        """
+        raise NotImplementedError(
+            '{type.__name__} must implement match() or consume()'.format(type=type(self))
+            )
+    _match = match
+
+    def consume(self, buffer):
+        pos = buffer.tell()
+        out = []
+        end = self._match(buffer, pos, out)
+        if end == FAIL:
+            buffer.seek(pos)
+            raise ParseException(matcher=self, buffer=buffer, position=pos)
+        buffer.seek(end)
+        if out:
+            return out[0]
+        return None
+
+    def _match_consume(self, buffer, pos, out):
+        """
+        Adapts a custom ``consume`` method to the ``match`` protocol.
+        """
+        buffer.seek(pos)
+        try:
+            consumed = self.consume(buffer)
+        except CommitException:
+            raise
+        except ParseException:
+            return FAIL
+        if out is not None and consumed is not None:
+            out.append(consumed)
+        return buffer.tell()
+
+    def skip(self, buffer, pos):
+        """
+        Matches like ``Optional(self)`` without collecting results: returns the
+        end of the match, or ``pos`` if it doesn't match.  This is how
+        Grammars skip whitespace.
+        """
+        end = self.match(buffer, pos, None)
+        if end == FAIL:
+            return pos
+        return end
+
+    def rollback_match(self, buffer, start, end, result, out):
+        """
+        Called by a sequence when a later matcher failed.  Returns a new,
+        shorter, end position (and appends the new result to ``out``), or
+        ``FAIL`` if the matcher cannot give back any more of the buffer.
+        """
+        return FAIL
+
+    def rollback_ends(self, buffer, start, end, result, collect, viable=None):
+        """
+        Yields the shorter matches that a sequence can roll back to, longest
+        first, as ``(end, values)`` pairs (``values`` is None unless
+        ``collect`` is True).  Ends that don't pass ``viable(end)`` are
+        skipped.  The sequence keeps the generator, so every retry continues
+        where the last one stopped.
+
+        The default implementation calls ``rollback_match`` until it fails.
+        """
+        while True:
+            values = [] if collect else None
+            end = self.rollback_match(buffer, start, end, result, values)
+            if end == FAIL:
+                return
+            result = values[0] if values else None
+            if viable is None or viable(end):
+                yield end, values
+
+    def _rollback_consume(self, buffer, start, end, result, out):
+        """
+        Adapts a custom ``rollback`` method to the ``rollback_match`` protocol.
+        """
+        buffer.seek(end)
+        try:
+            new_result = self.rollback(result, buffer)
+        except RollbackException:
+            return FAIL
+        if out is not None and new_result is not None:
+            out.append(new_result)
+        return buffer.tell()
 
     def rollback(self, result, buffer):
         # Moves the buffer position, and then claims that it can't rollback.
@@ -117,6 +375,65 @@ class Matcher(object):
     def maximum_length(self):
         return Infinity
 
+    def first_chars(self):
+        """
+        The characters that a non-empty match can start with, or None if any
+        character could.
+        """
+        return None
+
+    def regex_pattern(self, rollback=False):
+        """
+        Returns a regular expression that matches exactly what this matcher
+        matches, or None if the matcher can't be lowered to a regex.
+
+        Matchers don't backtrack into each other, so the pattern is atomic,
+        unless ``rollback`` is True - sequences pass that for their items,
+        which can give back part of their match with ``rollback_match``.
+        """
+        return None
+
+    def compile(self, backend='python'):
+        """
+        Returns a Matcher that matches exactly like this one, but runs Python
+        code that was generated for it (see ``chomsky.compiler``), or, with
+        ``backend='machine'``, a parsing machine (see ``chomsky.machine``).
+        The compiled matcher is cached.
+        """
+        compiled = vars(self).setdefault('_compiled', {})
+        if backend not in compiled:
+            from .compiler import compile_matcher
+            compiled[backend] = compile_matcher(self, backend)
+        return compiled[backend]
+
+    def analysis(self):
+        """
+        Returns the static Analysis of this matcher: whether it can match an
+        empty string (nullable), the characters that a non-empty match starts
+        with, and the minimum and maximum length of a match.  The analysis is
+        computed once, and then cached.
+        """
+        analysis = vars(self).get('_analysis')
+        if analysis is None:
+            # guards against recursive grammars
+            self._analysis = UNKNOWN
+            minimum_length = self.minimum_length()
+            analysis = Analysis(minimum_length == 0, self.first_chars(), minimum_length, self.maximum_length())
+            self._analysis = analysis
+        return analysis
+
+    def can_start(self, buffer, pos):
+        """
+        Uses the analysis to check, cheaply, whether a match at ``pos`` is
+        possible at all.
+        """
+        analysis = self.analysis()
+        if analysis.nullable:
+            return True
+        if buffer.end - pos < analysis.minimum_length:
+            return False
+        return analysis.first is None or buffer.peek(pos) in analysis.first
+
 
 class GrammarType(type):
     """
@@ -130,11 +447,15 @@ class GrammarType(type):
 
     'Stores Grammars so that Later can find them later'
     types = {}
+    produces_result = True
 
     def __new__(meta, name, bases, cls_dict):
         if 'consume' in cls_dict:
             cls_dict['consume_grammar'] = cls_dict['consume']
             del cls_dict['consume']
+            cls_dict['custom_consume'] = True
+        elif '__init__' in cls_dict and any(isinstance(base, GrammarType) for base in bases):
+            cls_dict['custom_consume'] = True
         return type.__new__(meta, name, bases, cls_dict)
 
     def __init__(cls, classname, bases, cls_dict):
@@ -143,6 +464,10 @@ class GrammarType(type):
         cls.ignore_whitespace = cls_dict.get('ignore_whitespace', getattr(cls, 'ignore_whitespace', True))
         # default whitespace matcher
         cls.whitespace = cls_dict.get('whitespace', getattr(cls, 'whitespace', Whitespace()))
+        # packrat memoization is opt-in
+        cls.memoize = cls_dict.get('memoize', getattr(cls, 'memoize', False))
+        # the bad_grammar check is compiled once, not on every match
+        cls.is_bad_grammar = staticmethod(cls.compile_bad_grammar(getattr(cls, 'bad_grammar', None)))
 
         GrammarType.types[classname] = cls
 
@@ -167,42 +492,213 @@ class GrammarType(type):
     def rollback(cls, *args, **kwargs):
         return cls.grammar.rollback(*args, **kwargs)
 
+    def rollback_match(cls, buffer, start, end, result, out):
+        return FAIL
+
+    def rollback_ends(cls, buffer, start, end, result, collect, viable=None):
+        return iter(())
+
+    def compile_bad_grammar(cls, bad_grammar):
+        """
+        Returns a function that checks whether a parsed token matches the
+        entire ``bad_grammar``, or None if there is no bad_grammar.  Reserved
+        words are checked with a set lookup, and bad grammars that can be
+        lowered to a regex with ``fullmatch``.
+        """
+        if not bad_grammar:
+            return None
+        keywords = getattr(bad_grammar, 'keywords', None)
+        if keywords is not None:
+            return keywords.__contains__
+
+        bad_grammar = to_matcher(bad_grammar)
+        pattern = bad_grammar.regex_pattern(rollback=True)
+        if pattern is not None:
+            try:
+                return re.compile(pattern).fullmatch
+            except re.error:
+                pass
+
+        bad_matcher = StringStart() + bad_grammar + StringEnd()
+        def is_bad_grammar(text):
+            return bad_matcher.match(Buffer(text), 0, None) != FAIL
+        return is_bad_grammar
+
+    def regex_pattern(cls, rollback=False):
+        """
+        Grammars are lowered to a regex if they parse the usual way, and
+        ``str()`` of the Grammar is its parsed text.  The whitespace that is
+        skipped before the grammar is captured in a ``skipped()`` group.
+        """
+        if getattr(cls, 'custom_consume', False) or cls.is_bad_grammar is not None or not cls.grammar:
+            return None
+        # __str__ must come from the base Grammar class
+        str_class = next(klass for klass in cls.__mro__ if '__str__' in vars(klass))
+        if any(isinstance(base, GrammarType) for base in str_class.__bases__):
+            return None
+
+        grammar = to_matcher(cls.grammar)
+        pattern = grammar.regex_pattern()
+        if pattern is None or not cls.ignore_whitespace:
+            return pattern
+        whitespace = cls.whitespace.regex_pattern()
+        if whitespace is None:
+            return None
+        # group names must be unique, so the grammar is lowered again
+        return atomic(pattern + '|' + skipped(whitespace) + grammar.regex_pattern())
+
     def minimum_length(cls, *args, **kwargs):
         return cls.grammar.minimum_length(*args, **kwargs)
 
     def maximum_length(cls, *args, **kwargs):
         return cls.grammar.maximum_length(*args, **kwargs)
 
+    def analysis(cls):
+        analysis = cls.__dict__.get('_analysis')
+        if analysis is None:
+            if getattr(cls, 'custom_consume', False) or cls.grammar is None:
+                return UNKNOWN
+            cls._analysis = UNKNOWN
+            analysis = to_matcher(cls.grammar).analysis()
+            if cls.ignore_whitespace:
+                # whitespace is consumed before the grammar, if it doesn't match
+                first = union_first([analysis, cls.whitespace.analysis()])
+                analysis = analysis._replace(first=first)
+            cls._analysis = analysis
+        return analysis
+
+    def can_start(cls, buffer, pos):
+        return Matcher.can_start(cls, buffer, pos)
+
+    def skip(cls, buffer, pos):
+        return Matcher.skip(cls, buffer, pos)
+
+    def skip_whitespace_first(cls):
+        """
+        Whether the whitespace can be skipped *before* the grammar is matched,
+        so that the grammar is only matched once.  That is the case when the
+        grammar cannot match an empty string or start with whitespace, because
+        then matching it at the whitespace would fail anyway.
+        """
+        skip = cls.__dict__.get('_skip_whitespace_first')
+        if skip is None:
+            analysis = to_matcher(cls.grammar).analysis()
+            whitespace = cls.whitespace.analysis().first
+            skip = not analysis.nullable and analysis.first is not None \
+                and whitespace is not None and not analysis.first & whitespace
+            cls._skip_whitespace_first = skip
+        return skip
+
+    def compile(cls, backend='python'):
+        compiled = cls.__dict__.get('_compiled')
+        if compiled is None:
+            compiled = cls._compiled = {}
+        if backend not in compiled:
+            from .compiler import compile_matcher
+            compiled[backend] = compile_matcher(cls, backend)
+        return compiled[backend]
+
     def consume(cls, buffer):
         return cls(buffer)
 
+    def match(cls, buffer, pos, out):
+        """
+        Matches the grammar, and appends an instance of the Grammar to ``out``.
+        """
+        if cls.memoize:
+            return buffer.memo.match(cls, cls.match_uncached, buffer, pos, out)
+        return cls.match_uncached(buffer, pos, out)
+
+    def match_uncached(cls, buffer, pos, out):
+        if not cls.can_start(buffer, pos):
+            return FAIL
+        if getattr(cls, 'custom_consume', False):
+            buffer.seek(pos)
+            try:
+                instance = cls(buffer)
+            except CommitException:
+                raise
+            except ParseException:
+                return FAIL
+            if out is not None:
+                out.append(instance)
+            return buffer.tell()
+
+        if out is None and not cls.bad_grammar:
+            return cls.match_grammar(buffer, pos, None)
+
+        values = []
+        end = cls.match_grammar(buffer, pos, values)
+        if end != FAIL and out is not None:
+            out.append(cls.from_parsed(buffer, values[0] if values else None))
+        return end
+
+    def match_grammar(cls, buffer, pos, out):
+        """
+        Matches ``cls.grammar`` (with leading whitespace, if the grammar ignores
+        whitespace), and appends the *parsed* value to ``out``.
+        """
+        grammar = cls.grammar
+        values = [] if out is not None or cls.bad_grammar else None
+        if cls.ignore_whitespace and cls.skip_whitespace_first():
+            pos = cls.whitespace.skip(buffer, pos)
+        end = grammar.match(buffer, pos, values)
+        if end == FAIL and cls.ignore_whitespace and not cls.skip_whitespace_first():
+            whitespace_end = cls.whitespace.match(buffer, pos, None)
+            if whitespace_end == FAIL:
+                return FAIL
+            end = grammar.match(buffer, whitespace_end, values)
+        if end == FAIL:
+            return FAIL
+
+        if values is None:
+            return end
+        parsed = values[0] if values else None
+        if cls.is_bad_grammar is not None and cls.is_bad_grammar(to_text(parsed)):
+            return FAIL
+        if out is not None and parsed is not None:
+            out.append(parsed)
+        return end
+
+    def from_parsed(cls, buffer, parsed):
+        """
+        Creates a Grammar instance without parsing it again.
+        """
+        instance = cls.__new__(cls)
+        instance.buffer = buffer
+        instance.parsed = parsed
+        return instance
+
     def __repr__(cls):
         return cls.__name__
 
     def test(cls, buffer):
-        if not isinstance(buffer, Buffer):
-            buffer = Buffer(buffer)
-        try:
-            buffer.mark()
-            cls(buffer)
-            buffer.restore_mark()
-            return True
-        except ParseException:
-            buffer.restore_mark()
-            return False
+        return cls.recognize(buffer) != FAIL
+
+    def recognize(cls, buffer):
+        return Matcher.recognize(cls, buffer)
 
 
 class SuppressedMatcher(Matcher):
     default_suppressed = True
+    produces_result = False
+
+    def first_chars(self):
+        # only a matcher that never consumes anything has no first characters
+        if self.maximum_length() == 0:
+            return frozenset()
+        return None
 
 
 class NoMatch(SuppressedMatcher):
+    def match(self, buffer, pos, out):
+        return FAIL
+
+    def first_chars(self):
+        return frozenset()
+
     def consume(self, buffer):
-        raise ParseException(
-            'NoMatch {self!r} at {buffer!r}'.format(
-                self=self,
-                buffer=buffer)
-            )
+        raise ParseException('NoMatch {matcher!r} at {buffer}', matcher=self, buffer=buffer)
 
     def minimum_length(self):
         return 1
@@ -222,6 +718,7 @@ class Char(Matcher):
     def __init__(self, consumable=None, **kwargs):
         self.consumable = consumable
         self.inverse = bool(kwargs.pop('inverse', self.default_inverse))
+        self.charset = frozenset(consumable) if consumable else None
         super(Char, self).__init__(**kwargs)
 
     def __eq__(self, other):
@@ -243,17 +740,14 @@ class Char(Matcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
+    def match(self, buffer, pos, out):
+        consumed = buffer.peek(pos)
         # inverse and NOT in consumable, or in consumable and NOT inverse
-        if not self.consumable or (buffer[0] in self.consumable) == (not self.inverse):
-            consumed = buffer[0]
-            buffer.advance(1)
-            return consumed
-        raise ParseException(
-            'Expected {self!r} at {buffer!r}'.format(
-                self=self,
-                buffer=buffer)
-            )
+        if consumed and (self.charset is None or (consumed in self.charset) != self.inverse):
+            if out is not None:
+                out.append(buffer.text(pos, pos + 1) if buffer.binary else consumed)
+            return pos + 1
+        return FAIL
 
     def minimum_length(self):
         return 1
@@ -261,6 +755,16 @@ class Char(Matcher):
     def maximum_length(self):
         return 1
 
+    def first_chars(self):
+        if self.charset is None or self.inverse:
+            return None
+        return self.charset
+
+    def regex_pattern(self, rollback=False):
+        if self.charset is not None and any(len(c) != 1 for c in self.charset):
+            return None
+        return char_class(self.consumable, self.inverse)
+
 
 class Literal(Matcher):
     """
@@ -280,15 +784,12 @@ class Literal(Matcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        if str(buffer[0:len(self.literal)]) == self.literal:
-            buffer.advance(len(self.literal))
-            return self.literal
-        raise ParseException(
-            'Expected {self!r} at {buffer!r}'.format(
-                self=self,
-                buffer=buffer)
-            )
+    def match(self, buffer, pos, out):
+        if buffer.startswith(self.literal, pos):
+            if out is not None:
+                out.append(buffer.text(pos, pos + len(self.literal)) if buffer.binary else self.literal)
+            return pos + len(self.literal)
+        return FAIL
 
     def minimum_length(self):
         return len(self.literal)
@@ -296,13 +797,84 @@ class Literal(Matcher):
     def maximum_length(self):
         return len(self.literal)
 
+    def first_chars(self):
+        return frozenset(self.literal[:1])
+
+    def regex_pattern(self, rollback=False):
+        return re.escape(self.literal)
+
+
+class OneOf(Matcher):
+    """
+    Consumes the longest of a list of literal strings.  The literals are
+    compiled into a character trie, so the buffer is read only once, no matter
+    how many literals there are or what order they are in.
+    """
+    def __init__(self, *literals, **kwargs):
+        self.literals = list(literals)
+        self.trie = {}
+        for literal in self.literals:
+            node = self.trie
+            for c in literal:
+                node = node.setdefault(c, {})
+            # the None key marks the end of a literal
+            node[None] = literal
+        super(OneOf, self).__init__(**kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, OneOf) and sorted(self.literals) == sorted(other.literals) \
+            and super(OneOf, self).__eq__(other)
+
+    def __repr__(self, args_only=False):
+        args = [repr(literal) for literal in self.literals]
+        args.extend(super(OneOf, self).__repr__(args_only=True))
+        if args_only:
+            return args
+        return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
+
+    def match(self, buffer, pos, out):
+        node = self.trie
+        consumed = None
+        end = FAIL
+        while node is not None:
+            if None in node:
+                consumed = node[None]
+                end = pos
+            next = buffer.peek(pos)
+            if not next:
+                break
+            node = node.get(next)
+            pos += 1
+        if end != FAIL and out is not None:
+            out.append(buffer.text(end - len(consumed), end) if buffer.binary else consumed)
+        return end
+
+    def minimum_length(self):
+        return min(len(literal) for literal in self.literals)
+
+    def maximum_length(self):
+        return max(len(literal) for literal in self.literals)
+
+    def first_chars(self):
+        return frozenset(literal[0] for literal in self.literals if literal)
+
+    def regex_pattern(self, rollback=False):
+        if not self.literals:
+            return None
+        # longest first, so that the first alternative is the longest match
+        literals = sorted(set(self.literals), key=len, reverse=True)
+        return atomic('|'.join(re.escape(literal) for literal in literals))
+
 
 class Chars(Matcher):
     """
     Consumes as many characters as possible from a list of acceptable
-    characters by consuming as many Char matches as possible.  You can pass
-    min and max, if there is a desired length.  If the length of the consumed
-    word is less than min, or greater than max, a ParseException is raised.
+    characters.  You can pass min and max, if there is a desired length.  If
+    the length of the consumed word is less than min, or greater than max, a
+    ParseException is raised.
+
+    The characters are compiled into a ``[...]{min,max}`` regular expression,
+    so the entire run is found in one call.
     """
     default_word = None
     default_min = 1
@@ -320,6 +892,11 @@ class Chars(Matcher):
         self.max = kwargs.pop('max', self.default_max)
         self.inverse = kwargs.pop('inverse', self.default_inverse)
         self.letter = Char(consumable, inverse=self.inverse)
+        if self.max is None:
+            repeat = '{{{0},}}'.format(self.min)
+        else:
+            repeat = '{{{0},{1}}}'.format(self.min, self.max)
+        self.scanner = re.compile(char_class(consumable, self.inverse) + repeat)
         super(Chars, self).__init__(**kwargs)
 
     def __eq__(self, other):
@@ -346,29 +923,34 @@ class Chars(Matcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        buffer.mark()
-        consumed = ''
-        try:
-            while self.max is None or len(consumed) < self.max:
-                consumed += self.letter.consume(buffer)
-        except ParseException:
-            pass
-        if self.min and len(consumed) < self.min:
-            buffer.restore_mark()
-            raise ParseException(
-                'Expected {self!r} at {buffer!r}'.format(
-                    self=self,
-                    buffer=buffer)
-                )
-        buffer.forget_mark()
-        return consumed
-
-    def rollback(self, result, buffer):
-        if len(result) > self.min:
-            buffer.advance(-1)
-            return result[:-1]
-        raise RollbackException()
+    def match(self, buffer, pos, out):
+        match = buffer.match(self.scanner, pos)
+        if match is None:
+            return FAIL
+        end = match.end()
+        if out is not None:
+            out.append(buffer.span(pos, end))
+        return end
+
+    def rollback_match(self, buffer, start, end, result, out):
+        if end - start > self.min:
+            end -= 1
+            if out is not None:
+                out.append(buffer.span(start, end))
+            return end
+        return FAIL
+
+    def skip(self, buffer, pos):
+        match = buffer.match(self.scanner, pos)
+        if match is None:
+            return pos
+        return match.end()
+
+    def rollback_ends(self, buffer, start, end, result, collect, viable=None):
+        # every shorter match (down to ``min``) is a match, too
+        for end in range(end - 1, start + self.min - 1, -1):
+            if viable is None or viable(end):
+                yield end, [buffer.span(start, end)] if collect else None
 
     def minimum_length(self):
         return self.min
@@ -376,6 +958,14 @@ class Chars(Matcher):
     def maximum_length(self):
         return self.max if self.max is not None else Infinity
 
+    def first_chars(self):
+        return self.letter.first_chars()
+
+    def regex_pattern(self, rollback=False):
+        if rollback:
+            return self.scanner.pattern
+        return atomic(self.scanner.pattern)
+
 
 class Whitespace(Chars):
     """
@@ -398,7 +988,9 @@ class Regex(Matcher):
     default_advance = 0
 
     """
-    Matches a regular expression.
+    Matches a regular expression.  The match starts at the current position,
+    but ``^``, ``\\A``, ``\\b`` and lookbehinds only see the rest of the input
+    (see ``Buffer.match_rest``): they treat the current position as the start.
     """
     def __init__(self, regex, **kwargs):
         """
@@ -406,6 +998,7 @@ class Regex(Matcher):
         """
         self.flags = kwargs.pop('flags', self.default_flags)
         self.regex = re.compile(regex, flags=self.flags)
+        self.looks_behind = looks_behind(self.regex)
         self.group = kwargs.pop('group', self.default_group)
         self.advance = kwargs.pop('advance', self.default_advance)
         super(Regex, self).__init__(**kwargs)
@@ -448,21 +1041,37 @@ class Regex(Matcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        buffer.mark()
-        match = self.regex.match(buffer.rest())
+    def match(self, buffer, pos, out):
+        if self.looks_behind:
+            match = buffer.match_rest(self.regex, pos)
+        else:
+            match = buffer.match(self.regex, pos)
         if not match:
-            buffer.restore_mark()
-            raise ParseException(
-                'Expected {self!r} at {buffer!r}'.format(
-                    self=self,
-                    buffer=buffer)
-                )
-        buffer.advance(match.end(self.advance))
-        buffer.forget_mark()
-        if isinstance(self.group, tuple) or isinstance(self.group, list):
-            return ResultList([match.group(g) for g in self.group])
-        return match.group(self.group)
+            return FAIL
+        if out is not None:
+            if isinstance(self.group, tuple) or isinstance(self.group, list):
+                out.append(ResultList([match.group(g) for g in self.group]))
+            else:
+                consumed = match.group(self.group)
+                if consumed is not None:
+                    out.append(consumed)
+        return match.end(self.advance)
+
+    def regex_pattern(self, rollback=False):
+        # the result must be the matched text, and group numbers would change
+        if self.group != 0 or self.advance != 0 or self.regex.groups or self.looks_behind:
+            return None
+        if self.flags & ~(re.IGNORECASE | re.MULTILINE | re.DOTALL | re.VERBOSE | re.UNICODE):
+            return None
+        flags = ''.join(flag for flag, value in [
+                ('i', re.IGNORECASE),
+                ('m', re.MULTILINE),
+                ('s', re.DOTALL),
+                ('x', re.VERBOSE),
+                ] if self.flags & value)
+        if flags:
+            return atomic('(?' + flags + ':' + self.regex.pattern + ')')
+        return atomic(self.regex.pattern)
 
 
 class AutoSequence(Matcher):
@@ -477,6 +1086,11 @@ class AutoSequence(Matcher):
         """
         self.separated_by = to_matcher(kwargs.pop('sep', None))
         self.matchers = [to_matcher(m) for m in matchers]
+        # the whitespace between Grammars is Optional(whitespace, suppress=True),
+        # which is matched with ``skip()``
+        self.skip_separator = None
+        if type(self.separated_by) is Optional and self.separated_by.suppress:
+            self.skip_separator = self.separated_by.matcher
         super(AutoSequence, self).__init__(**kwargs)
 
     def __eq__(self, other):
@@ -509,59 +1123,155 @@ class AutoSequence(Matcher):
         # self.matchers.append(to_matcher(other))
         return AutoSequence(*(self.matchers + [to_matcher(other)]), sep=self.separated_by)
 
-    def consume(self, buffer):
-        consumed = ResultList()
+    def match(self, buffer, pos, out):
+        matchers = self.matchers
+        separated_by = self.separated_by
+        skip_separator = self.skip_separator
+        consumed = None if out is None else ResultList()
+        # when results are not being collected, count the values that would
+        # have been added, so that the separator is matched the same way.
+        count = 0
+        # (matcher, start, end, count, rollback_ends) for every matched item
         rollbacks = []
+        committed = False
         matcher_i = 0
-        while True:
-            if matcher_i == len(self.matchers):
-                break
-            matcher = self.matchers[matcher_i]
-
-            try:
-                if consumed and self.separated_by:
-                    token_consumed = self.separated_by.consume(buffer)
-                    if not self.separated_by.suppress and token_consumed is not None:
-                        consumed.append(token_consumed)
-                    # rollbacks.append((self.separated_by, token_consumed))
-
-                token_consumed = matcher.consume(buffer)
-                if not matcher.suppress and token_consumed is not None:
-                    consumed.append(token_consumed)
-                rollbacks.append((matcher, token_consumed))
-            except ParseException as error:
-                if rollbacks:
-                    # rollback until successful
-                    while matcher_i > 0:
-                        rollback_matcher, result = rollbacks.pop()
-                        # remove the matched content, if it wasn't suppressed
-                        if not rollback_matcher.suppress and result is not None:
-                            consumed.pop()
-
-                        try:
-                            new_result = rollback_matcher.rollback(result, buffer)
-                            if not rollback_matcher.suppress and new_result is not None:
-                                consumed.append(new_result)
-                            rollbacks.append((rollback_matcher, new_result))
-                            break
-                        except RollbackException:
-                            # couldn't rollback, so move the matcher pointer and
-                            # try to rollback the next item.
-                            matcher_i -= 1
-
-                if not rollbacks:
-                    raise error
+        while matcher_i < len(matchers):
+            matcher = matchers[matcher_i]
+            start = pos
+            if separated_by is not None and (count if consumed is None else consumed):
+                if skip_separator is not None:
+                    start = skip_separator.skip(buffer, pos)
+                elif separated_by.suppress or consumed is None:
+                    start = separated_by.match(buffer, pos, None)
+                else:
+                    start = separated_by.match(buffer, pos, consumed)
+
+            if start != FAIL:
+                before = count if consumed is None else len(consumed)
+                if matcher.suppress or consumed is None:
+                    end = matcher.match(buffer, start, None)
+                else:
+                    end = matcher.match(buffer, start, consumed)
+                if end != FAIL:
+                    if consumed is None:
+                        if not matcher.suppress and matcher.produces_result:
+                            count += 1
+                    else:
+                        count = len(consumed)
+                    if isinstance(matcher, Commit):
+                        # never roll back into the matchers before the commit
+                        del rollbacks[:]
+                        committed = True
+                    else:
+                        rollbacks.append((matcher, start, end, before, None))
+                    pos = end
+                    matcher_i += 1
+                    continue
+                if consumed is not None:
+                    del consumed[before:]
+
+            # rollback until successful
+            while rollbacks:
+                rollback_matcher, start, end, before, ends = rollbacks.pop()
+                matcher_i -= 1
+                result = None
+                if consumed is not None:
+                    if len(consumed) > before:
+                        result = consumed[before]
+                    del consumed[before:]
+                if ends is None:
+                    collect = consumed is not None and not rollback_matcher.suppress
+                    ends = rollback_matcher.rollback_ends(buffer, start, end, result, collect,
+                        self.viable_ends(buffer, matcher_i))
+                shorter = next(ends, None)
+                if shorter is not None:
+                    new_end, values = shorter
+                    if consumed is None:
+                        if not rollback_matcher.suppress and rollback_matcher.produces_result:
+                            count = before + 1
+                        else:
+                            count = before
+                    else:
+                        if values:
+                            consumed.extend(values)
+                        count = len(consumed)
+                    rollbacks.append((rollback_matcher, start, new_end, before, ends))
+                    pos = new_end
+                    matcher_i += 1
+                    break
             else:
-                matcher_i += 1
-        return consumed
+                if committed:
+                    raise CommitException(matcher=matcher, buffer=buffer, position=pos)
+                return FAIL
+
+        if out is not None:
+            out.append(consumed)
+        return pos
+
+    def viable_ends(self, buffer, index):
+        """
+        Returns a check for the positions where the matcher after
+        ``matchers[index]`` can start, so that rolling back skips the ends
+        where it would fail anyway.  Returns None if any position could work.
+        """
+        if self.separated_by is not None or index + 1 >= len(self.matchers):
+            return None
+        follower = self.matchers[index + 1]
+        if type(follower) is Literal:
+            literal = follower.literal
+            return lambda pos: buffer.startswith(literal, pos)
+        analysis = follower.analysis()
+        if analysis.nullable or analysis.first is None:
+            return None
+        first = analysis.first
+        return lambda pos: buffer.peek(pos) in first
 
     def minimum_length(self):
-        return sum(m.minimum_length() for m in self.matchers)
+        return sum(m.analysis().minimum_length for m in self.matchers)
 
     def maximum_length(self):
-        if any(m.maximum_length() == Infinity for m in self.matchers):
+        if any(m.analysis().maximum_length == Infinity for m in self.matchers):
             return Infinity
-        return sum(m.maximum_length() for m in self.matchers)
+        return sum(m.analysis().maximum_length for m in self.matchers)
+
+    def first_chars(self):
+        analyses = []
+        for matcher in self.matchers:
+            analysis = matcher.analysis()
+            if analyses and self.separated_by is not None:
+                # the separator can come before the next matcher
+                analyses.append(self.separated_by.analysis())
+            analyses.append(analysis)
+            if not analysis.nullable:
+                break
+        return union_first(analyses)
+
+    def regex_pattern(self, rollback=False):
+        patterns = []
+        # whether a value has been added, i.e. whether the separator is matched
+        produced = False
+        for matcher in self.matchers:
+            if self.separated_by is not None and produced:
+                separator = self.separated_by.regex_pattern()
+                if separator is None:
+                    return None
+                if self.separated_by.suppress:
+                    separator = skipped(separator)
+                patterns.append(separator)
+
+            pattern = matcher.regex_pattern(rollback=True)
+            if pattern is None:
+                return None
+            if matcher.suppress and matcher.analysis().maximum_length:
+                pattern = skipped(pattern)
+            patterns.append(pattern)
+
+            if self.separated_by is not None and not produced and not matcher.suppress:
+                produced = appends_value(matcher)
+                if produced is None:
+                    return None
+        # a sequence does not give back part of its match
+        return atomic(''.join(patterns))
 
 
 class Sequence(AutoSequence):
@@ -615,44 +1325,105 @@ class NMatches(Matcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        buffer.mark()
-        consumed = ResultList()
-        try:
-            matched_count = 0
-            while self.max is None or matched_count < self.max:
-                matched = self.matcher.consume(buffer)
-                if matched is not None:
-                    consumed.append(matched)
-                matched_count += 1
-        except ParseException:
-            pass
-        if self.min is not None and len(consumed) < self.min:
-            buffer.restore_mark()
-            raise ParseException(
-                'Expected {self!r} at {buffer!r}'.format(
-                    self=self,
-                    buffer=buffer)
-                )
-        buffer.forget_mark()
-        return consumed
-
-    def rollback(self, result, buffer):
-        min = 0 if self.min is None else self.min
-        if len(result) > min:
-            buffer.advance(-len(result[-1]))
-            return result[:-1]
-        raise RollbackException()
+    def match(self, buffer, pos, out):
+        matcher = self.matcher
+        max = self.max
+        consumed = None if out is None else ResultList()
+        count = 0
+        while max is None or count < max:
+            end = matcher.match(buffer, pos, consumed)
+            if end == FAIL:
+                break
+            count += 1
+            # an empty match will always match again
+            if end == pos:
+                break
+            pos = end
+        if self.min is not None and count < self.min:
+            return FAIL
+        if out is not None:
+            out.append(consumed)
+        return pos
+
+    def match_times(self, buffer, pos, max, out, sizes=None):
+        """
+        Matches at most ``max`` times, and returns the end position of every
+        match (starting with ``pos``), or ``FAIL`` if there were fewer than
+        ``self.min`` matches.  If ``sizes`` is a list, the number of values
+        after every match is appended to it.
+        """
+        matcher = self.matcher
+        consumed = None if out is None else ResultList()
+        ends = [pos]
+        while max is None or len(ends) <= max:
+            end = matcher.match(buffer, pos, consumed)
+            if end == FAIL:
+                break
+            ends.append(end)
+            if sizes is not None:
+                sizes.append(len(consumed))
+            # an empty match will always match again
+            if end == pos:
+                break
+            pos = end
+        if self.min is not None and len(ends) <= self.min:
+            return FAIL
+        if out is not None:
+            out.append(consumed)
+        return ends
+
+    def rollback_match(self, buffer, start, end, result, out):
+        ends = self.match_times(buffer, start, self.max, None)
+        if ends == FAIL or end not in ends:
+            return FAIL
+        # give back the last match
+        count = ends.index(end) - 1
+        if count < (self.min or 0):
+            return FAIL
+        return self.match_times(buffer, start, count, out)[-1]
+
+    def rollback_ends(self, buffer, start, end, result, collect, viable=None):
+        # match once, recording the end of every repetition, and then give
+        # back one repetition at a time
+        out = [] if collect else None
+        sizes = [0] if collect else None
+        ends = self.match_times(buffer, start, self.max, out, sizes)
+        if ends == FAIL or end not in ends:
+            return
+        for index in range(ends.index(end) - 1, (self.min or 0) - 1, -1):
+            if viable is None or viable(ends[index]):
+                yield ends[index], [out[0][:sizes[index]]] if collect else None
 
     def minimum_length(self):
         if self.min:
-            return self.matcher.minimum_length() * self.min
+            return self.matcher.analysis().minimum_length * self.min
         return 0
 
     def maximum_length(self):
-        if self.max is None or self.matcher.maximum_length() == Infinity:
+        if self.max is None or self.matcher.analysis().maximum_length == Infinity:
             return Infinity
-        return self.matcher.maximum_length() * self.max
+        return self.matcher.analysis().maximum_length * self.max
+
+    def first_chars(self):
+        return self.matcher.analysis().first
+
+    def regex_pattern(self, rollback=False):
+        pattern = self.matcher.regex_pattern()
+        # only the last repetition of a group is captured
+        if pattern is None or SKIPPED in pattern:
+            return None
+        minimum = self.min or 0
+        if minimum > 1 and self.matcher.analysis().nullable:
+            # NMatches stops after an empty match, a regex would repeat it
+            return None
+        if self.max is None:
+            repeat = '{{{0},}}'.format(minimum)
+        else:
+            repeat = '{{{0},{1}}}'.format(minimum, self.max)
+        pattern = '(?:' + pattern + ')' + repeat
+        if rollback:
+            return pattern
+        return atomic(pattern)
 
 
 class ZeroOrMore(NMatches):
@@ -714,18 +1485,121 @@ class Slice(Exactly):
 
         Sequence(...)[0]  # return just one item
         Sequence(...)[2, 4, 6]
+
+    When it is known which item of the sequence adds which value, the items
+    that the slice drops are matched without collecting their results (see
+    ``build_projection``).
     '''
     def __init__(self, matcher, slice, **kwargs):
         self.slice = slice
+        self.projection = None
         super(Slice, self).__init__(1, matcher, **kwargs)
 
-    def consume(self, buffer):
-        retval = super(Slice, self).consume(buffer)[0]
+    def build_projection(self):
+        """
+        Stores a copy of the sequence in ``self.projection``, where the items
+        whose values the slice drops are wrapped in ``Discard``, so that it
+        adds the values that the slice keeps (in order).  It is False if the
+        slice can't be pushed into the sequence: the matcher is not a
+        sequence, the number of values of an item depends on the input, a
+        separator is collected, or the slice reorders the values.
+
+        The separator is matched once there are values, so the first value of
+        a separated sequence is always added; ``self.dropped`` is the number
+        of values at the start of the projection that are not in the slice.
+        """
+        self.projection = False
+        self.dropped = 0
+        sequence = self.matcher
+        if not isinstance(sequence, AutoSequence) or any(isinstance(m, Commit) for m in sequence.matchers):
+            return False
+        separated_by = sequence.separated_by
+        if separated_by is not None and not separated_by.suppress:
+            return False
+
+        # the index of the matcher that adds each value
+        owners = []
+        for index, matcher in enumerate(sequence.matchers):
+            if matcher.suppress:
+                continue
+            appends = appends_value(matcher)
+            if appends is None:
+                return False
+            if appends:
+                owners.append(index)
+
+        values = range(len(owners))
         try:
-            iterator = iter(self.slice)
-            return ResultList(retval[item] for item in iterator)
-        except TypeError:
-            return retval.__getitem__(self.slice)
+            if isinstance(self.slice, int):
+                kept = [values[self.slice]]
+            elif isinstance(self.slice, slice):
+                kept = list(values[self.slice])
+            else:
+                kept = [values[item] for item in self.slice]
+        except (IndexError, TypeError):
+            return False
+        if any(a >= b for a, b in zip(kept, kept[1:])):
+            return False
+        keep = set(owners[value] for value in kept)
+        if separated_by is not None and owners and owners[0] not in keep:
+            keep.add(owners[0])
+            self.dropped = 1
+
+        matchers = [m if index in keep or index not in owners else Discard(m)
+            for index, m in enumerate(sequence.matchers)]
+        self.projection = AutoSequence(*matchers, sep=separated_by)
+        self.projected = len(kept) + self.dropped
+        return self.projection
+
+    def match(self, buffer, pos, out):
+        projection = self.projection
+        if projection is None:
+            projection = self.build_projection()
+        if projection:
+            if out is None:
+                return projection.match(buffer, pos, None)
+            values = []
+            end = projection.match(buffer, pos, values)
+            if end == FAIL:
+                return end
+            if len(values[0]) == self.projected:
+                out.append(self.project(values[0]))
+                return end
+            # an item didn't add the values it was expected to add
+
+        if out is None and appends_value(self.matcher):
+            return self.matcher.match(buffer, pos, None)
+        values = []
+        end = self.matcher.match(buffer, pos, values)
+        if end == FAIL or not values:
+            return FAIL
+        if out is not None:
+            retval = values[0]
+            try:
+                iterator = iter(self.slice)
+                out.append(ResultList(retval[item] for item in iterator))
+            except TypeError:
+                out.append(retval.__getitem__(self.slice))
+        return end
+
+    def project(self, values):
+        """
+        Returns the value of the Slice, from the values of the projection.
+        """
+        if isinstance(self.slice, int):
+            return values[self.dropped]
+        if self.dropped:
+            return values[self.dropped:]
+        return values
+
+    def regex_pattern(self, rollback=False):
+        projection = self.projection
+        if projection is None:
+            projection = self.build_projection()
+        if projection and not self.dropped:
+            # the dropped items are skipped() text
+            return projection.regex_pattern(rollback=rollback)
+        return None
 
     def __repr__(self, args_only=False):
         args = ['{self.matcher!r}, {self.slice!r}'.format(self=self)]
@@ -737,23 +1611,77 @@ class Slice(Exactly):
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
 
+class Discard(Matcher):
+    """
+    Matches like ``matcher``, but never collects its results.  Slice wraps
+    the items that it drops in a Discard.
+    """
+    default_suppressed = True
+    produces_result = False
+
+    def __init__(self, matcher, **kwargs):
+        self.matcher = to_matcher(matcher)
+        super(Discard, self).__init__(**kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, Discard) and self.matcher == other.matcher \
+            and super(Discard, self).__eq__(other)
+
+    def __repr__(self, args_only=False):
+        args = ['{self.matcher!r}'.format(self=self)]
+        args.extend(super(Discard, self).__repr__(args_only=True))
+        if args_only:
+            return args
+        return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
+
+    def match(self, buffer, pos, out):
+        return self.matcher.match(buffer, pos, None)
+
+    def skip(self, buffer, pos):
+        return self.matcher.skip(buffer, pos)
+
+    def regex_pattern(self, rollback=False):
+        return self.matcher.regex_pattern(rollback=rollback)
+
+    def rollback_match(self, buffer, start, end, result, out):
+        return self.matcher.rollback_match(buffer, start, end, None, None)
+
+    def rollback_ends(self, buffer, start, end, result, collect, viable=None):
+        return self.matcher.rollback_ends(buffer, start, end, None, False, viable)
+
+    def minimum_length(self):
+        return self.matcher.analysis().minimum_length
+
+    def maximum_length(self):
+        return self.matcher.analysis().maximum_length
+
+    def first_chars(self):
+        return self.matcher.analysis().first
+
+
 class OneLine(Exactly):
     def __init__(self, matcher, **kwargs):
         super(OneLine, self).__init__(1, matcher, **kwargs)
 
-    def consume(self, buffer):
-        start = buffer.position
-        retval = super(OneLine, self).consume(buffer)
-        end = buffer.position
-        matched = str(buffer)[start:end]
-        if "\n" in matched:
-            raise ParseException(
-            'New lines not valid in {self!r} at {buffer!r}'.format(
-                self=self,
-                buffer=buffer)
-            )
+    def regex_pattern(self, rollback=False):
+        return None
+
+    def match(self, buffer, pos, out):
+        if out is None and appends_value(self.matcher):
+            end = self.matcher.match(buffer, pos, None)
+        else:
+            values = []
+            end = self.matcher.match(buffer, pos, values)
+            if not values:
+                return FAIL
+        if end == FAIL:
+            return FAIL
+        if buffer.find("\n", pos, end) != -1:
+            return FAIL
         # return only the matched item
-        return retval[0]
+        if out is not None:
+            out.append(values[0])
+        return end
 
 
 class SeparatedBy(NMatches):
@@ -784,41 +1712,66 @@ class SeparatedBy(NMatches):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        buffer.mark()
-        consumed = ResultList()
-        try:
-            matched_count = 0
-            while self.max is None or matched_count < self.max:
-                if consumed:
-                    token_consumed = self.separated_by.consume(buffer)
-                    if not self.separated_by.suppress and token_consumed is not None:
-                        consumed.append(token_consumed)
-
-                matched = self.matcher.consume(buffer)
-                if matched is not None:
-                    consumed.append(matched)
-                matched_count += 1
-        except ParseException:
-            pass
-        if self.min is not None and len(consumed) < self.min:
-            buffer.restore_mark()
-            raise ParseException(
-                'Expected {self!r} at {buffer!r}'.format(
-                    self=self,
-                    buffer=buffer)
-                )
-        buffer.forget_mark()
-        return consumed
+    def match(self, buffer, pos, out):
+        matcher = self.matcher
+        separated_by = self.separated_by
+        # the separator is matched once there are values
+        appends = True if out is not None else appends_value(matcher)
+        if appends is None:
+            # that depends on the input, so the values are needed after all
+            out = []
+        consumed = None if out is None else ResultList()
+        produced = False
+        matched_count = 0
+        while self.max is None or matched_count < self.max:
+            size = 0 if consumed is None else len(consumed)
+            start = pos
+            if produced:
+                if separated_by.suppress or consumed is None:
+                    start = separated_by.match(buffer, pos, None)
+                else:
+                    start = separated_by.match(buffer, pos, consumed)
+                if start == FAIL:
+                    break
+
+            end = matcher.match(buffer, start, consumed)
+            if end == FAIL:
+                # don't keep the separator
+                if consumed is not None:
+                    del consumed[size:]
+                break
+            matched_count += 1
+            produced = appends if consumed is None else bool(consumed)
+            if end == pos:
+                break
+            pos = end
+        if self.min is not None and matched_count < self.min:
+            return FAIL
+        if out is not None:
+            out.append(consumed)
+        return pos
+
+    def rollback_match(self, buffer, start, end, result, out):
+        return FAIL
+
+    def rollback_ends(self, buffer, start, end, result, collect, viable=None):
+        return iter(())
+
+    def regex_pattern(self, rollback=False):
+        return None
 
 
 class AutoAny(Matcher):
     """
     Created when the `|` operator is used to combine matchers (an implicit
     `Any` matcher)
+
+    The alternatives are tried in order, but only the ones that can start with
+    the next character (according to their ``analysis()``) are tried at all.
     """
     def __init__(self, *matchers, **kwargs):
         self.matchers = [to_matcher(m) for m in matchers]
+        self.dispatch = None
         super(AutoAny, self).__init__(**kwargs)
 
     def __eq__(self, other):
@@ -829,32 +1782,61 @@ class AutoAny(Matcher):
         """
         An AutoAny object is created anytime two Matchers are 'OR'ed, and
         adding subsequent Matchers to that sequence *appends* the matchers.
+        The AutoAny itself is not changed (it could already be part of another
+        matcher, which caches its analysis), a new one is returned.
         """
-        self.matchers.append(to_matcher(other))
-        return self
-
-    def consume(self, buffer):
-        buffer.mark()
-        matcher_i = 0
-        while True:
-            if matcher_i == len(self.matchers):
-                break
-            matcher = self.matchers[matcher_i]
+        return AutoAny(*(self.matchers + [to_matcher(other)]))
 
-            buffer.mark()
+    def build_dispatch(self):
+        """
+        Builds a table from the next character to the alternatives (in their
+        original order) that could match starting with that character.  The
+        ``None`` entry holds the alternatives for every other character, and
+        the ``''`` entry (end of the buffer) holds the nullable alternatives.
+        """
+        analyses = [m.analysis() for m in self.matchers]
+        chars = set()
+        for analysis in analyses:
+            if analysis.first is not None:
+                chars |= analysis.first
+
+        # alternatives are shared between characters that select the same ones
+        shared = {}
+        def alternatives(indices):
+            indices = tuple(indices)
+            if indices not in shared:
+                shared[indices] = tuple(self.matchers[i] for i in indices)
+            return shared[indices]
+
+        always = [i for i, analysis in enumerate(analyses) if analysis.nullable or analysis.first is None]
+        dispatch = {}
+        for c in chars:
+            dispatch[c] = alternatives(i for i, analysis in enumerate(analyses)
+                if i in always or c in analysis.first)
+        dispatch[None] = alternatives(always)
+        dispatch[''] = alternatives(i for i, analysis in enumerate(analyses) if analysis.nullable)
+        return dispatch
+
+    def match(self, buffer, pos, out):
+        dispatch = self.dispatch
+        if dispatch is None:
+            dispatch = self.dispatch = self.build_dispatch()
+        matchers = dispatch.get(buffer.peek(pos))
+        if matchers is None:
+            matchers = dispatch[None]
+        if not matchers:
+            return FAIL
+        if len(matchers) > 1:
+            # the alternatives after this one are a choice point
+            buffer.choices += 1
             try:
-                consumed = matcher.consume(buffer)
-                buffer.forget_mark()
-                return consumed
-            except ParseException:
-                buffer.restore_mark()
-                matcher_i += 1
-
-        raise ParseException(
-            'Expected {self!r} at {buffer!r}'.format(
-                self=self,
-                buffer=buffer)
-            )
+                for matcher in matchers[:-1]:
+                    end = matcher.match(buffer, pos, out)
+                    if end != FAIL:
+                        return end
+            finally:
+                buffer.choices -= 1
+        return matchers[-1].match(buffer, pos, out)
 
     def __repr__(self, args_only=False):
         type_name = type(self).__name__
@@ -873,10 +1855,20 @@ class AutoAny(Matcher):
         return '{type_name}({args})'.format(type_name=type_name, args=', '.join(args))
 
     def minimum_length(self):
-        return min(m.minimum_length() for m in self.matchers)
+        return min(m.analysis().minimum_length for m in self.matchers)
 
     def maximum_length(self):
-        return max(m.maximum_length() for m in self.matchers)
+        return max(m.analysis().maximum_length for m in self.matchers)
+
+    def first_chars(self):
+        return union_first(m.analysis() for m in self.matchers)
+
+    def regex_pattern(self, rollback=False):
+        patterns = [m.regex_pattern() for m in self.matchers]
+        if not patterns or None in patterns:
+            return None
+        # the first alternative that matches is used, even if the rest fails
+        return atomic('|'.join(patterns))
 
 
 class Any(AutoAny):
@@ -905,11 +1897,36 @@ class Any(AutoAny):
         return AutoAny(*self.matchers) | other
 
 
+class Commit(SuppressedMatcher):
+    """
+    A "cut".  Once a sequence has matched a Commit, it doesn't roll back into
+    the matchers before it, and if a matcher after it fails, the parse fails
+    right away with a CommitException - no other alternatives are tried.
+
+    When no alternative or lookahead around it is still open (see
+    ``Buffer.choices``), the text before the commit will not be parsed again,
+    so the buffer discards its memo entries (see ``Buffer.commit``).
+
+        'def' + Commit() + Variable + '(' + ...
+    """
+    def match(self, buffer, pos, out):
+        # inside an alternative or a lookahead the parser can still go back
+        if not buffer.choices:
+            buffer.commit(pos)
+        return pos
+
+    def minimum_length(self):
+        return 0
+
+    def maximum_length(self):
+        return 0
+
+
 class StringStart(SuppressedMatcher):
-    def consume(self, buffer):
-        if buffer.position != 0:
-            raise ParseException('Expected buffer to be at StringStart(0), not {0}'.format(buffer.position))
-        return None
+    def match(self, buffer, pos, out):
+        if pos != buffer.start:
+            return FAIL
+        return pos
 
     def minimum_length(self):
         return 0
@@ -919,10 +1936,14 @@ class StringStart(SuppressedMatcher):
 
 
 class StringEnd(SuppressedMatcher):
-    def consume(self, buffer):
-        if buffer.position != len(buffer):
-            raise ParseException('Expected buffer to be at StringEnd({0}), not {1}'.format(len(buffer), buffer.position))
-        return None
+    def match(self, buffer, pos, out):
+        # (the end of a StreamBuffer is not known until it has been read)
+        if buffer.peek(pos):
+            return FAIL
+        return pos
+
+    def regex_pattern(self, rollback=False):
+        return r'\Z'
 
     def minimum_length(self):
         return 0
@@ -932,10 +1953,11 @@ class StringEnd(SuppressedMatcher):
 
 
 class LineStart(SuppressedMatcher):
-    def consume(self, buffer):
-        if buffer.position > 0 and buffer[-1] != "\n":
-            raise ParseException('Expected {self!r} at {0}, not {1!r}'.format(buffer.position - 1, buffer[-1], self=self))
-        return None
+    def match(self, buffer, pos, out):
+        prev = buffer.peek(pos - 1)
+        if prev and prev != "\n":
+            return FAIL
+        return pos
 
     def minimum_length(self):
         return 0
@@ -945,13 +1967,11 @@ class LineStart(SuppressedMatcher):
 
 
 class LineEnd(SuppressedMatcher):
-    def consume(self, buffer):
-        if buffer.position < len(buffer) and \
-           buffer[0] != "\n" and \
-           buffer[0] != "\r" and \
-           buffer[-1:0] != "\r\n":
-            raise ParseException('Expected {self!r} at {0}, not {1!r}'.format(buffer.position, buffer[0], self=self))
-        return None
+    def match(self, buffer, pos, out):
+        next = buffer.peek(pos)
+        if next and next != "\n" and next != "\r":
+            return FAIL
+        return pos
 
     def minimum_length(self):
         return 0
@@ -967,12 +1987,14 @@ class WordStart(SuppressedMatcher):
         self.consumable = consumable if consumable else self.default_word
         super(WordStart, self).__init__(**kwargs)
 
-    def consume(self, buffer):
-        if buffer.position > 0 and buffer[-1] in self.consumable:
-            raise ParseException('Expected {self!r} at {0}, not {1!r}'.format(buffer.position - 1, buffer[-1], self=self))
-        if buffer[0] not in self.consumable:
-            raise ParseException('Expected {self!r} at {0}, not {1!r}'.format(buffer.position, buffer[0], self=self))
-        return None
+    def match(self, buffer, pos, out):
+        prev = buffer.peek(pos - 1)
+        if prev and prev in self.consumable:
+            return FAIL
+        next = buffer.peek(pos)
+        if not next or next not in self.consumable:
+            return FAIL
+        return pos
 
     def minimum_length(self):
         return 0
@@ -988,12 +2010,14 @@ class WordEnd(SuppressedMatcher):
         self.consumable = consumable if consumable else self.default_word
         super(WordEnd, self).__init__(**kwargs)
 
-    def consume(self, buffer):
-        if buffer[-1] not in self.consumable:
-            raise ParseException('Expected {self!r} at {0}, not {1!r}'.format(buffer.position - 1, buffer[-1], self=self))
-        if buffer.position < len(buffer) and buffer[0] in self.consumable:
-            raise ParseException('Expected {self!r} at {0}, not {1!r}'.format(buffer.position, buffer[0], self=self))
-        return None
+    def match(self, buffer, pos, out):
+        prev = buffer.peek(pos - 1)
+        if not prev or prev not in self.consumable:
+            return FAIL
+        next = buffer.peek(pos)
+        if next and next in self.consumable:
+            return FAIL
+        return pos
 
     def minimum_length(self):
         return 0
@@ -1014,15 +2038,23 @@ class NextIs(SuppressedMatcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        buffer.mark()
+    def match(self, buffer, pos, out):
+        # the lookahead always goes back to ``pos``
+        buffer.choices += 1
         try:
-            self.matcher.consume(buffer)
-        except ParseException as e:
-            buffer.restore_mark()
-            raise e
-        buffer.restore_mark()
-        return None
+            end = self.matcher.match(buffer, pos, None)
+        finally:
+            buffer.choices -= 1
+        if end == FAIL:
+            return FAIL
+        return pos
+
+    def regex_pattern(self, rollback=False):
+        pattern = self.matcher.regex_pattern()
+        # groups in a lookahead capture text after the match
+        if pattern is None or SKIPPED in pattern:
+            return None
+        return '(?=' + pattern + ')'
 
     def minimum_length(self):
         return 0
@@ -1032,15 +2064,21 @@ class NextIs(SuppressedMatcher):
 
 
 class NextIsNot(NextIs):
-    def consume(self, buffer):
-        buffer.mark()
+    def match(self, buffer, pos, out):
+        buffer.choices += 1
         try:
-            super(NextIsNot, self).consume(buffer)
-        except ParseException:
-            buffer.restore_mark()
+            end = self.matcher.match(buffer, pos, None)
+        finally:
+            buffer.choices -= 1
+        if end == FAIL:
+            return pos
+        return FAIL
+
+    def regex_pattern(self, rollback=False):
+        pattern = self.matcher.regex_pattern()
+        if pattern is None:
             return None
-        buffer.restore_mark()
-        raise ParseException('Did not expect buffer to be {self.matcher!r}, at {buffer!r}'.format(self=self, buffer=buffer))
+        return '(?!' + pattern + ')'
 
 
 class PrevIs(SuppressedMatcher):
@@ -1059,29 +2097,30 @@ class PrevIs(SuppressedMatcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        buffer.mark()
-        length = self.matcher.minimum_length()
-        max_length = self.matcher.maximum_length()
-        # assert False
-        while buffer.position > 0:
-            buffer.advance(-1)
-            test_buffer = buffer[0:length]
-            try:
-                self.matcher.consume(test_buffer)
-                # make sure we used the entire buffer
-                if not test_buffer.rest():
-                    # it worked!  restore the mark and continue
-                    buffer.restore_mark()
-                    return None
-            except ParseException:
-                pass
-            length += 1
-            if length > max_length:
-                break
-
-        buffer.restore_mark()
-        raise ParseException('Expect buffer to be {self.matcher!r}, at {buffer!r}'.format(self=self, buffer=buffer))
+    def matches_before(self, buffer, end):
+        """
+        Checks every window that ends at ``end``, shortest first, and returns
+        True if self.matcher consumes one of them entirely.
+        """
+        analysis = self.matcher.analysis()
+        min_length = analysis.minimum_length
+        max_length = analysis.maximum_length
+        start = end - max(min_length, 1)
+        if max_length == Infinity:
+            stop = buffer.start
+        else:
+            stop = max(buffer.start, end - max_length)
+        while start >= stop:
+            # make sure we used the entire window
+            if self.matcher.match(buffer.window(start, end), start, None) == end:
+                return True
+            start -= 1
+        return False
+
+    def match(self, buffer, pos, out):
+        if self.matches_before(buffer, pos):
+            return pos
+        return FAIL
 
     def minimum_length(self):
         return 0
@@ -1096,43 +2135,25 @@ class PrevIsNot(PrevIs):
     that no previous text would match self.matcher.  It is helped (but not by
     much) by using the "minimum_length" and "maximum_length" methods.
     """
-    def consume(self, buffer):
-        buffer.mark()
-        length = self.matcher.minimum_length()
-        max_length = self.matcher.maximum_length()
-        raise_me = None
-        while buffer.position > 0:
-            buffer.advance(-1)
-            test_buffer = buffer[0:length]
-            try:
-                self.matcher.consume(test_buffer)
-                # make sure we used the entire buffer
-                if not test_buffer.rest():
-                    # it worked!  dang
-                    buffer.restore_mark()
-                    raise_me = ParseException('Did not expect buffer to be {self.matcher!r}, at {buffer!r}'.format(self=self, buffer=buffer))
-                    break
-            except ParseException:
-                pass
-            length += 1
-            if length > max_length:
-                break
-
-        if raise_me:
-            raise raise_me
-        buffer.restore_mark()
-        return None
+    def match(self, buffer, pos, out):
+        if self.matches_before(buffer, pos):
+            return FAIL
+        return pos
 
 
 class Group(Matcher):
     """
     Flattens a Sequence into one string.
+
+    If the matcher can be lowered to a regular expression (see
+    ``regex_pattern``), the whole group is matched with one regex call.
     """
     def __init__(self, matcher, *args, **kwargs):
         if args:
             self.matcher = Sequence(matcher, *args)
         else:
             self.matcher = to_matcher(matcher)
+        self.scanner = None
         super(Group, self).__init__(**kwargs)
 
     def __eq__(self, other):
@@ -1149,17 +2170,82 @@ class Group(Matcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        r = self.matcher.consume(buffer)
-        if isinstance(r, str):
-            return r
-        return ''.join(str(r))
+    def build_scanner(self):
+        """
+        Compiles the regex of the matcher into ``self.scanner`` (False if it
+        can't be lowered to one), and stores the names of its ``skipped()``
+        groups, in order.
+        """
+        self.scanner = False
+        self.skipped = []
+        pattern = self.matcher.regex_pattern()
+        if pattern is None:
+            return False
+        try:
+            scanner = re.compile(pattern)
+        except re.error:
+            return False
+        groups = sorted((index, name) for name, index in scanner.groupindex.items()
+            if name.startswith(SKIPPED))
+        self.skipped = [name for index, name in groups]
+        self.scanner = scanner
+        return scanner
+
+    def match(self, buffer, pos, out):
+        scanner = self.scanner
+        if scanner is None:
+            scanner = self.build_scanner()
+        # (a stream would have to load the rest of the input for the regex)
+        if scanner and buffer.complete:
+            return self.match_scanner(buffer, pos, out)
+
+        if out is None:
+            return self.matcher.match(buffer, pos, None)
+        values = []
+        end = self.matcher.match(buffer, pos, values)
+        if end != FAIL:
+            r = values[0] if values else ResultList()
+            if isinstance(r, (str, bytes, Span)):
+                out.append(r)
+            elif buffer.binary:
+                out.append(bytes(r))
+            else:
+                out.append(''.join(str(r)))
+        return end
+
+    def match_scanner(self, buffer, pos, out):
+        match = buffer.match(self.scanner, pos)
+        if match is None:
+            return FAIL
+        end = match.end()
+        if out is None:
+            return end
+        # remove the suppressed text
+        text = []
+        start = pos
+        for name in self.skipped:
+            skip_start, skip_end = match.span(name)
+            if skip_end > skip_start >= start:
+                text.append(buffer.text(start, skip_start))
+                start = skip_end
+        if text:
+            text.append(buffer.text(start, end))
+            out.append(text[0][:0].join(text))
+        else:
+            out.append(buffer.span(pos, end))
+        return end
+
+    def regex_pattern(self, rollback=False):
+        return self.matcher.regex_pattern()
 
     def minimum_length(self):
-        return self.matcher.minimum_length()
+        return self.matcher.analysis().minimum_length
 
     def maximum_length(self):
-        return self.matcher.maximum_length()
+        return self.matcher.analysis().maximum_length
+
+    def first_chars(self):
+        return self.matcher.analysis().first
 
 
 class Flatten(Matcher):
@@ -1187,26 +2273,78 @@ class Flatten(Matcher):
             return args
         return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
 
-    def consume(self, buffer):
-        results = self.matcher.consume(buffer)
-        if isinstance(results, str):
-            return results
-        return self.consume_list(results)
+    def match(self, buffer, pos, out):
+        if out is None:
+            return self.matcher.match(buffer, pos, None)
+        values = []
+        end = self.matcher.match(buffer, pos, values)
+        if end != FAIL and values:
+            results = values[0]
+            if isinstance(results, (str, bytes, Span)):
+                out.append(results)
+            else:
+                out.append(self.consume_list(results))
+        return end
 
     def consume_list(self, results):
         ret = ResultList()
         for r in results:
-            if isinstance(r, str):
+            if isinstance(r, (str, bytes, Span)):
                 ret.append(r)
             else:
                 ret.extend(self.consume_list(r))
         return ret
 
     def minimum_length(self):
-        return self.matcher.minimum_length()
+        return self.matcher.analysis().minimum_length
+
+    def maximum_length(self):
+        return self.matcher.analysis().maximum_length
+
+    def first_chars(self):
+        return self.matcher.analysis().first
+
+
+class Memoize(Matcher):
+    """
+    Stores the result of matching at every position in the buffer's MemoTable,
+    so that backtracking into the same position doesn't match again.
+    """
+    def __init__(self, matcher, **kwargs):
+        self.matcher = to_matcher(matcher)
+        super(Memoize, self).__init__(**kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, Memoize) and self.matcher == other.matcher \
+            and super(Memoize, self).__eq__(other)
+
+    def __repr__(self, args_only=False):
+        args = ['{self.matcher!r}'.format(self=self)]
+        args.extend(super(Memoize, self).__repr__(args_only=True))
+        if args_only:
+            return args
+        return '{type.__name__}({args})'.format(type=type(self), args=', '.join(args))
+
+    def match(self, buffer, pos, out):
+        return buffer.memo.match(self, self.matcher.match, buffer, pos, out)
+
+    def regex_pattern(self, rollback=False):
+        return self.matcher.regex_pattern(rollback=rollback)
+
+    def rollback_match(self, buffer, start, end, result, out):
+        return self.matcher.rollback_match(buffer, start, end, result, out)
+
+    def rollback_ends(self, buffer, start, end, result, collect, viable=None):
+        return self.matcher.rollback_ends(buffer, start, end, result, collect, viable)
+
+    def minimum_length(self):
+        return self.matcher.analysis().minimum_length
 
     def maximum_length(self):
-        return self.matcher.maximum_length()
+        return self.matcher.analysis().maximum_length
+
+    def first_chars(self):
+        return self.matcher.analysis().first
 
 
 class Later(Matcher):
@@ -1217,12 +2355,31 @@ class Later(Matcher):
         self.grammar = None
         super(Later, self).__init__()
 
-    def consume(self, buffer):
+    def match(self, buffer, pos, out):
         try:
             self.grammar = GrammarType.types[self.grammar_type]
         except KeyError:
-            raise ParseException('Unknown grammar {self.grammar_type!r}'.format(self=self))
-        return self.grammar(buffer, *self.args, **self.kwargs)
+            # a mistake in the grammar, not a parse failure
+            raise ValueError('Unknown grammar {self.grammar_type!r}'.format(self=self))
+        if not self.args and not self.kwargs:
+            return self.grammar.match(buffer, pos, out)
+
+        buffer.seek(pos)
+        try:
+            consumed = self.grammar(buffer, *self.args, **self.kwargs)
+        except CommitException:
+            raise
+        except ParseException:
+            return FAIL
+        if out is not None:
+            out.append(consumed)
+        return buffer.tell()
+
+    def analysis(self):
+        grammar = GrammarType.types.get(self.grammar_type)
+        if grammar is None or self.args or self.kwargs:
+            return UNKNOWN
+        return grammar.analysis()
 
     def __repr__(self, args_only=False):
         if self.grammar:
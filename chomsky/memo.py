@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+__all__ = ['MemoTable']
+
+
+'Stored in place of the value when the match was made without collecting results'
+NO_VALUE = object()
+
+
+class MemoTable(object):
+    """
+    Packrat memoization.  Stores the result of matching a matcher (or Grammar)
+    at a position - successes *and* failures - so that backtracking doesn't
+    parse the same text with the same matcher twice.
+
+    Every Buffer has a MemoTable (``buffer.memo``), but it is only used by
+    matchers that opt in, with ``Memoize(matcher)`` or by setting
+    ``memoize = True`` on a Grammar class.
+
+    ``maxsize`` bounds the number of entries; the least recently used entries
+    are evicted first.  ``discard_before(pos)`` drops every entry before a
+    position that the parser will never backtrack into.
+    """
+    default_maxsize = 10000
+
+    def __init__(self, maxsize=None):
+        self.maxsize = self.default_maxsize if maxsize is None else maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def match(self, key, match, buffer, pos, out):
+        """
+        Calls ``match(buffer, pos, out)``, unless the result of matching
+        ``key`` (a matcher or Grammar class) at ``pos`` is already stored.
+        """
+        entries = self.entries
+        entry_key = (id(key), pos)
+        entry = entries.get(entry_key)
+        if entry is not None and (out is None or entry[1] is not NO_VALUE):
+            self.hits += 1
+            entries.move_to_end(entry_key)
+            end, value = entry
+            if out is not None and value is not None and end >= 0:
+                out.append(value)
+            return end
+
+        self.misses += 1
+        if out is None:
+            end = match(buffer, pos, None)
+            value = NO_VALUE if end >= 0 else None
+        else:
+            values = []
+            end = match(buffer, pos, values)
+            value = values[0] if values else None
+            if value is not None:
+                out.append(value)
+        entries[entry_key] = (end, value)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return end
+
+    def discard_before(self, pos):
+        """
+        Removes every entry that starts before ``pos``.
+        """
+        entries = self.entries
+        discard = [key for key in entries if key[1] < pos]
+        for key in discard:
+            del entries[key]
+        self.evictions += len(discard)
+
+    def clear(self):
+        self.entries.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return self.hits / total
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return 'MemoTable(size={size}, maxsize={self.maxsize}, hits={self.hits}, misses={self.misses}, evictions={self.evictions})'.format(
+            size=len(self.entries),
+            self=self,
+            )
@@ -1,9 +1,15 @@
+__all__ = ['ResultList', 'Span']
+
+
 class ResultList(list):
     def __repr__(self):
         return 'ResultList(' + super(ResultList, self).__repr__() + ')'
 
     def __str__(self):
-        return ''.join(str(result) for result in self)
+        return ''.join(to_text(result) for result in self)
+
+    def __bytes__(self):
+        return b''.join(bytes(result) for result in self)
 
     def __getitem__(self, key):
         if isinstance(key, slice):
@@ -15,3 +21,60 @@ class ResultList(list):
         deprecated, but list defines it, so have to override it here
         '''
         return ResultList(super(ResultList, self).__getslice__(start, stop))
+
+
+class Span(object):
+    """
+    A result that refers to the text between ``start`` and ``end`` in the
+    source, instead of copying it.  The string is only created by ``str()``,
+    and a Span compares equal to its string.
+
+    ``Chars`` and ``Group`` return Spans when the buffer was created with
+    ``Buffer(text, spans=True)``.
+    """
+    __slots__ = ('buffer', 'start', 'end')
+
+    def __init__(self, buffer, start, end):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+
+    def text(self):
+        """
+        The text of the span: a string, or bytes in a ``BytesBuffer``.
+        """
+        return self.buffer.text(self.start, self.end)
+
+    def __str__(self):
+        return to_text(self.text())
+
+    def __bytes__(self):
+        return bytes(self.buffer.buffer[self.start:self.end])
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __eq__(self, other):
+        if isinstance(other, Span):
+            other = other.text()
+        return self.text() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.text())
+
+    def __repr__(self):
+        return '{type.__name__}({text!r}, start={self.start!r}, end={self.end!r})'.format(
+            type=type(self), text=self.text(), self=self)
+
+
+def to_text(result):
+    """
+    ``str()`` of a result.  Bytes (from a ``BytesBuffer``) are decoded as
+    latin-1, one character per byte, which is how the matchers see them.
+    """
+    if isinstance(result, bytes):
+        return result.decode('latin-1')
+    return str(result)
@@ -0,0 +1,76 @@
+import re
+
+from pytest import raises
+from chomsky import *
+
+
+class CustomBad(Grammar):
+    grammar = Group(Optional('-') + Chars('0123456789'))
+    bad_grammar = Any(Literal('-0'), Literal('-00')) + Optional(Chars('0'))
+
+
+class FirstAlternativeBad(Grammar):
+    grammar = Chars('ab')
+    # Any doesn't try 'ab' once 'a' matched, even if the rest of the sequence
+    # fails
+    bad_grammar = Any(Literal('a'), Literal('ab'))
+
+
+class LaterBad(Grammar):
+    grammar = Chars('abc')
+    bad_grammar = Later('CustomBadWord')
+
+
+class CustomBadWord(Grammar):
+    grammar = Literal('abc')
+
+
+def test_bad_grammar_is_compiled_once():
+    assert Grammar.is_bad_grammar is None
+    assert Integer.is_bad_grammar is None
+    assert Float.is_bad_grammar is Float.is_bad_grammar
+    assert Float.is_bad_grammar.__self__.pattern
+
+
+def test_reserved_word_bad_grammar_is_a_set_lookup():
+    assert PythonVariable.is_bad_grammar('class')
+    assert not PythonVariable.is_bad_grammar('klass')
+
+
+def test_regex_bad_grammar():
+    assert isinstance(CustomBad.is_bad_grammar.__self__, re.Pattern)
+    assert CustomBad.is_bad_grammar('-0')
+    assert CustomBad.is_bad_grammar('-000')
+    assert not CustomBad.is_bad_grammar('-01')
+    assert CustomBad('-01').parsed == '-01'
+    assert CustomBad('0').parsed == '0'
+    with raises(ParseException):
+        CustomBad('-000')
+
+
+def test_regex_bad_grammar_does_not_backtrack_into_any():
+    assert not FirstAlternativeBad.is_bad_grammar('ab')
+    assert FirstAlternativeBad('ab').parsed == 'ab'
+    with raises(ParseException):
+        FirstAlternativeBad('a')
+
+
+def test_matcher_bad_grammar():
+    assert not LaterBad.is_bad_grammar('ab')
+    assert LaterBad.is_bad_grammar('abc')
+    assert LaterBad('cab').parsed == 'cab'
+    with raises(ParseException):
+        LaterBad('abc')
+
+
+def test_builtin_bad_grammars():
+    for grammar, bad, good in [
+            (Float, '-0.000', '-0.001'),
+            (BinaryInteger, '-0b000', '-0b001'),
+            (OctalInteger, '-0o000', '-0o001'),
+            (HexadecimalInteger, '-0x000', '-0x001'),
+            ]:
+        assert grammar.is_bad_grammar(bad)
+        assert not grammar.is_bad_grammar(good)
+        assert grammar.test(good)
+        assert not grammar.test(bad)
@@ -0,0 +1,111 @@
+from pytest import raises
+from chomsky import *
+
+
+class CompileExpression(Grammar):
+    grammar = Value + ZeroOrMore(Operator + Value)
+
+
+class CompileParens(Grammar):
+    grammar = ('(' + Later('CompileParens') + ')') | Chars('ab')
+
+
+class CompileMemoized(Grammar):
+    memoize = True
+    grammar = Integer + Optional(Literal('!'))
+
+
+class CompileExclamation(Grammar):
+    def consume(self, buffer):
+        parsed = ''
+        while buffer and buffer[0] == '!':
+            parsed += '!'
+            buffer.advance(1)
+        return parsed
+
+
+class CompileCustom(Grammar):
+    grammar = Integer + CompileExclamation
+
+
+def results(matcher, text, pos=0):
+    out = []
+    end = matcher.match(Buffer(text), pos, out)
+    return end, [repr(value) for value in out]
+
+
+def assert_same(matcher, *texts):
+    compiled = matcher.compile()
+    for text in texts:
+        for pos in range(len(text) + 1):
+            assert results(compiled, text, pos) == results(matcher, text, pos), (text, pos)
+
+
+def test_compile_is_cached():
+    assert Integer.compile() is Integer.compile()
+    matcher = Chars('a') + 'b'
+    assert matcher.compile() is matcher.compile()
+    assert 'def ' in matcher.compile().source
+
+
+def test_compiled_consume():
+    compiled = CompileExpression.compile()
+    m = compiled('1 + foo_bar * "hi" - 0x1f')
+    assert isinstance(m, CompileExpression)
+    assert m == CompileExpression('1 + foo_bar * "hi" - 0x1f')
+    with raises(ParseException):
+        compiled('+')
+
+
+def test_compiled_grammars():
+    assert_same(Integer, '0', '-12', ' 12', '12a', '')
+    assert_same(Float, '1.5', '-0.0', '-0.01', '1 .5')
+    assert_same(Number, '1.5', '0x1f', '0o17', '0b101', '12', '-0x0')
+    assert_same(PythonVariable, 'foo', 'if', 'iffy', '_')
+    assert_same(String, '"a\\"b"', "'''a\nb'''", '"abc', "'\\u12af'")
+    assert_same(CompileExpression, '1 + 2', 'a*b - "c" / 3.5', '1 +', 'x')
+
+
+def test_compiled_recursion():
+    assert_same(CompileParens, '((a))', '((b)', '(', 'ab)')
+
+
+def test_compiled_memoize():
+    buffer = Buffer('12!')
+    assert CompileMemoized.compile()(buffer) == CompileMemoized('12!')
+    assert buffer.memo.misses
+
+
+def test_compiled_custom_consume():
+    assert_same(CompileCustom, '12!!', '12', '!!')
+
+
+def test_compiled_rollback():
+    assert_same(Chars('ab') + 'b', 'abb', 'ab', 'b', 'aa')
+    assert_same(ZeroOrMore('ab') + 'ab' + Chars('b', min=0) + 'b', 'ababb', 'abab', 'ab', 'abb')
+    assert_same(OneOrMore(Optional('a')) + 'b', 'aab', 'b', 'a')
+    assert_same(Memoize(Chars('a')) + 'a', 'aaa', 'a')
+    assert_same(Exactly(2, Chars('a', max=2)) + 'a', 'aaaa', 'aaa', 'aa')
+
+
+def test_compiled_matchers():
+    assert_same(Any('a', 'ab') + 'b', 'ab', 'abb')
+    assert_same(Any(Whitespace(), 'a') + Chars('b', min=0), ' b', 'ab', 'b')
+    assert_same(Sequence('a', 'b', sep=','), 'a,b', 'ab', 'a,')
+    assert_same(Sequence(Chars('a'), 'b', sep=Literal(',')), 'aa,b', 'a,,b')
+    assert_same(Literal('a', suppress=True) + 'b' + Whitespace(min=1) + 'c', 'ab c', 'abc')
+    assert_same(Group(Chars('a') + Whitespace() + Chars('b')), 'a b', 'ab', 'b')
+    assert_same(NextIsNot('a') + Chars('ab'), 'ba', 'ab')
+    assert_same(OneOf('=', '==') + '=', '===', '==', '=')
+    assert_same(StringStart() + 'a' + StringEnd(), 'a', 'aa')
+    assert_same(Literal('a') + Char('bc') + Char('c'), 'abc', 'acc', 'ab')
+    assert_same((Literal('(') + Chars('ab') + Chars('b', min=0) + ')')[1:-1], '(abb)', '(a)', '(ab')
+    assert_same((Integer + '+' + Integer)[2], '1 + 2', '1+', '+2')
+
+
+def test_compiled_fallbacks():
+    assert_same(SeparatedBy(',', Chars('ab')), 'a,b,', 'a')
+    assert_same((Literal('a') + 'b')[1], 'ab', 'a')
+    assert_same(Flatten(Chars('a') + (Literal('b') + 'c')), 'abc', 'ab')
+    assert_same(Regex('[a-c]+') + 'c', 'abcc', 'abc')
+    assert_same(PrevIs('a') + 'b', 'ab', 'b')
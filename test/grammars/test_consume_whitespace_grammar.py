@@ -6,3 +6,46 @@ def test_binary_grammar_0b0():
     m = BinaryInteger('  0b0  ')
     assert m.parsed == '0b0'
     assert str(m) == '0b0'
+
+
+class CountingLiteral(Literal):
+    def __init__(self, literal, **kwargs):
+        self.count = 0
+        super(CountingLiteral, self).__init__(literal, **kwargs)
+
+    def match(self, buffer, pos, out):
+        self.count += 1
+        return super(CountingLiteral, self).match(buffer, pos, out)
+
+
+class WhitespaceOnce(Grammar):
+    grammar = CountingLiteral('a')
+
+
+class WhitespaceTwice(Grammar):
+    grammar = Optional(' ') + CountingLiteral('a')
+
+
+def test_skip_whitespace_first():
+    assert WhitespaceOnce.skip_whitespace_first()
+    assert not WhitespaceTwice.skip_whitespace_first()
+    assert Integer.skip_whitespace_first()
+
+
+def test_leading_whitespace_is_parsed_once():
+    WhitespaceOnce.grammar.count = 0
+    assert str(WhitespaceOnce('  a')) == 'a'
+    assert WhitespaceOnce.grammar.count == 1
+
+
+def test_grammar_that_starts_with_whitespace():
+    assert str(WhitespaceTwice(' a')) == ' a'
+    assert str(WhitespaceTwice('  a')) == 'a'
+
+
+def test_whitespace_between_grammars():
+    matcher = Integer + Operator + Integer
+    assert matcher.skip_separator == Whitespace()
+    assert matcher(' 1 +  2') == matcher('1+2')
+    assert Whitespace().skip(Buffer('  1'), 0) == 2
+    assert Whitespace(min=2).skip(Buffer(' 1'), 0) == 0
@@ -1,3 +1,4 @@
+from pytest import raises
 from chomsky import *
 
 
@@ -15,3 +16,11 @@ def test_recur_repr1():
 
 def test_recur_repr2():
     assert repr(LaterTest('((foo))')) == "LaterTest('((foo))')"
+
+
+def test_later_unknown_grammar():
+    matcher = Literal('a') | Later('NoSuchGrammar')
+    for parse in [matcher, matcher.compile('python'), matcher.compile('machine')]:
+        with raises(ValueError) as e:
+            parse('b')
+        assert str(e.value) == "Unknown grammar 'NoSuchGrammar'"
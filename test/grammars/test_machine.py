@@ -0,0 +1,111 @@
+from pytest import raises
+from chomsky import *
+
+
+class MachineExpression(Grammar):
+    grammar = Value + ZeroOrMore(Operator + Value)
+
+
+class MachineParens(Grammar):
+    grammar = ('(' + Later('MachineParens') + ')') | Chars('ab')
+
+
+class MachineMemoized(Grammar):
+    memoize = True
+    grammar = Integer + Optional(Literal('!'))
+
+
+def results(matcher, text, pos=0):
+    out = []
+    end = matcher.match(Buffer(text), pos, out)
+    return end, [repr(value) for value in out]
+
+
+def assert_same(matcher, *texts):
+    compiled = matcher.compile('machine')
+    for text in texts:
+        for pos in range(len(text) + 1):
+            assert results(compiled, text, pos) == results(matcher, text, pos), (text, pos)
+
+
+def test_machine_is_cached():
+    assert Integer.compile('machine') is Integer.compile('machine')
+    assert Integer.compile('machine') is not Integer.compile('python')
+    assert Integer.compile('machine').code
+
+
+def test_unknown_backend():
+    with raises(ValueError):
+        Integer.compile('fortran')
+
+
+def test_machine_consume():
+    compiled = MachineExpression.compile('machine')
+    m = compiled('1 + foo_bar * "hi" - 0x1f')
+    assert isinstance(m, MachineExpression)
+    assert m == MachineExpression('1 + foo_bar * "hi" - 0x1f')
+    with raises(ParseException):
+        compiled('+')
+
+
+def test_machine_grammars():
+    assert_same(Integer, '0', '-12', ' 12', '12a', '')
+    assert_same(Float, '1.5', '-0.0', '-0.01', '1 .5')
+    assert_same(Number, '1.5', '0x1f', '0o17', '0b101', '12', '-0x0')
+    assert_same(PythonVariable, 'foo', 'if', 'iffy', '_')
+    assert_same(String, '"a\\"b"', "'''a\nb'''", '"abc', "'\\u12af'")
+    assert_same(MachineExpression, '1 + 2', 'a*b - "c" / 3.5', '1 +', 'x')
+
+
+def test_machine_recursion():
+    assert_same(MachineParens, '((a))', '((b)', '(', 'ab)')
+
+
+def test_machine_deep_recursion():
+    depth = 5000
+    m = MachineParens.compile('machine')('(' * depth + 'a' + ')' * depth)
+    for _ in range(depth):
+        assert isinstance(m, MachineParens)
+        m = m.parsed[1]
+    assert m == 'a'
+
+
+def test_machine_nesting_limit():
+    # the interpreter recurses a few times per Grammar, and the Python backend
+    # once, so only the machine parses input that is nested this deeply
+    text = '(' * 1000 + 'a' + ')' * 1000
+    with raises(RecursionError):
+        MachineParens(text)
+    with raises(RecursionError):
+        MachineParens.compile('python')(text)
+    assert isinstance(MachineParens.compile('machine')(text), MachineParens)
+    assert MachineParens.compile('machine').recognize(text) == len(text)
+
+
+def test_machine_memoize():
+    buffer = Buffer('12!')
+    assert MachineMemoized.compile('machine')(buffer) == MachineMemoized('12!')
+
+
+def test_machine_rollback():
+    assert_same(Chars('ab') + 'b', 'abb', 'ab', 'b', 'aa')
+    assert_same(ZeroOrMore('ab') + 'ab' + Chars('b', min=0) + 'b', 'ababb', 'abab', 'ab', 'abb')
+    assert_same(OneOrMore(Optional('a')) + 'b', 'aab', 'b', 'a')
+    assert_same(Exactly(2, Chars('a', max=2)) + 'a', 'aaaa', 'aaa', 'aa')
+
+
+def test_machine_matchers():
+    assert_same(Any('a', 'ab') + 'b', 'ab', 'abb')
+    assert_same(Any(Whitespace(), 'a') + Chars('b', min=0), ' b', 'ab', 'b')
+    assert_same(Sequence('a', 'b', sep=','), 'a,b', 'ab', 'a,')
+    assert_same(Literal('a', suppress=True) + 'b' + Whitespace(min=1) + 'c', 'ab c', 'abc')
+    assert_same(Group(Chars('a') + Whitespace() + Chars('b')), 'a b', 'ab', 'b')
+    assert_same(NextIsNot('a') + Chars('ab'), 'ba', 'ab')
+    assert_same(OneOf('=', '==') + '=', '===', '==', '=')
+
+
+def test_machine_fallbacks():
+    assert_same(SeparatedBy(',', Chars('ab')), 'a,b,', 'a')
+    assert_same((Literal('a') + 'b')[1], 'ab', 'a')
+    assert_same(Regex('[a-c]+') + 'c', 'abcc', 'abc')
+    assert_same(PrevIs('a') + 'b', 'ab', 'b')
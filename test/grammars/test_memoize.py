@@ -0,0 +1,67 @@
+from chomsky import *
+
+
+class MemoInteger(Integer):
+    memoize = True
+
+
+class MemoNumber(Grammar):
+    grammar = (MemoInteger + '.' + MemoInteger) | (MemoInteger + '/' + MemoInteger) | MemoInteger
+
+
+class MemoLater(Grammar):
+    memoize = True
+    grammar = ('(' + Later('MemoLater') + ')' + '!') | ('(' + Later('MemoLater') + ')') | 'foo'
+
+
+def test_memoize_grammar():
+    buffer = Buffer('12/34')
+    m = MemoNumber(buffer)
+    assert m.parsed == [MemoInteger('12'), '/', MemoInteger('34')]
+    # the first MemoInteger was re-used by the second alternative
+    assert buffer.memo.hits == 1
+
+
+def test_memoize_recursive_grammar():
+    buffer = Buffer('(((foo)))')
+    m = MemoLater(buffer)
+    assert str(m) == '(((foo)))'
+    assert buffer.memo.hits > 0
+
+
+def test_memoize_matcher():
+    matcher = Memoize(Chars('ab')) + 'c' | Memoize(Chars('ab')) + 'd'
+    buffer = Buffer('abd')
+    assert matcher(buffer) == ['ab', 'd']
+    assert buffer.memo.hits == 0
+    shared = Memoize(Chars('ab'))
+    matcher = shared + 'c' | shared + 'd'
+    buffer = Buffer('abd')
+    assert matcher(buffer) == ['ab', 'd']
+    assert buffer.memo.hits == 1
+
+
+def test_memoize_failures():
+    shared = Memoize(Literal('a') + 'x')
+    matcher = shared + 'c' | shared + 'd' | 'abc'
+    buffer = Buffer('abc')
+    assert matcher(buffer) == 'abc'
+    assert buffer.memo.misses == 1
+    assert buffer.memo.hits == 1
+
+
+def test_memo_table_maxsize():
+    memo = MemoTable(maxsize=2)
+    matcher = OneOrMore(Memoize(Char('ab')))
+    buffer = Buffer('abab', memo=memo)
+    assert matcher(buffer) == ['a', 'b', 'a', 'b']
+    assert len(memo) == 2
+    assert memo.evictions == 3
+
+
+def test_memo_table_discard_before():
+    memo = MemoTable()
+    matcher = OneOrMore(Memoize(Char('ab')))
+    matcher(Buffer('abab', memo=memo))
+    memo.discard_before(2)
+    assert sorted(pos for _, pos in memo.entries) == [2, 3, 4]
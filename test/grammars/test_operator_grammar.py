@@ -64,3 +64,30 @@ def test_operator_grammar_binary_or():
 def test_operator_fail():
     with raises(ParseException):
         Operator('a')
+
+
+def test_operator_grammar_longest():
+    for op in ['<', '<<', '<=', '*', '**', '/', '//', '&', '&&']:
+        m = Operator(op)
+        assert m.parsed == op
+
+
+def test_operator_grammar_longest_in_sequence():
+    class ShiftTest(Grammar):
+        grammar = Integer + Operator + Integer
+    m = ShiftTest('1 << 2')
+    assert m.parsed == [Integer('1'), Operator('<<'), Integer('2')]
+
+
+def test_assignment_grammar_longest():
+    for op in ['**=', '//=', '*=', '/=', '=']:
+        assert Assignment(op).parsed == op
+
+
+def test_custom_operator_grammar_longest():
+    class ArrowOperator(Grammar, metaclass=OperatorGrammarType):
+        operators = ['-', '->', '-->', '=']
+    assert ArrowOperator('-->x').parsed == '-->'
+    assert ArrowOperator('--x').parsed == '-'
+    with raises(ParseException):
+        ArrowOperator('x')
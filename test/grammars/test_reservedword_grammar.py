@@ -53,3 +53,14 @@ def test_rubyreservedword_grammar():
 def test_reservedword_fail():
     with raises(ParseException):
         MockReservedWord('function')
+
+
+def test_reservedword_keywords():
+    assert MockReservedWord.keywords == frozenset(['def'])
+    assert 'while' in PythonReservedWord.keywords
+    assert 'elseif' in PhpReservedWord.keywords
+
+
+def test_reservedword_longest():
+    m = PhpReservedWord('elseif')
+    assert m.parsed == 'elseif'
@@ -135,3 +135,17 @@ def test_phpvariable_fail_nodollar():
 def test_rubyvariable_fail_reserved():
     with raises(ParseException):
         RubyVariable('def')
+
+
+def test_pythonvariable_reserved_prefix():
+    # only whole words are reserved
+    for name in ['define', 'iffy', 'is_ok', 'classes', 'd']:
+        m = PythonVariable(name)
+        assert m.parsed == name
+
+
+def test_rubyvariable_reserved_words():
+    for word in RubyReservedWord.words:
+        if word.isidentifier():
+            with raises(ParseException):
+                RubyVariable(word)
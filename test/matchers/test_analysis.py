@@ -0,0 +1,81 @@
+import string
+from chomsky import *
+
+
+def test_char_analysis():
+    analysis = Char('ab').analysis()
+    assert analysis.nullable is False
+    assert analysis.first == frozenset('ab')
+    assert analysis.minimum_length == 1
+    assert analysis.maximum_length == 1
+
+
+def test_inverse_char_analysis():
+    assert Char('ab', inverse=True).analysis().first is None
+
+
+def test_chars_analysis():
+    analysis = Chars('ab', min=0, max=3).analysis()
+    assert analysis.nullable is True
+    assert analysis.first == frozenset('ab')
+    assert analysis.maximum_length == 3
+
+
+def test_sequence_analysis():
+    analysis = (Optional('-') + NextIsNot('0') + Chars('0123456789')).analysis()
+    assert analysis.nullable is False
+    assert analysis.first == frozenset('-0123456789')
+    assert analysis.minimum_length == 1
+
+
+def test_any_analysis():
+    analysis = (Literal('abc') | Literal('de') | Chars('x', min=0)).analysis()
+    assert analysis.nullable is True
+    assert analysis.first == frozenset('adx')
+    assert analysis.minimum_length == 0
+    assert analysis.maximum_length == Infinity
+
+
+def test_regex_analysis_is_unknown():
+    analysis = (Regex('[a-z]') + 'b').analysis()
+    assert analysis.first is None
+
+
+def test_suppressed_matcher_analysis():
+    class SkipOne(SuppressedMatcher):
+        def match(self, buffer, pos, out):
+            return pos + 1 if pos < buffer.end else FAIL
+
+    assert SkipOne().analysis().first is None
+    assert (SkipOne() + 'b').analysis().first is None
+    assert (SkipOne() + 'b').test('ab')
+    assert StringStart().analysis().first == frozenset()
+    assert (LineStart() + 'b').analysis().first == frozenset('b')
+
+
+def test_analysis_is_cached():
+    matcher = Literal('ab') + Chars('c')
+    assert matcher.analysis() is matcher.analysis()
+
+
+def test_grammar_analysis():
+    analysis = Integer.analysis()
+    assert analysis.nullable is False
+    assert analysis.first == frozenset('-0123456789' + string.whitespace)
+
+
+def test_recursive_grammar_analysis():
+    class RecursiveAnalysis(Grammar):
+        grammar = ('[' + Later('RecursiveAnalysis') + ']') | 'x'
+    analysis = RecursiveAnalysis.analysis()
+    assert analysis.first == frozenset('[x' + string.whitespace)
+    assert analysis.minimum_length == 1
+
+
+def test_can_start():
+    buffer = Buffer('abc')
+    assert Literal('a').can_start(buffer, 0)
+    assert not Literal('b').can_start(buffer, 0)
+    assert not Literal('bcd').can_start(buffer, 1)
+    assert Optional('b').can_start(buffer, 0)
+    assert not Integer.can_start(buffer, 0)
@@ -60,3 +60,32 @@ def test_autoany():
 def test_any_fail():
     with raises(ParseException):
         any_matcher('bahhumbug')
+
+
+def test_any_matcher_dispatch():
+    matcher = Any(Literal('ab'), Literal('cd'), Chars('x', min=0), Regex('[a-z]+'))
+    dispatch = matcher.build_dispatch()
+    assert dispatch['a'] == (matcher.matchers[0], matcher.matchers[2], matcher.matchers[3])
+    assert dispatch['c'] == (matcher.matchers[1], matcher.matchers[2], matcher.matchers[3])
+    assert dispatch[None] == (matcher.matchers[2], matcher.matchers[3])
+    # Regex cannot be analyzed, so it is always tried
+    assert dispatch[''] == (matcher.matchers[2], matcher.matchers[3])
+
+
+def test_any_matcher_dispatch_keeps_order():
+    matcher = Any(Literal('a'), Chars('ab'), Literal('ab'))
+    assert matcher('ab') == 'a'
+    matcher = Any(Chars('ab'), Literal('a'))
+    assert matcher('ab') == 'ab'
+
+
+def test_any_matcher_or_returns_new_any():
+    matcher = Literal('a') | Literal('b')
+    parent = matcher + 'x'
+    assert matcher('b') == 'b'
+    assert parent.analysis().first == frozenset('ab')
+    extended = matcher | Literal('c')
+    assert extended('c') == 'c'
+    assert matcher.matchers == [Literal('a'), Literal('b')]
+    assert not matcher.test('c')
+    assert not parent.test('cx')
@@ -0,0 +1,101 @@
+import re
+from pytest import raises
+from chomsky import *
+
+
+def test_buffer_peek():
+    buffer = Buffer('abc')
+    assert buffer.peek() == 'a'
+    assert buffer.peek(2) == 'c'
+    assert buffer.peek(3) == ''
+    assert buffer.peek(-1) == ''
+
+
+def test_buffer_startswith():
+    buffer = Buffer('abcde')
+    buffer.advance(1)
+    assert buffer.startswith('bcd')
+    assert not buffer.startswith('abc')
+    assert buffer.startswith('de', 3)
+    assert not buffer.startswith('ef', 3)
+
+
+def test_buffer_match():
+    buffer = Buffer('abc123')
+    buffer.advance(3)
+    match = buffer.match(re.compile('[0-9]+'))
+    assert match.start() == 3
+    assert match.end() == 6
+    assert buffer.match(re.compile('[a-z]+')) is None
+
+
+def test_buffer_window():
+    buffer = Buffer('abcdef')
+    window = buffer.window(2, 4)
+    assert window.buffer is buffer.buffer
+    assert window.position == 2
+    assert len(window) == 2
+    assert str(window) == 'cd'
+    assert window.peek(4) == ''
+    assert not window.startswith('cde')
+    assert window.match(re.compile('[a-z]+')).end() == 4
+
+
+def test_buffer_find():
+    buffer = Buffer('ab\ncd')
+    assert buffer.find('\n') == 2
+    assert buffer.find('\n', 3) == -1
+    assert buffer.find('\n', 0, 2) == -1
+
+
+def test_regex_matches_in_place():
+    matcher = Literal('abc') + Regex('[0-9]+')
+    assert matcher('abc123') == ['abc', '123']
+
+
+def test_previs_multiple_characters():
+    matcher = Chars('abx') + PrevIs('ab') + Literal('c')
+    assert matcher('xabc') == ['xab', 'c']
+
+
+def test_buffer_tell_and_seek():
+    buffer = Buffer('abcdef')
+    pos = buffer.tell()
+    buffer.seek(4)
+    assert buffer.tell() == 4
+    assert buffer.peek() == 'e'
+    buffer.seek(pos)
+    assert buffer.position == 0
+
+
+def test_buffer_marks():
+    buffer = Buffer('abcdef')
+    buffer.mark()
+    buffer.advance(2)
+    buffer.mark('ignored')
+    buffer.advance(2)
+    assert buffer.forget_mark() == (2, 4)
+    buffer.restore_mark()
+    assert buffer.position == 0
+    with raises(IndexError):
+        buffer.restore_mark()
+
+
+def test_buffer_debug_marks():
+    matcher = Literal('a')
+    buffer = Buffer('abcdef', debug_marks=True)
+    buffer.mark(matcher)
+    buffer.advance(2)
+    with raises(Exception):
+        buffer.restore_mark(Literal('b'))
+    buffer.mark(matcher)
+    buffer.restore_mark(matcher)
+
+
+def test_buffer_line_col():
+    buffer = Buffer('ab\ncd\n\nx')
+    assert buffer.newlines() == [2, 5, 6]
+    assert buffer.line_col() == (1, 1)
+    assert [buffer.line_col(pos) for pos in [2, 3, 5, 6, 7, 8]] == [(1, 3), (2, 1), (2, 3), (3, 1), (4, 1), (4, 2)]
+    assert [buffer.line_start(pos) for pos in [0, 2, 3, 6, 7, 8]] == [0, 0, 3, 6, 7, 7]
+    assert BytesBuffer(b'ab\ncd').line_col(4) == (2, 2)
@@ -0,0 +1,64 @@
+import re
+from pytest import raises
+from chomsky import *
+
+
+class BytesExpression(Grammar):
+    grammar = Value + ZeroOrMore(Operator + Value)
+
+
+def test_bytes_buffer():
+    buffer = BytesBuffer(b'abc123')
+    assert buffer.peek() == 'a'
+    assert buffer.startswith('abc')
+    assert buffer.find('2') == 4
+    assert buffer.text(1, 4) == b'bc1'
+    assert buffer.match(re.compile('[a-z]+([0-9])')).group(1) == b'1'
+    assert bytes(buffer.window(2, 4)) == b'c1'
+    assert str(buffer) == 'abc123'
+
+
+def test_bytes_results():
+    assert (Literal('a') + Char('bc') + OneOf('x', 'xy'))(b'abxy') == [b'a', b'b', b'xy']
+    assert Group(Literal('a') + Literal('-', suppress=True) + 'b')(b'a-b') == b'ab'
+    assert Flatten(Chars('a') + (Literal('b') + 'c'))(b'abc') == [b'a', b'b', b'c']
+    assert Regex('(a)(b)', group=(1, 2))(b'ab') == [b'a', b'b']
+
+
+def test_bytes_grammars():
+    assert Integer(b'-12').parsed == b'-12'
+    assert Number(b'0x1f').parsed == b'0x1f'
+    assert String(b'"a\\"b"').parsed == b'a\\"b'
+    assert PythonVariable(b'iffy').parsed == b'iffy'
+    assert not PythonVariable.test(b'if')
+    with raises(ParseException):
+        Integer(b'x')
+
+
+def test_bytes_like():
+    text = '1 + foo_bar * "hi" - 0x1f / 2.5'
+    expected = BytesExpression(text)
+    for data in [text.encode(), bytearray(text.encode()), memoryview(text.encode())]:
+        parsed = BytesExpression(data)
+        assert parsed == BytesExpression(BytesBuffer(text.encode()))
+        assert str(parsed) == str(expected)
+        assert bytes(parsed) == str(expected).encode()
+
+
+def test_bytes_spans():
+    parsed = Integer(BytesBuffer(b'  123', spans=True)).parsed
+    assert isinstance(parsed, Span)
+    assert parsed == b'123'
+    assert bytes(parsed) == b'123'
+    assert str(parsed) == '123'
+
+
+def test_bytes_compiled():
+    text = b'1 + foo_bar * "hi"'
+    for backend in ['python', 'machine']:
+        assert BytesExpression.compile(backend)(text) == BytesExpression(text)
+
+
+def test_bytes_encoding():
+    buffer = BytesBuffer('"caf\xe9"'.encode('utf-8'), encoding='utf-8')
+    assert String(buffer).parsed == 'caf\xe9'
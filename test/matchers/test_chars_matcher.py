@@ -61,3 +61,21 @@ def test_chars_matcher_fail():
         for p in parse:
             with raises(ParseException):
                 matcher(p)
+
+
+def test_chars_matcher_regex_characters():
+    matcher = Chars('^]-\\[')
+    parsed = matcher('[^-\\]a')
+    assert parsed == '[^-\\]'
+
+
+def test_chars_matcher_min_max():
+    matcher = Chars('ab', min=2, max=3)
+    assert matcher('ababab') == 'aba'
+    with raises(ParseException):
+        matcher('a')
+
+
+def test_chars_matcher_long_run():
+    matcher = Chars('a')
+    assert matcher('a' * 100000 + 'b') == 'a' * 100000
@@ -0,0 +1,129 @@
+import io
+from pytest import raises
+from chomsky import *
+
+
+class CommitCall(Grammar):
+    grammar = Literal('call') + Commit() + Whitespace(min=1) + Chars('abc') + ';'
+
+
+class CommitStatement(Grammar):
+    grammar = CommitCall | Chars('abcl') + ';'
+
+
+def test_commit_repr():
+    assert repr(Commit()) == 'Commit()'
+
+
+def test_commit_lengths():
+    assert Commit().minimum_length() == 0
+    assert Commit().maximum_length() == 0
+
+
+def test_commit_is_suppressed():
+    matcher = Literal('a') + Commit() + 'b'
+    assert matcher('ab') == ['a', 'b']
+
+
+def test_commit_failure_is_reported():
+    matcher = Literal('a') + Commit() + 'b'
+    with raises(CommitException) as e:
+        matcher('ac')
+    assert e.value.position == 1
+
+
+def test_failure_before_commit():
+    matcher = (Literal('a') + Commit() + 'b') | 'c'
+    assert matcher('c') == 'c'
+
+
+def test_commit_skips_alternatives():
+    matcher = (Literal('a') + Commit() + 'b') | Chars('ac')
+    assert matcher('ab') == ['a', 'b']
+    with raises(CommitException):
+        matcher('ac')
+    assert (Literal('a') + 'b' | Chars('ac'))('ac') == 'ac'
+
+
+def test_commit_in_grammar():
+    assert str(CommitStatement('call abc;')) == 'callabc;'
+    assert str(CommitStatement('abc;')) == 'abc;'
+    with raises(CommitException):
+        CommitStatement('call  x;')
+
+
+def test_commit_does_not_roll_back():
+    with raises(CommitException):
+        (Chars('a') + Commit() + 'a')('aaa')
+    assert (Chars('a') + 'a')('aaa') == ['aa', 'a']
+
+
+def test_rollback_after_commit():
+    matcher = Literal('a') + Commit() + Chars('b') + 'b'
+    assert matcher('abbb') == ['a', 'bb', 'b']
+
+
+def test_commit_in_repetition():
+    matcher = ZeroOrMore(Literal('a') + Commit() + 'b') + Chars('ac')
+    assert matcher('ababc') == [[['a', 'b'], ['a', 'b']], 'c']
+    with raises(CommitException):
+        matcher('abac')
+
+
+def test_commit_discards_memo():
+    memoized = Memoize(Chars('a'))
+    buffer = Buffer('aa;b')
+    matcher = (memoized + ';' | memoized + ';') + Commit() + 'b'
+    matcher(buffer)
+    assert buffer.committed == 3
+    assert len(buffer.memo) == 0
+
+
+def test_commit_in_nested_alternative():
+    inner = Sequence(Literal('ab'), Commit())
+    outer = (inner + 'X') | (Literal('a') + Chars('b') + 'Y')
+    buffer = Buffer('abY')
+    assert outer(buffer) == ['a', 'b', 'Y']
+    assert buffer.committed == 0
+    assert buffer.choices == 0
+    assert outer(StreamBuffer(io.StringIO('abY'), chunk_size=1)) == ['a', 'b', 'Y']
+    for backend in ['python', 'machine']:
+        assert outer.compile(backend)(Buffer('abY')) == ['a', 'b', 'Y']
+    assert (NextIs(inner) + 'a' + Chars('b') + 'Y')(StreamBuffer(io.StringIO('abY'), chunk_size=1)) == ['a', 'b', 'Y']
+
+
+def test_commit_keeps_memo_in_alternative():
+    memoized = Memoize(Chars('a'))
+    buffer = Buffer('aab')
+    matcher = (Sequence(memoized, Commit()) + 'c') | (memoized + 'b')
+    assert matcher(buffer) == ['aa', 'b']
+    assert buffer.committed == 0
+    assert buffer.memo.hits == 1
+
+
+def test_buffer_commit():
+    buffer = Buffer('abc')
+    assert buffer.committed == 0
+    buffer.commit(2)
+    buffer.commit(1)
+    assert buffer.committed == 2
+
+
+def test_compiled_commit():
+    for backend in ['python', 'machine']:
+        compiled = CommitStatement.compile(backend)
+        assert compiled('call abc;') == CommitStatement('call abc;')
+        assert compiled('abc;') == CommitStatement('abc;')
+        with raises(CommitException):
+            compiled('call  x;')
+
+
+def test_commit_test():
+    matcher = Literal('a') + Commit() + 'b' | 'ac'
+    assert not matcher.test('ac')
+    assert matcher.recognize('ac') == FAIL
+    assert matcher.test('ab')
+    assert not CommitStatement.test('call  x;')
+    assert CommitStatement.recognize('call  x;') == FAIL
+    for backend in ['python', 'machine']:
+        assert not CommitStatement.compile(backend).test('call  x;')
@@ -0,0 +1,103 @@
+from pytest import raises
+from chomsky import *
+
+
+class Bang(Matcher):
+    '''
+    A custom matcher that only implements the old consume() API
+    '''
+    def consume(self, buffer):
+        if buffer and buffer[0] == '!':
+            buffer.advance(1)
+            return '!'
+        raise ParseException(matcher=self, buffer=buffer)
+
+
+class UpperChars(Chars):
+    def consume(self, buffer):
+        return super(UpperChars, self).consume(buffer).upper()
+
+
+class ILiteral(Literal):
+    '''
+    A case insensitive Literal, that only overrides consume()
+    '''
+    def consume(self, buffer):
+        pos = buffer.position
+        if buffer.text(pos, pos + len(self.literal)).lower() != self.literal.lower():
+            raise ParseException(matcher=self, buffer=buffer)
+        buffer.advance(len(self.literal))
+        return self.literal
+
+
+def test_match_returns_end():
+    buffer = Buffer('abcd')
+    out = []
+    assert Literal('ab').match(buffer, 0, out) == 2
+    assert out == ['ab']
+    assert buffer.position == 0
+
+
+def test_match_fail():
+    out = []
+    assert Literal('ab').match(Buffer('xyz'), 0, out) == FAIL
+    assert out == []
+
+
+def test_match_without_results():
+    matcher = Chars('ab') + Literal('c')
+    assert matcher.match(Buffer('abbc'), 0, None) == 4
+
+
+def test_match_sequence():
+    matcher = Chars('abc') + Literal('c') + Chars('de')
+    out = []
+    assert matcher.match(Buffer('baced'), 0, out) == 5
+    assert out == [['ba', 'c', 'ed']]
+
+
+def test_match_any():
+    matcher = Literal('a') | Literal('b')
+    out = []
+    assert matcher.match(Buffer('xb'), 1, out) == 2
+    assert out == ['b']
+
+
+def test_custom_consume_matcher():
+    matcher = Literal('a') + Bang() + Literal('b')
+    assert matcher('a!b') == ['a', '!', 'b']
+    with raises(ParseException):
+        matcher('a?b')
+
+
+def test_custom_consume_calls_super():
+    matcher = UpperChars('abc') + Literal('!')
+    assert matcher('abc!') == ['ABC', '!']
+
+
+def test_custom_consume_subclass():
+    assert ILiteral('ab').regex_pattern() is None
+    assert ILiteral('ab').analysis().first is None
+    matcher = Group(ILiteral('ab') + 'c')
+    assert matcher('ABc') == 'abc'
+    for backend in ['python', 'machine']:
+        assert matcher.compile(backend)('ABc') == 'abc'
+        assert (ILiteral('ab') + 'c').compile(backend)('aBc') == ['ab', 'c']
+
+
+def test_match_is_abstract():
+    class Nothing(Matcher):
+        pass
+
+    with raises(NotImplementedError):
+        Nothing()('a')
+    with raises(NotImplementedError):
+        (Literal('a') + Nothing())('a')
+
+
+def test_grammar_match():
+    out = []
+    assert Integer.match(Buffer('123 abc'), 0, out) == 3
+    assert out == [Integer('123')]
+    assert isinstance(out[0], Integer)
+    assert PythonVariable.match(Buffer('def'), 0, None) == FAIL
@@ -0,0 +1,68 @@
+import re
+from chomsky import *
+
+
+class MmapExpression(Grammar):
+    grammar = Value + ZeroOrMore(Operator + Value)
+
+
+def mapped(tmp_path, content, **kwargs):
+    path = tmp_path / 'input.txt'
+    path.write_bytes(content)
+    return MmapBuffer(str(path), **kwargs)
+
+
+def test_mmap_buffer(tmp_path):
+    buffer = mapped(tmp_path, b'abc123')
+    assert len(buffer) == 6
+    assert buffer.peek() == 'a'
+    assert buffer.peek(6) == ''
+    assert buffer.startswith('abc')
+    assert not buffer.startswith('abcd', 3)
+    assert buffer.find('2') == 4
+    assert buffer.text(1, 4) == 'bc1'
+    match = buffer.match(re.compile('[a-z]+([0-9])'))
+    assert match.end() == 4
+    assert match.group(1) == '1'
+    assert str(buffer.window(2, 4)) == 'c1'
+
+
+def test_mmap_buffer_close(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_bytes(b'123')
+    with MmapBuffer(str(path)) as buffer:
+        assert Integer(buffer) == Integer('123')
+    assert buffer.buffer.closed
+
+
+def test_mmap_buffer_grammar(tmp_path):
+    text = '1 + foo_bar * "hi" - 0x1f / 2.5'
+    buffer = mapped(tmp_path, text.encode('latin-1'))
+    assert MmapExpression(buffer) == MmapExpression(text)
+    assert MmapExpression.compile()(mapped(tmp_path, text.encode('latin-1'))) == MmapExpression(text)
+
+
+def test_mmap_buffer_latin1(tmp_path):
+    buffer = mapped(tmp_path, 'caf\xe9!'.encode('latin-1'))
+    assert (Chars('acf\xe9') + '!')(buffer) == ['caf\xe9', '!']
+
+
+def test_mmap_buffer_utf8(tmp_path):
+    text = '"h\xe9llo → w\xf6rld"'
+    buffer = mapped(tmp_path, text.encode('utf-8'), encoding='utf-8')
+    assert String(buffer) == String(text)
+    assert buffer.position == len(text.encode('utf-8'))
+
+
+def test_mmap_buffer_spans(tmp_path):
+    buffer = mapped(tmp_path, b'  123', spans=True)
+    parsed = Integer(buffer).parsed
+    assert isinstance(parsed, Span)
+    assert (parsed.start, parsed.end) == (2, 5)
+    assert parsed == '123'
+
+
+def test_mmap_buffer_empty(tmp_path):
+    buffer = mapped(tmp_path, b'')
+    assert not buffer
+    assert ZeroOrMore('a')(buffer) == []
@@ -0,0 +1,34 @@
+from pytest import raises
+from chomsky import *
+
+
+def test_oneof_repr():
+    assert repr(OneOf('<', '<<')) == "OneOf('<', '<<')"
+    assert repr(OneOf('<', suppress=True)) == "OneOf('<', suppress=True)"
+
+
+def test_oneof_eq():
+    assert OneOf('a', 'ab') == OneOf('ab', 'a')
+    assert OneOf('a', 'ab') != OneOf('a', 'abc')
+
+
+def test_oneof_longest():
+    matcher = OneOf('a', 'abc', 'ab')
+    assert matcher('a') == 'a'
+    assert matcher('ab') == 'ab'
+    assert matcher('abd') == 'ab'
+    assert matcher('abcd') == 'abc'
+
+
+def test_oneof_lengths():
+    matcher = OneOf('a', 'abc', 'ab')
+    assert matcher.minimum_length() == 1
+    assert matcher.maximum_length() == 3
+    assert matcher.analysis().first == frozenset('a')
+
+
+def test_oneof_fail():
+    matcher = OneOf('ab', 'cd')
+    for p in ['', 'a', 'ca', 'x']:
+        with raises(ParseException):
+            matcher(p)
@@ -0,0 +1,52 @@
+from pytest import raises
+from chomsky import *
+
+
+def test_parse_exception_message():
+    assert str(ParseException('oops')) == 'oops'
+
+
+def test_parse_exception_from_matcher():
+    matcher = Literal('abc')
+    buffer = Buffer('xyz')
+    with raises(ParseException) as e:
+        matcher.consume(buffer)
+    assert e.value.matcher is matcher
+    assert e.value.buffer is buffer
+    assert e.value.position == 0
+    assert str(e.value) == "Expected Literal('abc') at Buffer('' + 'xyz')"
+
+
+def test_parse_exception_renders_position():
+    buffer = Buffer('abcd')
+    buffer.advance(1)
+    error = ParseException(matcher=Char('x'), buffer=buffer)
+    # moving the buffer afterwards does not change the message
+    buffer.advance(2)
+    assert error.message == "Expected Char('x') at Buffer('a' + 'bcd')"
+
+
+def test_parse_exception_custom_message():
+    buffer = Buffer('ab')
+    error = ParseException('Did not expect {matcher!r} at {buffer}', matcher=Literal('a'), buffer=buffer)
+    assert str(error) == "Did not expect Literal('a') at Buffer('' + 'ab')"
+
+
+def test_backtrack():
+    error = backtrack()
+    assert error is BACKTRACK
+    assert isinstance(error, ParseException)
+    with raises(ParseException):
+        raise backtrack()
+    assert backtrack().__traceback__ is None
+
+
+def test_parse_exception_line_col():
+    buffer = Buffer('1\n2\n  x')
+    buffer.advance(4)
+    with raises(ParseException) as e:
+        Literal('y').consume(buffer)
+    assert e.value.line_col() == (3, 1)
+    assert str(e.value) == "Expected Literal('y') at Buffer('1\\n2\\n' + '  x') (line 3, column 1)"
+    error = ParseException('{line}:{column}', matcher=Literal('y'), buffer=buffer, position=6)
+    assert str(error) == '3:3'
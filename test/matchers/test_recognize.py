@@ -0,0 +1,69 @@
+from chomsky import *
+
+
+class RecognizeCounted(Grammar):
+    grammar = Chars('ab')
+    instances = 0
+
+    def __new__(cls, *args, **kwargs):
+        RecognizeCounted.instances += 1
+        return super(RecognizeCounted, cls).__new__(cls)
+
+
+class RecognizeList(Grammar):
+    grammar = SeparatedBy(',', RecognizeCounted)
+
+
+class RecognizeNotIf(Grammar):
+    grammar = Chars('fi')
+    bad_grammar = 'if'
+
+
+def test_recognize():
+    assert Literal('ab').recognize('abc') == 2
+    assert Literal('ab').recognize('ba') == FAIL
+    assert (Chars('a') + 'b').recognize('aab') == 3
+    assert Integer.recognize('-123 + 4') == 4
+    assert Integer.recognize('x') == FAIL
+
+
+def test_recognize_buffer():
+    buffer = Buffer('1 + 2')
+    buffer.advance(4)
+    assert Integer.recognize(buffer) == 5
+    assert buffer.position == 4
+
+
+def test_recognize_builds_no_grammars():
+    RecognizeCounted.instances = 0
+    assert RecognizeList.recognize('a, b,ab;') == 7
+    assert RecognizeList.compile().recognize('a, b,ab;') == 7
+    assert RecognizeList.compile('machine').recognize('a, b,ab;') == 7
+    assert RecognizeCounted.instances == 0
+    assert RecognizeList('a,b')
+    assert RecognizeCounted.instances == 2
+
+
+def test_recognize_bad_grammar():
+    assert RecognizeNotIf.recognize('iff') == 3
+    assert RecognizeNotIf.recognize('if') == FAIL
+
+
+def test_recognize_same_ends():
+    matchers = [
+        SeparatedBy(',', Chars('ab')),
+        SeparatedBy(',', Optional('a')),
+        Sequence(Chars('a'), 'b', sep=','),
+        Exactly(2, Chars('a', max=2)) + 'a',
+        (Literal('a') + 'b')[1],
+        RecognizeList,
+        RecognizeNotIf,
+        ]
+    texts = ['', 'a', 'a,b', 'a,,b', ',a', 'aa,b', 'aaa', 'ab', 'if', 'iff', 'a,b,ab;']
+    for matcher in matchers:
+        for text in texts:
+            out = []
+            end = matcher.match(Buffer(text), 0, out)
+            assert matcher.recognize(text) == end, (matcher, text)
+            for backend in ['python', 'machine']:
+                assert matcher.compile(backend).recognize(text) == end, (matcher, text, backend)
@@ -0,0 +1,83 @@
+import re
+import string
+
+from chomsky import *
+
+
+def interpreted(matcher):
+    group = Group(matcher)
+    group.scanner = False
+    return group
+
+
+def assert_same(matcher, *texts):
+    fused = Group(matcher)
+    slow = interpreted(matcher)
+    for text in texts:
+        fused_out = []
+        slow_out = []
+        fused_end = fused.match(Buffer(text), 0, fused_out)
+        slow_end = slow.match(Buffer(text), 0, slow_out)
+        assert (fused_end, fused_out) == (slow_end, slow_out), text
+    assert fused.scanner
+
+
+def test_builtin_groups_are_fused():
+    for grammar in [Integer, Float, BinaryInteger, OctalInteger, HexadecimalInteger, Variable, EscapeSequence]:
+        assert grammar.grammar.build_scanner()
+
+
+def test_unfused_group():
+    group = Group(Literal('a') + Later('Integer'))
+    assert group('a1') == 'a1'
+    assert group.scanner is False
+
+
+def test_integer():
+    assert_same(Integer.grammar, '0', '01', '-0', '-01', '123', '-123', '12a', '1.5', '')
+
+
+def test_float():
+    assert_same(Float.grammar, '1.5', '-0.5', '1 .5', ' 1.5', '1.', '0.0', '1.5e', '.5')
+
+
+def test_prefixed_integers():
+    assert_same(HexadecimalInteger.grammar, '0x1f', '-0XFF', '0x', '0xg')
+    assert_same(OctalInteger.grammar, '0o17', '017', '-0O7', '08')
+    assert_same(BinaryInteger.grammar, '0b101', '-0B1', '0b2')
+
+
+def test_escape_sequence():
+    assert_same(EscapeSequence.grammar, '\\n', '\\u12af', '\\u12', '\\q', '\\\\')
+
+
+def test_suppressed_text_is_removed():
+    matcher = Literal('a') + Whitespace() + 'b' + Optional(',', suppress=True) + 'c'
+    assert_same(matcher, 'ab', 'a  b,c', 'abc', 'a b,')
+    assert Group(matcher)('a  b,c') == 'abc'
+
+
+def test_grammar_sequence():
+    matcher = Variable + '=' + Integer
+    assert_same(matcher, 'a=1', 'a = 1', ' a  =  -1', 'a=', '=1')
+
+
+def test_lookahead():
+    matcher = NextIsNot('if') + Chars(string.ascii_letters) + NextIs(Whitespace(min=1))
+    assert_same(matcher, 'if ', 'iffy ', 'foo', 'foo bar')
+
+
+def test_regex():
+    matcher = Literal('x') + Regex('[a-z]+', flags=re.IGNORECASE)
+    assert_same(matcher, 'xABC', 'xabc1', 'x1')
+
+
+def test_string_end():
+    matcher = Chars('a') + StringEnd()
+    assert_same(matcher, 'aaa', 'aab')
+
+
+def test_slice():
+    matcher = (Literal('"') + Chars('ab') + '"')[1]
+    assert_same(matcher, '"ab"', '"ab', 'ab"', '""')
+    assert Group(matcher)('"ab"') == 'ab'
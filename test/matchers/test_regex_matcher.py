@@ -1,3 +1,4 @@
+import io
 import re
 from pytest import raises
 from chomsky import *
@@ -53,3 +54,18 @@ def test_regex_matcher_fail():
     for p in parse:
         with raises(ParseException):
             matcher(p)
+
+
+def test_regex_matcher_anchors():
+    # the pattern only sees the rest of the input
+    for matcher in [Literal('x') + Regex('^a'), Literal('x') + Regex(r'\Aa'),
+            Literal('x') + Regex(r'\ba'), Literal('x') + Regex('(?<!x)a')]:
+        assert matcher('xa') == ['x', 'a']
+        assert Group(matcher)('xa') == 'xa'
+        assert matcher(StreamBuffer(io.StringIO('xa'), chunk_size=1)) == ['x', 'a']
+        assert matcher(BytesBuffer(b'xa')) == [b'x', b'a']
+        for backend in ['python', 'machine']:
+            assert matcher.compile(backend)('xa') == ['x', 'a']
+    assert Regex('^(a)', group=1).match(Buffer('xab'), 1, []) == 2
+    assert not Regex('a').looks_behind
+    assert not Regex('a$').looks_behind
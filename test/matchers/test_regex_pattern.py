@@ -0,0 +1,71 @@
+import re
+
+from chomsky import *
+
+
+def fullmatch(matcher, text):
+    pattern = re.compile(matcher.regex_pattern())
+    match = pattern.match(text)
+    return match and match.end()
+
+
+def matches(matcher, text):
+    end = matcher.match(Buffer(text), 0, None)
+    if end == -1:
+        return None
+    return end
+
+
+def assert_same(matcher, *texts):
+    for text in texts:
+        assert fullmatch(matcher, text) == matches(matcher, text), text
+
+
+def test_simple_patterns():
+    assert Literal('a.b').regex_pattern() == re.escape('a.b')
+    assert Char('ab').regex_pattern() == '[ab]'
+    assert Chars('ab', min=2, max=3).regex_pattern(rollback=True) == '[ab]{2,3}'
+
+
+def test_not_lowered():
+    assert Later('Integer').regex_pattern() is None
+    assert PythonVariable.regex_pattern() is None
+    assert (Literal('a') + Later('Integer')).regex_pattern() is None
+    assert SeparatedBy(',', 'a').regex_pattern() is None
+    assert (Literal('a') + 'b')[1, 0].regex_pattern() is None
+
+
+def test_slice():
+    matcher = (Literal('(') + Chars('ab') + ')')[1]
+    assert re.compile(matcher.regex_pattern()).match('(ab)')
+    assert_same(matcher, '(ab)', '(ab', 'ab)', '()')
+
+
+def test_sequence_rollback():
+    matcher = Chars('ab') + 'b'
+    assert_same(matcher, 'ab', 'abb', 'b', 'a', 'abbc')
+
+
+def test_nmatches_rollback():
+    matcher = ZeroOrMore('ab') + 'ab'
+    assert_same(matcher, 'ab', 'abab', 'ababx', 'a', '')
+
+
+def test_any_is_atomic():
+    matcher = Any('a', 'ab') + 'b'
+    assert_same(matcher, 'ab', 'abb', 'b')
+
+
+def test_nested_sequence_is_atomic():
+    matcher = (Chars('a') + Chars('a', min=0)) + 'a'
+    assert_same(matcher, 'a', 'aa', 'aaa')
+
+
+def test_oneof_longest():
+    matcher = OneOf('=', '==', '===') + '='
+    assert_same(matcher, '==', '===', '====')
+
+
+def test_optional():
+    matcher = '-' + Optional(Char('oO')) + Chars('0')
+    assert_same(matcher, '-0', '-o0', '-o', '-O00')
@@ -12,3 +12,39 @@ def test_multi_rollback():
     p = ' \n \t \n '
     parsed = matcher(p)
     assert parsed == [' ', ' ']
+
+
+def test_rollback_to_follower():
+    matcher = Chars('abcdefghijklmnopqrstuvwxyz') + 'ing' + Chars('s', min=0)
+    assert matcher('singings') == ['sing', 'ing', 's']
+    assert matcher('ringing') == ['ring', 'ing', '']
+
+
+def test_rollback_long_word():
+    matcher = Chars('x') + 'ing'
+    assert not matcher.test('x' * 100000)
+    assert matcher('x' * 100000 + 'ing') == ['x' * 100000, 'ing']
+
+
+def test_rollback_ends():
+    chars = Chars('ab', min=2)
+    buffer = Buffer('abab')
+    assert list(chars.rollback_ends(buffer, 0, 4, 'abab', True)) == [(3, ['aba']), (2, ['ab'])]
+    assert list(chars.rollback_ends(buffer, 0, 4, 'abab', False, lambda pos: pos == 2)) == [(2, None)]
+
+
+def test_nmatches_rollback_nested():
+    matcher = ZeroOrMore(Literal('a') + Literal(',', suppress=True)) + 'a,' + 'b'
+    assert matcher('a,a,a,b') == [[['a'], ['a']], 'a,', 'b']
+
+
+def test_nmatches_rollback_ends():
+    matcher = ZeroOrMore(Chars('ab', max=2))
+    buffer = Buffer('abba')
+    assert list(matcher.rollback_ends(buffer, 0, 4, None, True)) == [(2, [['ab']]), (0, [[]])]
+    assert list(matcher.rollback_ends(buffer, 0, 2, None, False)) == [(0, None)]
+
+
+def test_nmatches_rollback_suppressed():
+    matcher = OneOrMore(Optional(',', suppress=True) + Chars('ab')) + ',b'
+    assert matcher('a,b,b') == [[['a'], ['b']], ',b']
@@ -1,5 +1,26 @@
 from chomsky import *
-from chomsky.matchers import AutoSequence
+from chomsky.matchers import AutoSequence, Discard
+
+
+class SliceCounted(Grammar):
+    grammar = Chars('ab')
+    instances = 0
+
+    def __new__(cls, *args, **kwargs):
+        SliceCounted.instances += 1
+        return super(SliceCounted, cls).__new__(cls)
+
+
+class Nothing(Matcher):
+    'A custom matcher that consumes nothing, and returns None'
+    def consume(self, buffer):
+        return None
+
+
+class MatchNothing(Matcher):
+    'A custom matcher that matches nothing, and adds no value'
+    def match(self, buffer, pos, out):
+        return pos
 
 
 def test_two_sequences_repr():
@@ -62,6 +83,46 @@ def test_slice_tuple_sequences():
     assert matcher('[aeioupqrst12345]') == ['aeiou', '12345']
 
 
+def test_slice_projection():
+    matcher = (Literal('[') + Chars('aeiou') + Chars('pqrst') + Literal(']'))[1:-1]
+    assert matcher.build_projection() == \
+        AutoSequence(Discard(Literal('[')), Chars('aeiou'), Chars('pqrst'), Discard(Literal(']')))
+    assert matcher('[aeioupqrst]') == ['aeiou', 'pqrst']
+    assert (Literal('[') + Chars('aeiou') + Literal(']'))[-2]('[ae]') == 'ae'
+    assert (Literal('a') + 'b' + 'c')[::2]('abc') == ['a', 'c']
+
+
+def test_slice_projection_discards_grammars():
+    SliceCounted.instances = 0
+    parsed = (SliceCounted + ',' + SliceCounted)[0]('a, b')
+    assert SliceCounted.instances == 1
+    assert str(parsed) == 'a'
+    # (the first value of a separated sequence is needed for the separator)
+    parsed = (SliceCounted + ',' + SliceCounted)[2]('a, b')
+    assert str(parsed) == 'b'
+    assert Group((SliceCounted + ',' + SliceCounted)[2])('a, b') == 'b'
+
+
+def test_slice_not_projected():
+    # reordered values, a collected separator, and an index that doesn't exist
+    assert not (Literal('a') + 'b')[1, 0].build_projection()
+    assert not Sequence('a', 'b', sep=',')[1].build_projection()
+    assert not (Literal('a') + 'b')[2].build_projection()
+    assert (Literal('a') + 'b')[1, 0]('ab') == ['b', 'a']
+    assert Sequence('a', 'b', sep=',')[1]('a,b') == ','
+
+
+def test_slice_custom_consume_returns_none():
+    matcher = (Literal('a') + Nothing() + Literal('b'))[1]
+    assert not matcher.build_projection()
+    assert matcher('ab') == 'b'
+    assert (Literal('a') + Nothing() + Literal('b'))[0]('ab') == 'a'
+    # the projection expects a value, and falls back to the whole sequence
+    matcher = (Literal('a') + MatchNothing() + Literal('b'))[1]
+    assert matcher.build_projection()
+    assert matcher('ab') == 'b'
+
+
 def test_three_sequences_whitespace_sep():
     matcher = Sequence(Chars('aeiou'), Chars('pqrst'), Chars('12345'), sep=Whitespace)
     assert matcher('auieoaieo ttrrssppqq 543212345') == ['auieoaieo', 'ttrrssppqq', '543212345']
@@ -0,0 +1,72 @@
+from chomsky import *
+
+
+def spans(text):
+    return Buffer(text, spans=True)
+
+
+def test_span():
+    buffer = Buffer('abcdef')
+    span = Span(buffer, 1, 4)
+    assert str(span) == 'bcd'
+    assert span == 'bcd'
+    assert 'bcd' == span
+    assert span != 'bc'
+    assert span == Span(buffer, 1, 4)
+    assert len(span) == 3
+    assert hash(span) == hash('bcd')
+    assert repr(span) == "Span('bcd', start=1, end=4)"
+
+
+def test_buffer_span():
+    assert Buffer('abc').span(1, 3) == 'bc'
+    assert isinstance(Buffer('abc').span(1, 3), str)
+    assert isinstance(spans('abc').span(1, 3), Span)
+    assert spans('abc').window(0, 2).spans
+
+
+def test_chars_span():
+    parsed = Chars('abc')(spans('  abcd'[2:]))
+    assert isinstance(parsed, Span)
+    assert (parsed.start, parsed.end) == (0, 3)
+    parsed = (Literal('x') + Chars('abc'))(spans('xab'))
+    assert parsed == ['x', 'ab']
+    assert parsed[1].start == 1
+
+
+def test_chars_rollback_span():
+    parsed = (Chars('ab') + 'b')(spans('abb'))
+    assert isinstance(parsed[0], Span)
+    assert parsed[0].end == 2
+
+
+def test_group_span():
+    parsed = Group(Literal('a') + Chars('bc') + Literal('d'))(spans('abcd'))
+    assert isinstance(parsed, Span)
+    assert (parsed.start, parsed.end) == (0, 4)
+    # the suppressed whitespace is removed, so the result is a string
+    parsed = Group(Variable + '=' + Integer)(spans('a = 1'))
+    assert parsed == 'a=1'
+    assert isinstance(parsed, str)
+    assert isinstance(Group(Variable + '=' + Integer)(spans('a=1')), Span)
+
+
+def test_grammar_span():
+    parsed = Integer(spans('  123'))
+    assert str(parsed) == '123'
+    assert (parsed.parsed.start, parsed.parsed.end) == (2, 5)
+    assert parsed == Integer('123')
+
+
+def test_flatten_span():
+    parsed = Flatten(Chars('a') + (Chars('b') + 'c'))(spans('abc'))
+    assert parsed == ['a', 'b', 'c']
+
+
+def test_compiled_spans():
+    matcher = Chars('ab') + Chars('b', min=0) + 'c' + Group(Chars('d') + 'e') + OneOf('f', 'g') + Char('h')
+    for backend in ['python', 'machine']:
+        out = []
+        expected = []
+        assert matcher.compile(backend).match(spans('abbcdegh'), 0, out) == matcher.match(spans('abbcdegh'), 0, expected)
+        assert repr(out) == repr(expected)
@@ -0,0 +1,146 @@
+import bz2
+import gzip
+import io
+import lzma
+import re
+from pytest import raises
+from chomsky import *
+
+
+class StreamEntry(Grammar):
+    grammar = Variable + '=' + Integer + ';'
+
+
+def entries(count):
+    for index in range(count):
+        yield '\nkey{0} = {0};'.format(index)
+
+
+def test_stream_buffer_reads_chunks():
+    buffer = StreamBuffer(io.StringIO('abc123def'), chunk_size=2)
+    assert buffer.peek() == 'a'
+    assert len(buffer.buffer) == 2
+    assert buffer.startswith('abc')
+    assert buffer.match(re.compile('[a-z]+[0-9]+')).end() == 6
+    assert buffer.find('f') == 8
+    assert buffer.peek(9) == ''
+    assert buffer.end == 9
+
+
+def test_stream_buffer_end():
+    buffer = StreamBuffer(io.StringIO('ab'))
+    assert buffer.end > 2
+    assert (Literal('ab') + StringEnd())(buffer) == ['ab']
+    assert not buffer
+    assert buffer.end == 2
+
+
+def test_stream_buffer_matches_like_buffer():
+    text = '1 + foo_bar * "hi" - 0x1f / 2.5'
+    matcher = Value + ZeroOrMore(Operator + Value)
+    for chunk_size in [8, 16, 100]:
+        assert matcher(StreamBuffer(io.StringIO(text), chunk_size=chunk_size)) == matcher(text)
+    assert matcher(StreamBuffer(iter(['1 +', ' 2']))) == matcher('1 + 2')
+
+
+def test_stream_buffer_chunk_size_1():
+    grammars = [Integer, Float, Number, BinaryInteger, OctalInteger, HexadecimalInteger,
+        Variable, PythonVariable, Operator, EscapeSequence, String, Value, StreamEntry]
+    texts = ['1.5', '3.9_n', '0xAa\\02', '-0x0', '0b101 ', '0o17', 'if', 'iffy', '<<=', '\\u12af',
+        '"a\\"b"', "'''a\nb'''", '"abc', 'key1 = 1;', '12a', '-0.0', '']
+    for grammar in grammars:
+        for text in texts:
+            results = []
+            for buffer in [Buffer(text), StreamBuffer(io.StringIO(text), chunk_size=1)]:
+                try:
+                    results.append(repr(grammar(buffer)))
+                except ParseException:
+                    results.append(None)
+            assert results[0] == results[1], (grammar, text)
+
+
+def test_stream_buffer_unbounded_regex():
+    matcher = Regex('a.*b') + 'c'
+    assert matcher(StreamBuffer(io.StringIO('axxbxbc'), chunk_size=2)) == matcher('axxbxbc')
+
+
+def test_stream_buffer_long_token():
+    text = '"' + 'a' * 100 + '"'
+    assert String(StreamBuffer(io.StringIO(text), chunk_size=8)) == String(text)
+
+
+def test_stream_buffer_releases_committed_text():
+    buffer = StreamBuffer(entries(10000), chunk_size=64)
+    count = 0
+    while buffer:
+        entry = StreamEntry(buffer)
+        buffer.commit()
+        count += 1
+        assert len(buffer.buffer) < 200
+    assert count == 10000
+    assert str(entry) == 'key9999=9999;'
+    with raises(IndexError):
+        buffer.text(0, 10)
+
+
+def test_stream_buffer_keeps_marks():
+    buffer = StreamBuffer(entries(100), chunk_size=16)
+    buffer.mark()
+    for _ in range(50):
+        StreamEntry(buffer)
+        buffer.commit()
+    assert buffer.horizon == 0
+    buffer.restore_mark()
+    assert StreamEntry(buffer) == StreamEntry('key0 = 0;')
+
+
+def test_stream_buffer_compiled():
+    text = '1 + foo_bar * "hi"'
+    matcher = Value + ZeroOrMore(Operator + Value)
+    for backend in ['python', 'machine']:
+        assert matcher.compile(backend)(StreamBuffer(io.StringIO(text), chunk_size=4)) == matcher(text)
+
+
+def test_stream_buffer_window():
+    matcher = Chars('abx') + PrevIs('ab') + Literal('c')
+    assert matcher(StreamBuffer(io.StringIO('xabc'), chunk_size=2)) == ['xab', 'c']
+
+
+def test_stream_buffer_line_col():
+    buffer = StreamBuffer(entries(100), chunk_size=16)
+    for _ in range(50):
+        StreamEntry(buffer)
+        buffer.commit()
+    assert buffer.line_col() == (51, 12)
+    assert buffer.line_start() == buffer.tell() - 11
+    with raises(TypeError):
+        buffer.newlines()
+
+
+def test_stream_buffer_encoding():
+    text = '"h\xe9llo w\xf6rld"'
+    data = text.encode('utf-8')
+    # the chunks split the two-byte characters
+    buffer = StreamBuffer(io.BytesIO(data), chunk_size=3, encoding='utf-8')
+    assert String(buffer) == String(text)
+    assert String(StreamBuffer([data[:3], data[3:]], encoding='utf-8')) == String(text)
+
+
+def test_stream_buffer_open(tmp_path):
+    text = ''.join(entries(1000))
+    for name, compress in [('gzip', gzip.compress), ('bz2', bz2.compress), ('xz', lzma.compress), (None, bytes)]:
+        path = tmp_path / 'entries.{0}'.format(name)
+        path.write_bytes(compress(text.encode('utf-8')))
+        assert StreamBuffer.detect_compression(str(path)) == name
+        with StreamBuffer.open(str(path), chunk_size=64) as buffer:
+            count = 0
+            while buffer:
+                entry = StreamEntry(buffer)
+                buffer.commit()
+                count += 1
+                assert len(buffer.buffer) < 300
+        assert count == 1000
+        assert str(entry) == 'key999=999;'
+        with open(str(path), 'rb') as f:
+            assert StreamEntry(StreamBuffer.open(f)) == StreamEntry('key0 = 0;')
+            assert not f.closed
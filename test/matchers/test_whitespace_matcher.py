@@ -40,3 +40,9 @@ def test_whitespace_min_matcher_fail():
     matcher = Whitespace(min=1)
     with raises(ParseException):
         matcher('abc')
+
+
+def test_whitespace_matcher_run():
+    matcher = Whitespace() + Literal('a')
+    parsed = matcher(' \t\n ' * 1000 + 'a')
+    assert parsed == ['a']
@@ -1,3 +1,4 @@
+import string
 from pytest import raises
 from chomsky import *
 